@@ -0,0 +1,242 @@
+"""
+Prints the PostgreSQL query plans of the hot per-athlete queries before and
+after the composite indexes, on a generated multi-year dataset.
+
+The queries are captured from the real crud functions, so the plans follow
+the code. Everything runs inside a scratch schema of the DATABASE_URL database,
+which is dropped again at the end:
+
+    python benchmark_query_plans.py --athletes 50 --years 4
+"""
+
+import argparse
+import re
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+import crud
+import models
+from database import engine
+
+SCHEMA = "query_plan_benchmark"
+
+# Indexes behind the hot query paths; they are dropped for the "before" plans
+HOT_PATH_INDEXES = [
+    "ix_activities_athlete_id_start_time",
+    "ix_activities_strava_activity_id",
+    "ix_activity_laps_activity_id",
+    "ix_athlete_metrics_athlete_id_type_date",
+    "ix_potential_markers_athlete_id_status",
+]
+
+GENERATE_DATA = [
+    """
+    INSERT INTO athletes (first_name, last_name, psf_trimp, psf_pss, created_at)
+    SELECT 'Athlete', n::text, 0.42, 0.24, now()
+    FROM generate_series(1, :athletes) AS n
+    """,
+    # Roughly five rides a week per athlete
+    """
+    INSERT INTO activities (
+        athlete_id, name, sport, source, start_time, strava_activity_id,
+        total_moving_time, tss, intensity_factor, unified_training_load
+    )
+    SELECT a.athlete_id, 'Ride', 'cycling', 'strava',
+           day + interval '6 hours' + random() * interval '12 hours',
+           (random() * 1e12)::bigint,
+           (1800 + random() * 14400)::int,
+           (30 + random() * 150)::int,
+           0.55 + random() * 0.5,
+           (30 + random() * 150)::int
+    FROM athletes a
+    CROSS JOIN generate_series(
+        CAST(:start AS timestamp), CAST(:end AS timestamp), interval '1 day'
+    ) AS day
+    WHERE random() < 0.7
+    """,
+    """
+    INSERT INTO activity_laps (activity_id, lap_number, duration, average_power)
+    SELECT activity_id, lap, 600, (150 + random() * 150)::int
+    FROM activities CROSS JOIN generate_series(1, 5) AS lap
+    """,
+    """
+    INSERT INTO athlete_metrics (athlete_id, metric_type, value, date_established)
+    SELECT a.athlete_id, CAST(metric AS metric_type_enum), 50 + random() * 250,
+           day::date
+    FROM athletes a
+    CROSS JOIN unnest(ARRAY['FTP', 'THR', 'WEIGHT']) AS metric
+    CROSS JOIN generate_series(
+        CAST(:start AS timestamp), CAST(:end AS timestamp), interval '6 weeks'
+    ) AS day
+    """,
+    """
+    INSERT INTO daily_activity_loads (
+        athlete_id, date, activity_count, total_tss, avg_intensity_factor,
+        total_load, total_moving_time
+    )
+    SELECT athlete_id, start_time::date, count(*), sum(tss),
+           avg(intensity_factor), sum(unified_training_load),
+           sum(total_moving_time)
+    FROM activities
+    GROUP BY athlete_id, start_time::date
+    """,
+    """
+    INSERT INTO daily_performance_metrics (athlete_id, date, ctl, atl, tsb)
+    SELECT a.athlete_id, day::date, random() * 100, random() * 100,
+           random() * 60 - 30
+    FROM athletes a
+    CROSS JOIN generate_series(
+        CAST(:start AS timestamp), CAST(:end AS timestamp), interval '1 day'
+    ) AS day
+    """,
+    """
+    INSERT INTO potential_markers (
+        athlete_id, activity_id, metric_type, value, date_detected, status
+    )
+    SELECT athlete_id, activity_id, CAST('FTP' AS potential_metric_type_enum),
+           250 + random() * 100, start_time,
+           CAST(
+               (ARRAY['PENDING', 'ACCEPTED', 'DISMISSED'])[1 + (random() * 2)::int]
+               AS potential_marker_status_enum
+           )
+    FROM activities
+    WHERE random() < 0.02
+    """,
+]
+
+
+def hot_queries(athlete_id: int, activity: models.Activity, today: date) -> dict:
+    """The queries to explain, as calls of the crud functions that issue them."""
+    as_of = datetime.combine(today - timedelta(days=200), datetime.min.time())
+    return {
+        "latest FTP": lambda db: crud.get_latest_ftp(db, athlete_id, as_of),
+        "latest weight": lambda db: crud.get_latest_weight(db, athlete_id, as_of),
+        "PMC, one year": lambda db: crud.get_pmc_data(
+            db, athlete_id, today - timedelta(days=365), today
+        ),
+        "daily TSS, 16 weeks": lambda db: crud.get_daily_aggregates_for_metric(
+            db, athlete_id, today - timedelta(weeks=16), today, "total_tss"
+        ),
+        "activity page, date range": lambda db: crud.get_activities_by_athlete(
+            db,
+            athlete_id,
+            limit=50,
+            start_date=today - timedelta(days=365),
+            end_date=today,
+        ),
+        "activity with laps": lambda db: crud.get_activity(db, activity.activity_id),
+        "activity by Strava ID": lambda db: crud.get_activity_by_strava_id(
+            db, activity.strava_activity_id
+        ),
+        "pending markers": lambda db: crud.get_pending_markers(db, athlete_id),
+    }
+
+
+def capture_statements(conn, call) -> list[tuple[str, dict]]:
+    """Runs ``call(db)`` and returns the SQL statements it executed."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(conn, "before_cursor_execute", record)
+    try:
+        with Session(bind=conn) as db:
+            call(db)
+    finally:
+        event.remove(conn, "before_cursor_execute", record)
+    return statements
+
+
+def explain(conn, queries: dict) -> dict[str, tuple[str, float]]:
+    """EXPLAIN ANALYZE of every captured statement: name -> (plan, total ms)."""
+    plans = {}
+    for name, call in queries.items():
+        call_plans, total_ms = [], 0.0
+        for statement, parameters in capture_statements(conn, call):
+            rows = conn.exec_driver_sql(
+                f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+            ).all()
+            plan = "\n".join(row[0] for row in rows)
+            call_plans.append(plan)
+            total_ms += float(re.search(r"Execution Time: ([\d.]+)", plan).group(1))
+        plans[name] = ("\n\n".join(call_plans), total_ms)
+    return plans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--athletes", type=int, default=50)
+    parser.add_argument("--years", type=int, default=4)
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("The benchmark needs PostgreSQL (set DATABASE_URL)")
+
+    today = date.today()
+    indexes = {
+        index.name: index
+        for table in models.Base.metadata.tables.values()
+        for index in table.indexes
+    }
+
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(f"SET search_path TO {SCHEMA}"))
+        try:
+            models.Base.metadata.create_all(conn)
+            for statement in GENERATE_DATA:
+                conn.execute(
+                    text(statement),
+                    {
+                        "athletes": args.athletes,
+                        "start": today - timedelta(days=365 * args.years),
+                        "end": today,
+                    },
+                )
+            activity_count = conn.execute(
+                text("SELECT count(*) FROM activities")
+            ).scalar()
+            print(
+                f"Generated {args.athletes} athletes with {activity_count} "
+                f"activities over {args.years} years"
+            )
+
+            with Session(bind=conn) as db:
+                athlete_id = args.athletes // 2 or 1
+                activity = (
+                    db.query(models.Activity)
+                    .filter(models.Activity.athlete_id == athlete_id)
+                    .first()
+                )
+                queries = hot_queries(athlete_id, activity, today)
+
+            for name in HOT_PATH_INDEXES:
+                conn.execute(text(f"DROP INDEX {name}"))
+            conn.execute(text("ANALYZE"))
+            before = explain(conn, queries)
+
+            for name in HOT_PATH_INDEXES:
+                indexes[name].create(conn)
+            conn.execute(text("ANALYZE"))
+            after = explain(conn, queries)
+
+            for name in queries:
+                print(f"\n=== {name} ===")
+                print(f"--- before ---\n{before[name][0]}")
+                print(f"--- after ---\n{after[name][0]}")
+
+            print(f"\n{'query':<28}{'before ms':>12}{'after ms':>12}")
+            for name in queries:
+                print(f"{name:<28}{before[name][1]:>12.2f}{after[name][1]:>12.2f}")
+        finally:
+            conn.rollback()
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,30 @@
 from .activity import (
+    bulk_insert_activity_streams,
+    create_activities_with_records,
     create_activity_with_records,
     create_manual_activity,
     delete_activity,
-    delete_activity_records,
+    delete_activity_stream,
     get_activities_by_athlete,
+    get_activities_with_streams,
     get_activity,
+    get_activity_ids_by_athlete,
     get_activity_by_strava_id,
+    get_activity_stream,
+    get_existing_strava_activity_ids,
     get_recent_activities,
     update_activity,
 )
 from .athlete import (
+    athlete_exists,
     create_athlete,
     delete_athlete,
     get_athlete,
+    get_athlete_counts,
+    get_athlete_profile,
     get_athlete_by_strava_id,
     get_athletes,
+    get_existing_athlete_ids,
     update_athlete,
     update_athlete_profile_picture,
     update_athlete_strava_tokens,
@@ -29,39 +39,55 @@ from .equipment import (
     update_equipment,
 )
 from .performance import (
+    bulk_upsert_daily_metrics,
     create_athlete_metric,
+    get_daily_activity_loads,
     get_daily_activity_summary,
     get_daily_aggregates_for_metric,
     get_dual_data_aggregates,
     get_latest_daily_metric,
     get_latest_daily_metric_before_date,
+    get_latest_daily_metrics_before_date,
     get_latest_ftp,
     get_latest_lthr,
     get_latest_weight,
     get_metric_history,
+    get_metric_timeline,
     get_pending_markers,
     get_pmc_data,
-    get_power_records_for_date_range,
+    get_pmc_rows_with_seed,
+    get_power_curves_for_date_range,
+    refresh_daily_activity_loads,
     upsert_daily_metric,
 )
 
 __all__ = [
     # Activity functions
+    "bulk_insert_activity_streams",
+    "create_activities_with_records",
     "create_activity_with_records",
     "create_manual_activity",
     "delete_activity",
-    "delete_activity_records",
+    "delete_activity_stream",
     "get_activities_by_athlete",
+    "get_activities_with_streams",
     "get_activity",
+    "get_activity_ids_by_athlete",
     "get_activity_by_strava_id",
+    "get_activity_stream",
+    "get_existing_strava_activity_ids",
     "get_recent_activities",
     "update_activity",
     # Athlete functions
+    "athlete_exists",
     "create_athlete",
     "delete_athlete",
     "get_athlete",
+    "get_athlete_counts",
+    "get_athlete_profile",
     "get_athlete_by_strava_id",
     "get_athletes",
+    "get_existing_athlete_ids",
     "update_athlete",
     "update_athlete_profile_picture",
     "update_athlete_strava_tokens",
@@ -74,18 +100,24 @@ __all__ = [
     "get_equipment_by_brand_model_type",
     "update_equipment",
     # Performance functions
+    "bulk_upsert_daily_metrics",
     "create_athlete_metric",
+    "get_daily_activity_loads",
     "get_daily_activity_summary",
     "get_daily_aggregates_for_metric",
     "get_dual_data_aggregates",
     "get_latest_daily_metric",
     "get_latest_daily_metric_before_date",
+    "get_latest_daily_metrics_before_date",
     "get_latest_ftp",
     "get_latest_lthr",
     "get_latest_weight",
     "get_metric_history",
+    "get_metric_timeline",
     "get_pending_markers",
     "get_pmc_data",
-    "get_power_records_for_date_range",
+    "get_pmc_rows_with_seed",
+    "get_power_curves_for_date_range",
+    "refresh_daily_activity_loads",
     "upsert_daily_metric",
 ]
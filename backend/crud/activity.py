@@ -1,6 +1,12 @@
+import base64
+import io
 import os
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc, func
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy.orm import Session, joinedload, load_only
+from sqlalchemy import desc, tuple_
 
 import models
 import schemas
@@ -24,54 +30,120 @@ def get_recent_activities(db: Session, limit: int = 20):
 def create_activity_with_records(
     db: Session,
     activity: schemas.ActivityBase,
-    records: list[dict],
+    streams: dict[str, np.ndarray],
     laps: list[dict],
     potential_markers: list[schemas.PotentialPerformanceMarkerCreate],
     athlete_id: int,
     fit_file_path: str,
 ):
     """
-    Creates an Activity and bulk-inserts its associated records for efficiency.
+    Creates an Activity and stores its per-channel stream arrays as a single
+    columnar stream row, together with its laps and markers, in one transaction.
     """
-    # 1. Create the Activity object to get its ID
-    db_activity = models.Activity(
-        **activity.model_dump(), athlete_id=athlete_id, fit_file_path=fit_file_path
+    (db_activity,) = create_activities_with_records(
+        db,
+        athlete_id,
+        [(activity, streams, laps, potential_markers, fit_file_path)],
     )
+    return db_activity
 
-    db.add(db_activity)
-    db.commit()
-    db.refresh(db_activity)
 
-    # 2. Add the new activity_id to each record dictionary
-    if records:
-        for record in records:
-            record["activity_id"] = db_activity.activity_id
-
-        # 3. Perform a bulk insert of all records
-        db.bulk_insert_mappings(models.ActivityRecord, records)
-        db.commit()
-
-    # 4. Add the new activity_id to each lap dictionary
-    if laps:
-        for lap in laps:
-            lap["activity_id"] = db_activity.activity_id
-
-        # 5. Perform a bulk insert of all laps
-        db.bulk_insert_mappings(models.ActivityLap, laps)
-        db.commit()
-
-    # 6. Create Potential Markers now that we have a valid activity_id
-    if potential_markers:
-        for marker_data in potential_markers:
-            db_marker = models.PotentialPerformanceMarker(
-                **marker_data.model_dump(),
-                athlete_id=athlete_id,
-                activity_id=db_activity.activity_id,
+def create_activities_with_records(
+    db: Session,
+    athlete_id: int,
+    parsed_activities: list[
+        tuple[
+            schemas.ActivityBase,
+            dict[str, np.ndarray],
+            list[dict],
+            list[schemas.PotentialPerformanceMarkerCreate],
+            str,
+        ]
+    ],
+) -> list[models.Activity]:
+    """
+    Creates a batch of parsed activities, each given as (activity, streams, laps,
+    potential_markers, fit_file_path), with their streams, power curves, laps and
+    markers in a single commit.
+    """
+    db_activities, db_streams = [], []
+    for activity, streams, laps, potential_markers, fit_file_path in parsed_activities:
+        db_activity = models.Activity(
+            **activity.model_dump(), athlete_id=athlete_id, fit_file_path=fit_file_path
+        )
+        db_activity.laps = [models.ActivityLap(**lap) for lap in laps]
+        db_activity.potential_markers = [
+            models.PotentialPerformanceMarker(
+                **marker_data.model_dump(), athlete_id=athlete_id
             )
-            db.add(db_marker)
-        db.commit()
+            for marker_data in potential_markers
+        ]
+        db_stream = None
+        if streams and len(streams["time"]) > 0:
+            db_stream = models.ActivityStream.from_arrays(streams)
+            services.activity_processing.update_power_curve(
+                db_activity, power=streams.get("power")
+            )
+        db_activities.append(db_activity)
+        db_streams.append(db_stream)
+
+    # Flush to get activity ids, then write the (large) stream rows in bulk
+    db.add_all(db_activities)
+    db.flush()
+    for db_activity, db_stream in zip(db_activities, db_streams):
+        if db_stream is not None:
+            db_stream.activity_id = db_activity.activity_id
+    bulk_insert_activity_streams(
+        db, [db_stream for db_stream in db_streams if db_stream is not None]
+    )
 
-    return db_activity
+    db.commit()
+    return db_activities
+
+
+def _copy_value(value) -> str:
+    """Encodes a value for PostgreSQL's COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bytes):
+        # bytea hex format; the backslash itself must be escaped in COPY text
+        return "\\\\x" + value.hex()
+    return str(value)
+
+
+def bulk_insert_activity_streams(db: Session, db_streams: list[models.ActivityStream]):
+    """
+    Inserts packed stream rows in the session's current transaction. On
+    PostgreSQL the rows are streamed with COPY FROM STDIN; other dialects (SQLite
+    in tests) fall back to an executemany insert.
+    """
+    if not db_streams:
+        return
+
+    table = models.ActivityStream.__table__
+    columns = [column.name for column in table.columns]
+    rows = [
+        {column: getattr(db_stream, column) for column in columns}
+        for db_stream in db_streams
+    ]
+
+    if db.get_bind().dialect.name != "postgresql":
+        db.execute(table.insert(), rows)
+        return
+
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(row[column]) for column in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN", buffer
+        )
+    finally:
+        cursor.close()
 
 
 def create_manual_activity(
@@ -106,7 +178,7 @@ def create_manual_activity(
     db.commit()
     db.refresh(db_activity)
 
-    # Create a single record for manual activities to represent the summary
+    # Create a single-sample stream for manual activities to represent the summary
     # This ensures consistency with activities uploaded via .fit files which always have records
     record_data = {
         "timestamp": activity_data.start_time,
@@ -114,21 +186,23 @@ def create_manual_activity(
         "heart_rate": activity_data.average_heart_rate,
         "cadence": activity_data.average_cadence,
         "speed": activity_data.average_speed,
-        "activity_id": db_activity.activity_id,
     }
-    db_record = models.ActivityRecord(**record_data)
-    db.add(db_record)
+    db_stream = models.ActivityStream.from_records(
+        [record_data], start_time=db_activity.start_time
+    )
+    db_stream.activity_id = db_activity.activity_id
+    db.add(db_stream)
     db.commit()
 
     return db_activity
 
 
 def get_activity(db: Session, activity_id: int):
-    # Use joinedload to efficiently fetch the activity and all its records in one query
+    # Use joinedload to fetch the activity, laps and equipment in one query. The
+    # stream is loaded lazily, or through get_activity_stream.
     return (
         db.query(models.Activity)
         .options(
-            joinedload(models.Activity.records),
             joinedload(models.Activity.laps),
             joinedload(models.Activity.bike),
             joinedload(models.Activity.shoe),
@@ -140,17 +214,107 @@ def get_activity(db: Session, activity_id: int):
     )
 
 
+def get_activity_stream(
+    db: Session, activity_id: int, channels: list[str] | None = None
+) -> models.ActivityStream | None:
+    """
+    Fetches an activity's stream, loading only the time channel and the given
+    channels (all channels if None).
+    """
+    query = db.query(models.ActivityStream).filter(
+        models.ActivityStream.activity_id == activity_id
+    )
+    if channels is not None:
+        columns = ["sample_count", "time", *channels]
+        query = query.options(
+            load_only(*(getattr(models.ActivityStream, column) for column in columns))
+        )
+    return query.first()
+
+
+def get_activities_with_streams(
+    db: Session, activity_ids: list[int], channels: list[str]
+) -> list[models.Activity]:
+    """
+    Fetches activities by ID together with their streams in one query, loading
+    only the given channels of each stream.
+    """
+    columns = ["sample_count", *channels]
+    return (
+        db.query(models.Activity)
+        .options(
+            joinedload(models.Activity.stream).load_only(
+                *(getattr(models.ActivityStream, column) for column in columns)
+            )
+        )
+        .filter(models.Activity.activity_id.in_(activity_ids))
+        .order_by(models.Activity.start_time, models.Activity.activity_id)
+        .all()
+    )
+
+
+def get_activity_ids_by_athlete(
+    db: Session,
+    athlete_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> list[int]:
+    """
+    IDs of an athlete's activities starting on or after ``start_date`` and
+    before ``end_date`` (exclusive), oldest first.
+    """
+    query = db.query(models.Activity.activity_id).filter(
+        models.Activity.athlete_id == athlete_id
+    )
+    if start_date:
+        query = query.filter(models.Activity.start_time >= start_date)
+    if end_date:
+        query = query.filter(models.Activity.start_time < end_date)
+    return [
+        activity_id
+        for (activity_id,) in query.order_by(
+            models.Activity.start_time, models.Activity.activity_id
+        )
+    ]
+
+
+def encode_activity_cursor(activity: models.Activity) -> str:
+    """Opaque cursor pointing just past ``activity`` in a listing."""
+    key = f"{activity.start_time.isoformat()}|{activity.activity_id}"
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+
+def decode_activity_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverse of encode_activity_cursor; raises ValueError on malformed input."""
+    try:
+        start_time, activity_id = (
+            base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        )
+        return datetime.fromisoformat(start_time), int(activity_id)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
 def get_activities_by_athlete(
     db: Session,
     athlete_id: int,
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = 100,
     sport: str = None,
     sub_sport: str = None,
     ride_type: str = None,
-    start_date: str = None,
-    end_date: str = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    include_total: bool = False,
 ):
+    """
+    Lists an athlete's activities, newest first, using keyset pagination on
+    (start_time, activity_id): ``cursor`` is the ``next_cursor`` of the previous
+    page. Date filters are inclusive and applied as plain range predicates so
+    the (athlete_id, start_time) index is used. ``limit=None`` returns every
+    match. Returns (activities, next_cursor, total_count); counting is a second
+    query and only runs when ``include_total`` is set, otherwise it is None.
+    """
     query = db.query(models.Activity).filter(models.Activity.athlete_id == athlete_id)
 
     if sport:
@@ -160,17 +324,37 @@ def get_activities_by_athlete(
     if ride_type:
         query = query.filter(models.Activity.ride_type == ride_type)
     if start_date:
-        query = query.filter(func.date(models.Activity.start_time) >= start_date)
+        query = query.filter(
+            models.Activity.start_time
+            >= datetime.combine(start_date, datetime.min.time())
+        )
     if end_date:
-        query = query.filter(func.date(models.Activity.start_time) <= end_date)
+        query = query.filter(
+            models.Activity.start_time
+            < datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        )
 
-    total_count = query.count()
+    total_count = query.count() if include_total else None
 
-    activities = (
-        query.order_by(desc(models.Activity.start_time)).offset(skip).limit(limit).all()
+    if cursor:
+        query = query.filter(
+            tuple_(models.Activity.start_time, models.Activity.activity_id)
+            < tuple_(*decode_activity_cursor(cursor))
+        )
+    query = query.order_by(
+        desc(models.Activity.start_time), desc(models.Activity.activity_id)
     )
+    if limit is None:
+        return query.all(), None, total_count
 
-    return activities, total_count
+    # One extra row tells whether there is a next page
+    activities = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(activities) > limit:
+        activities = activities[:limit]
+        next_cursor = encode_activity_cursor(activities[-1])
+
+    return activities, next_cursor, total_count
 
 
 def update_activity(
@@ -205,18 +389,15 @@ def update_activity(
 
     # Now, recalculate unified training load based on the updated activity state
     athlete = db_activity.athlete
-    if db_activity.tss and db_activity.tss > 0:
-        db_activity.unified_training_load = db_activity.tss
-    elif db_activity.trimp and db_activity.trimp > 0:
-        db_activity.unified_training_load = int(
-            round(db_activity.trimp * athlete.psf_trimp)
-        )
-    elif db_activity.perceived_strain_score and db_activity.perceived_strain_score > 0:
-        db_activity.unified_training_load = int(
-            round(db_activity.perceived_strain_score * athlete.psf_pss)
+    db_activity.unified_training_load = (
+        services.calculations.calculate_unified_training_load(
+            db_activity.tss,
+            db_activity.trimp,
+            db_activity.perceived_strain_score,
+            athlete.psf_trimp,
+            athlete.psf_pss,
         )
-    else:
-        db_activity.unified_training_load = 0
+    )
 
     db.add(db_activity)
     db.commit()
@@ -251,7 +432,19 @@ def get_activity_by_strava_id(db: Session, strava_activity_id: int):
     )
 
 
-def delete_activity_records(db: Session, activity_id: int):
-    """Delete all records for an activity."""
-    db.query(models.ActivityRecord).filter(models.ActivityRecord.activity_id == activity_id).delete()
+def get_existing_strava_activity_ids(
+    db: Session, strava_activity_ids: list[int]
+) -> set[int]:
+    """The given Strava activity IDs that are already ingested, in one query."""
+    rows = db.query(models.Activity.strava_activity_id).filter(
+        models.Activity.strava_activity_id.in_(strava_activity_ids)
+    )
+    return {row.strava_activity_id for row in rows}
+
+
+def delete_activity_stream(db: Session, activity_id: int):
+    """Delete the stored time-series stream for an activity."""
+    db.query(models.ActivityStream).filter(
+        models.ActivityStream.activity_id == activity_id
+    ).delete()
     db.commit()
@@ -1,8 +1,10 @@
 from datetime import datetime
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import exists, func, select
+from sqlalchemy.orm import Session, selectinload
 
 import models
 import schemas
+import services
 
 
 def create_athlete(db: Session, athlete: schemas.AthleteCreate):
@@ -17,17 +19,62 @@ def get_athletes(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Athlete).offset(skip).limit(limit).all()
 
 
+def athlete_exists(db: Session, athlete_id: int) -> bool:
+    """Cheap existence check for endpoints that only need to validate the ID."""
+    return db.query(exists().where(models.Athlete.athlete_id == athlete_id)).scalar()
+
+
+def get_existing_athlete_ids(db: Session, athlete_ids: list[int]) -> set[int]:
+    """The subset of the given athlete IDs that exist, in one query."""
+    rows = db.query(models.Athlete.athlete_id).filter(
+        models.Athlete.athlete_id.in_(athlete_ids)
+    )
+    return {row.athlete_id for row in rows}
+
+
 def get_athlete(db: Session, athlete_id: int):
+    """
+    Loads the athlete row only; relationships stay lazy. Use get_athlete_profile
+    for metrics and equipment and get_activities_by_athlete for activities.
+    """
+    return (
+        db.query(models.Athlete).filter(models.Athlete.athlete_id == athlete_id).first()
+    )
+
+
+def get_athlete_profile(db: Session, athlete_id: int):
+    """Loads the athlete with its (small) metric and equipment collections."""
     return (
         db.query(models.Athlete)
         .options(
-            joinedload(models.Athlete.metrics), joinedload(models.Athlete.activities)
+            selectinload(models.Athlete.metrics), selectinload(models.Athlete.equipment)
         )
         .filter(models.Athlete.athlete_id == athlete_id)
         .first()
     )
 
 
+def get_athlete_counts(db: Session, athlete_id: int) -> dict:
+    """Counts the athlete's activities, metrics and equipment in one query."""
+
+    def count(model):
+        return (
+            select(func.count())
+            .select_from(model)
+            .where(model.athlete_id == athlete_id)
+            .scalar_subquery()
+        )
+
+    row = db.execute(
+        select(
+            count(models.Activity).label("activities"),
+            count(models.AthleteMetric).label("metrics"),
+            count(models.Equipment).label("equipment"),
+        )
+    ).one()
+    return dict(row._mapping)
+
+
 def update_athlete(db: Session, athlete_id: int, athlete_data: schemas.AthleteUpdate):
     db_athlete = (
         db.query(models.Athlete).filter(models.Athlete.athlete_id == athlete_id).first()
@@ -116,4 +163,5 @@ def delete_athlete(db: Session, athlete_id: int) -> bool:
 
     db.delete(db_athlete)
     db.commit()
+    services.thresholds.invalidate_threshold_timeline(athlete_id)
     return True
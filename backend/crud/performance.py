@@ -1,10 +1,15 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
-from datetime import datetime, timezone, date
+from collections import defaultdict
+
+from sqlalchemy.orm import Session, attributes
+from sqlalchemy import Date, delete, desc, event, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import datetime, timezone, date, timedelta
 from typing import Optional
+import numpy as np
 
 import models
 import schemas
+import services
 
 
 def create_athlete_metric(
@@ -14,6 +19,7 @@ def create_athlete_metric(
     db.add(db_metric)
     db.commit()
     db.refresh(db_metric)
+    services.thresholds.invalidate_threshold_timeline(athlete_id)
     return db_metric
 
 
@@ -57,6 +63,32 @@ def upsert_daily_metric(
     return db_metric
 
 
+def bulk_upsert_daily_metrics(db: Session, athlete_id: int, metrics: list[dict]):
+    """
+    Creates or updates many DailyPerformanceMetric entries in a single
+    INSERT ... ON CONFLICT (athlete_id, date) DO UPDATE statement.
+    """
+    if not metrics:
+        return
+
+    dialect_insert = (
+        postgresql.insert
+        if db.get_bind().dialect.name == "postgresql"
+        else sqlite.insert
+    )
+    statement = dialect_insert(models.DailyPerformanceMetric).values(
+        [{**metric, "athlete_id": athlete_id} for metric in metrics]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["athlete_id", "date"],
+        set_={
+            column: statement.excluded[column]
+            for column in ("ctl", "atl", "tsb", "tss", "if_avg")
+        },
+    )
+    db.execute(statement)
+
+
 def get_latest_weight(
     db: Session, athlete_id: int, activity_date: Optional[datetime] = None
 ):
@@ -117,6 +149,23 @@ def get_latest_ftp(
     )
 
 
+def get_metric_timeline(db: Session, athlete_id: int):
+    """
+    All (metric_type, date_established, value) rows of an athlete, ordered by
+    date; backs the threshold cache in services.thresholds.
+    """
+    return (
+        db.query(
+            models.AthleteMetric.metric_type,
+            models.AthleteMetric.date_established,
+            models.AthleteMetric.value,
+        )
+        .filter(models.AthleteMetric.athlete_id == athlete_id)
+        .order_by(models.AthleteMetric.date_established, models.AthleteMetric.metric_id)
+        .all()
+    )
+
+
 def get_metric_history(db: Session, athlete_id: int, metric_type: models.MetricType):
     """Retrieves the historical progression of a specific metric for an athlete."""
     return (
@@ -128,23 +177,173 @@ def get_metric_history(db: Session, athlete_id: int, metric_type: models.MetricT
     )
 
 
+# Activity columns the daily_activity_loads rollup is computed from
+DAILY_LOAD_SOURCE_COLUMNS = (
+    "athlete_id",
+    "start_time",
+    "tss",
+    "trimp",
+    "perceived_strain_score",
+    "unified_training_load",
+    "intensity_factor",
+    "total_distance",
+    "total_moving_time",
+)
+
+
+def refresh_daily_activity_loads(
+    db: Session,
+    athlete_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+):
+    """
+    Recomputes an athlete's DailyActivityLoad rows for the days
+    [start_date, end_date] (all days when omitted) from the activities table.
+    """
+    activity = models.Activity
+    daily_load = models.DailyActivityLoad
+    activity_date = func.date(activity.start_time, type_=Date)
+
+    rollup = (
+        select(
+            activity.athlete_id,
+            activity_date,
+            func.count(activity.activity_id),
+            func.sum(activity.tss),
+            func.sum(activity.trimp),
+            func.sum(activity.perceived_strain_score),
+            func.sum(activity.unified_training_load),
+            func.avg(activity.intensity_factor),
+            func.sum(activity.total_distance),
+            func.sum(activity.total_moving_time),
+        )
+        .where(activity.athlete_id == athlete_id)
+        .group_by(activity.athlete_id, activity_date)
+    )
+    active_days = select(activity_date).where(activity.athlete_id == athlete_id)
+    emptied_rows = delete(daily_load).where(daily_load.athlete_id == athlete_id)
+    if start_date is not None:
+        rollup = rollup.where(activity.start_time >= start_date)
+        active_days = active_days.where(activity.start_time >= start_date)
+        emptied_rows = emptied_rows.where(daily_load.date >= start_date)
+    if end_date is not None:
+        next_day = end_date + timedelta(days=1)
+        rollup = rollup.where(activity.start_time < next_day)
+        active_days = active_days.where(activity.start_time < next_day)
+        emptied_rows = emptied_rows.where(daily_load.date <= end_date)
+
+    # Upsert rather than delete + insert: a concurrent transaction refreshing
+    # the same day cannot see this one's new row, and a plain insert would
+    # then fail on the unique (athlete_id, date) constraint
+    dialect_insert = (
+        postgresql.insert
+        if db.get_bind().dialect.name == "postgresql"
+        else sqlite.insert
+    )
+    value_columns = [
+        "activity_count",
+        "total_tss",
+        "total_trimp",
+        "total_pss",
+        "total_load",
+        "avg_intensity_factor",
+        "total_distance",
+        "total_moving_time",
+    ]
+    statement = dialect_insert(daily_load).from_select(
+        ["athlete_id", "date", *value_columns], rollup
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["athlete_id", "date"],
+        set_={column: statement.excluded[column] for column in value_columns},
+    )
+    db.execute(statement)
+    # Days left without activities
+    db.execute(emptied_rows.where(daily_load.date.not_in(active_days)))
+
+
+def _touched_activity_days(activity: models.Activity) -> set[tuple[int, date]]:
+    """The (athlete_id, day) pairs an activity counts towards, before and after."""
+    athlete_ids = attributes.get_history(activity, "athlete_id").sum()
+    start_times = attributes.get_history(activity, "start_time").sum()
+    return {
+        (athlete_id, start_time.date())
+        for athlete_id in athlete_ids
+        for start_time in start_times
+        if athlete_id is not None and start_time is not None
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_daily_activity_loads(session: Session, flush_context):
+    """
+    Keeps daily_activity_loads current: after every flush that inserts,
+    deletes or changes the load of an activity, the affected days of each
+    athlete are recomputed in the same transaction.
+    """
+    touched = set()
+    for instance in (*session.new, *session.deleted):
+        if isinstance(instance, models.Activity):
+            touched |= _touched_activity_days(instance)
+    for instance in session.dirty:
+        if isinstance(instance, models.Activity) and any(
+            attributes.get_history(instance, column).has_changes()
+            for column in DAILY_LOAD_SOURCE_COLUMNS
+        ):
+            touched |= _touched_activity_days(instance)
+
+    days_by_athlete = defaultdict(list)
+    for athlete_id, day in touched:
+        days_by_athlete[athlete_id].append(day)
+    for athlete_id, days in days_by_athlete.items():
+        refresh_daily_activity_loads(session, athlete_id, min(days), max(days))
+
+
 def get_daily_activity_summary(db: Session, athlete_id: int, for_date: date):
     """
-    Aggregates unified_training_load and calculates average IF for all activities on a specific date.
+    Total unified_training_load and average IF of all activities on a specific
+    date, from the daily rollup.
     """
     summary = (
         db.query(
-            func.sum(models.Activity.unified_training_load).label("total_load"),
-            func.avg(models.Activity.intensity_factor).label("avg_if"),
+            models.DailyActivityLoad.total_load,
+            models.DailyActivityLoad.avg_intensity_factor,
         )
         .filter(
-            models.Activity.athlete_id == athlete_id,
-            func.date(models.Activity.start_time) == for_date,
+            models.DailyActivityLoad.athlete_id == athlete_id,
+            models.DailyActivityLoad.date == for_date,
         )
-        .one()
+        .first()
     )
+    if summary is None:
+        return {"total_tss": 0, "avg_if": 0.0}
+    return {
+        "total_tss": summary.total_load or 0,
+        "avg_if": summary.avg_intensity_factor or 0.0,
+    }
 
-    return {"total_tss": summary.total_load or 0, "avg_if": summary.avg_if or 0.0}
+
+def get_daily_activity_loads(
+    db: Session, athlete_id: int, start_date: date, end_date: date
+):
+    """
+    Total unified_training_load and average IF per day for a whole date range,
+    from the daily rollup. Days without activities are not returned.
+    """
+    return (
+        db.query(
+            models.DailyActivityLoad.date,
+            models.DailyActivityLoad.total_load,
+            models.DailyActivityLoad.avg_intensity_factor.label("avg_if"),
+        )
+        .filter(
+            models.DailyActivityLoad.athlete_id == athlete_id,
+            models.DailyActivityLoad.date >= start_date,
+            models.DailyActivityLoad.date <= end_date,
+        )
+        .all()
+    )
 
 
 def get_latest_daily_metric(db: Session, athlete_id: int):
@@ -168,6 +367,61 @@ def get_latest_daily_metric_before_date(db: Session, athlete_id: int, date: date
     )
 
 
+def get_latest_daily_metrics_before_date(
+    db: Session, athlete_ids: list[int], date: date
+):
+    """
+    The most recent DailyPerformanceMetric before a given date for each of
+    several athletes, in one query. Athletes without one are left out.
+    """
+    latest = (
+        db.query(
+            models.DailyPerformanceMetric.athlete_id,
+            func.max(models.DailyPerformanceMetric.date).label("date"),
+        )
+        .filter(models.DailyPerformanceMetric.athlete_id.in_(athlete_ids))
+        .filter(models.DailyPerformanceMetric.date < date)
+        .group_by(models.DailyPerformanceMetric.athlete_id)
+        .subquery()
+    )
+    return (
+        db.query(models.DailyPerformanceMetric)
+        .join(
+            latest,
+            (models.DailyPerformanceMetric.athlete_id == latest.c.athlete_id)
+            & (models.DailyPerformanceMetric.date == latest.c.date),
+        )
+        .all()
+    )
+
+
+def get_pmc_rows_with_seed(
+    db: Session, athlete_id: int, start_date: date, end_date: date
+):
+    """
+    The stored PMC rows of a date range plus the last row before it (the
+    state the range starts from), as plain tuples ordered by date in one query.
+    """
+    metric = models.DailyPerformanceMetric
+    seed_date = (
+        db.query(func.max(metric.date))
+        .filter(metric.athlete_id == athlete_id, metric.date < start_date)
+        .scalar_subquery()
+    )
+    return (
+        db.query(
+            metric.id, metric.date, metric.ctl, metric.atl, metric.tss, metric.if_avg
+        )
+        .filter(
+            metric.athlete_id == athlete_id,
+            metric.date >= func.coalesce(seed_date, start_date),
+            metric.date <= end_date,
+        )
+        .order_by(metric.date)
+        .all()
+    )
+
+
 def get_pmc_data(db: Session, athlete_id: int, start_date: date, end_date: date):
     """Retrieves all DailyPerformanceMetric entries for an athlete within a date range."""
     return (
@@ -180,19 +434,22 @@ def get_pmc_data(db: Session, athlete_id: int, start_date: date, end_date: date)
     )
 
 
-def get_power_records_for_date_range(
+def get_power_curves_for_date_range(
     db: Session, athlete_id: int, start_date: date, end_date: date
-):
-    """Fetches all power data points for an athlete within a given date range."""
-    return (
-        db.query(models.ActivityRecord.power)
+) -> list[np.ndarray]:
+    """
+    Fetches the precomputed mean-max power curve of every activity for an
+    athlete within a given date range.
+    """
+    curves = (
+        db.query(models.ActivityPowerCurve)
         .join(models.Activity)
         .filter(models.Activity.athlete_id == athlete_id)
         .filter(models.Activity.start_time >= start_date)
         .filter(models.Activity.start_time <= end_date)
-        .order_by(models.ActivityRecord.timestamp)
         .all()
     )
+    return [curve.to_array() for curve in curves]
 
 
 def get_daily_aggregates_for_metric(
@@ -201,29 +458,27 @@ def get_daily_aggregates_for_metric(
     start_date: date,
     end_date: date,
     metric_column: str,
-    agg_func,
 ):
     """
-    Fetches and aggregates a specific metric (TSS, IF, etc.) by day for a given date range.
-    Accepts a generic aggregation function (e.g., func.sum, func.avg).
+    Fetches a daily rollup column (e.g. total_tss, avg_intensity_factor) for
+    the days of a date range that have a value.
     """
-    metric_attr = getattr(models.Activity, metric_column, None)
+    metric_attr = getattr(models.DailyActivityLoad, metric_column, None)
     if metric_attr is None:
         raise ValueError(f"Invalid metric column: {metric_column}")
 
     return (
         db.query(
-            func.date(models.Activity.start_time).label("date"),
-            agg_func(metric_attr).label("total_value"),
+            models.DailyActivityLoad.date,
+            metric_attr.label("total_value"),
         )
         .filter(
-            models.Activity.athlete_id == athlete_id,
-            func.date(models.Activity.start_time) >= start_date,
-            func.date(models.Activity.start_time) <= end_date,
+            models.DailyActivityLoad.athlete_id == athlete_id,
+            models.DailyActivityLoad.date >= start_date,
+            models.DailyActivityLoad.date <= end_date,
             metric_attr.isnot(None),
         )
-        .group_by(func.date(models.Activity.start_time))
-        .order_by(func.date(models.Activity.start_time))
+        .order_by(models.DailyActivityLoad.date)
         .all()
     )
 
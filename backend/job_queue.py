@@ -0,0 +1,6 @@
+from redis import Redis
+from rq import Queue
+
+# Shared Redis connection and the "default" RQ queue consumed by worker.py
+redis_conn = Redis(host="redis", port=6379, db=0)
+queue = Queue("default", connection=redis_conn)
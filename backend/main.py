@@ -4,7 +4,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import models
 from database import engine
-from routers import athletes, activities, performance, equipment, strava
+from routers import athletes, activities, performance, planning, equipment, strava, jobs
 
 # This command ensures that all tables are created in the database
 # based on the models defined in models.py when the application starts.
@@ -34,5 +34,7 @@ app.add_middleware(
 app.include_router(athletes.router)
 app.include_router(activities.router)
 app.include_router(performance.router)
+app.include_router(planning.router)
 app.include_router(equipment.router)
 app.include_router(strava.router)
+app.include_router(jobs.router)
@@ -0,0 +1,44 @@
+from database import engine
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import models
+
+# Pack the per-second rows of activity_records into one activity_streams row
+# per activity, then drop the old table.
+models.ActivityStream.__table__.create(bind=engine, checkfirst=True)
+
+with Session(engine) as db:
+    try:
+        activities = db.execute(
+            text(
+                "SELECT a.activity_id, a.start_time FROM activities a "
+                "WHERE EXISTS (SELECT 1 FROM activity_records r "
+                "WHERE r.activity_id = a.activity_id) "
+                "AND NOT EXISTS (SELECT 1 FROM activity_streams s "
+                "WHERE s.activity_id = a.activity_id)"
+            )
+        ).all()
+
+        for activity_id, start_time in activities:
+            rows = db.execute(
+                text(
+                    "SELECT timestamp, power, heart_rate, cadence, speed, "
+                    "latitude, longitude, altitude FROM activity_records "
+                    "WHERE activity_id = :activity_id ORDER BY timestamp"
+                ),
+                {"activity_id": activity_id},
+            ).mappings()
+            db_stream = models.ActivityStream.from_records(
+                [dict(row) for row in rows], start_time=start_time
+            )
+            db_stream.activity_id = activity_id
+            db.add(db_stream)
+            db.commit()
+
+        db.execute(text("DROP TABLE activity_records;"))
+        db.commit()
+        print(f"Migrated records of {len(activities)} activities to streams")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
@@ -0,0 +1,17 @@
+from database import engine
+from sqlalchemy import text
+
+# Composite index behind the per-athlete activity listings, which filter on
+# athlete_id, range-filter start_time and page by (start_time, activity_id)
+with engine.connect() as conn:
+    try:
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_activities_athlete_id_start_time "
+                "ON activities (athlete_id, start_time);"
+            )
+        )
+        conn.commit()
+        print("Index added successfully")
+    except Exception as e:
+        print(f"Error: {e}")
@@ -0,0 +1,28 @@
+from database import engine
+from sqlalchemy import text
+
+# Composite indexes for the hot per-athlete query paths; see
+# benchmark_query_plans.py for the plans before and after. The unique
+# (athlete_id, date) constraint on daily_performance_metrics is added by
+# migrate_add_daily_metric_unique.py and the (athlete_id, start_time) index on
+# activities by migrate_add_activity_start_time_index.py.
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_athlete_metrics_athlete_id_type_date "
+    "ON athlete_metrics (athlete_id, metric_type, date_established);",
+    "CREATE INDEX IF NOT EXISTS ix_activities_strava_activity_id "
+    "ON activities (strava_activity_id);",
+    "CREATE INDEX IF NOT EXISTS ix_activity_laps_activity_id "
+    "ON activity_laps (activity_id);",
+    "CREATE INDEX IF NOT EXISTS ix_potential_markers_athlete_id_status "
+    "ON potential_markers (athlete_id, status);",
+]
+
+with engine.connect() as conn:
+    try:
+        for statement in INDEXES:
+            conn.execute(text(statement))
+        conn.execute(text("ANALYZE;"))
+        conn.commit()
+        print(f"{len(INDEXES)} indexes added successfully")
+    except Exception as e:
+        print(f"Error: {e}")
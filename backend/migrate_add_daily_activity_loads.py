@@ -0,0 +1,20 @@
+from database import engine
+from sqlalchemy.orm import Session
+
+import crud
+import models
+
+# Create the daily_activity_loads rollup and fill it from the existing
+# activities; from then on it is maintained on every activity write
+models.DailyActivityLoad.__table__.create(bind=engine, checkfirst=True)
+
+with Session(engine) as db:
+    try:
+        athlete_ids = [row.athlete_id for row in db.query(models.Athlete.athlete_id)]
+        for athlete_id in athlete_ids:
+            crud.refresh_daily_activity_loads(db, athlete_id)
+        db.commit()
+        print(f"Daily activity loads built for {len(athlete_ids)} athletes")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
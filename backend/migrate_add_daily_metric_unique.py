@@ -0,0 +1,25 @@
+from database import engine
+from sqlalchemy import text
+
+# Remove duplicate daily metrics and add a unique (athlete_id, date) constraint,
+# which the bulk PMC upsert (INSERT ... ON CONFLICT) relies on
+with engine.connect() as conn:
+    try:
+        conn.execute(
+            text(
+                "DELETE FROM daily_performance_metrics a "
+                "USING daily_performance_metrics b "
+                "WHERE a.athlete_id = b.athlete_id AND a.date = b.date "
+                "AND a.id < b.id;"
+            )
+        )
+        conn.execute(
+            text(
+                "ALTER TABLE daily_performance_metrics "
+                "ADD CONSTRAINT uq_daily_metrics_athlete_date UNIQUE (athlete_id, date);"
+            )
+        )
+        conn.commit()
+        print("Unique constraint added successfully")
+    except Exception as e:
+        print(f"Error: {e}")
@@ -0,0 +1,26 @@
+from database import engine
+from sqlalchemy.orm import Session, joinedload
+
+import models
+from services import activity_processing
+
+# Create the activity_power_curves table and compute a curve for every
+# activity that already has a stored stream
+models.ActivityPowerCurve.__table__.create(bind=engine, checkfirst=True)
+
+with Session(engine) as db:
+    try:
+        activities = (
+            db.query(models.Activity)
+            .options(joinedload(models.Activity.stream))
+            .filter(models.Activity.stream.has())
+            .filter(~models.Activity.power_curve.has())
+            .all()
+        )
+        for activity in activities:
+            activity_processing.update_power_curve(activity)
+            db.commit()
+        print(f"Power curves computed for {len(activities)} activities")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
@@ -4,11 +4,17 @@ from sqlalchemy.orm import declarative_base
 Base = declarative_base()
 
 # Import all models so they are registered with the Base and can be imported from the package
-from .activity import Activity, ActivityRecord, ActivityLap  # noqa: E402
+from .activity import (  # noqa: E402
+    Activity,
+    ActivityLap,
+    ActivityPowerCurve,
+    ActivityStream,
+)
 from .athlete import Athlete  # noqa: E402
 from .equipment import Equipment, EquipmentType  # noqa: E402
 from .performance import (  # noqa: E402
     AthleteMetric,
+    DailyActivityLoad,
     DailyPerformanceMetric,
     MetricType,
     PotentialPerformanceMarker,
@@ -18,12 +24,14 @@ from .performance import (  # noqa: E402
 __all__ = [
     "Base",
     "Activity",
-    "ActivityRecord",
+    "ActivityStream",
     "ActivityLap",
+    "ActivityPowerCurve",
     "Athlete",
     "Equipment",
     "EquipmentType",
     "AthleteMetric",
+    "DailyActivityLoad",
     "DailyPerformanceMetric",
     "MetricType",
     "PotentialPerformanceMarker",
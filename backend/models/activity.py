@@ -1,8 +1,58 @@
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, BigInteger
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+)
 from sqlalchemy.orm import relationship
 
 from . import Base
 
+# Channels stored in an ActivityStream and the dtype each one is packed as.
+# "time" holds the offset in seconds from the activity start; every other
+# channel is a float array where NaN marks a missing sample.
+STREAM_CHANNELS = {
+    "time": np.int32,
+    "power": np.float32,
+    "heart_rate": np.float32,
+    "cadence": np.float32,
+    "speed": np.float32,
+    "latitude": np.float64,
+    "longitude": np.float64,
+    "altitude": np.float32,
+}
+
+# Channels exposed as integers in API responses
+INTEGER_CHANNELS = {"power", "heart_rate", "cadence"}
+# Decimals kept when serialising float32 channels (speed, altitude)
+FLOAT32_DECIMALS = 3
+
+
+def channel_to_list(name: str, values: np.ndarray) -> list:
+    """
+    Converts decoded channel values to a JSON-friendly list: ints for integer
+    channels, floats otherwise, and None for missing samples.
+    """
+    if name == "time" or name in INTEGER_CHANNELS:
+        column = np.nan_to_num(values).round().astype(np.int64).tolist()
+    elif values.dtype == np.float32:
+        # Drop the float32 -> float64 widening noise (8.001000404 -> 8.001)
+        column = values.astype(np.float64).round(FLOAT32_DECIMALS).tolist()
+    else:
+        column = values.astype(np.float64).tolist()
+    for index in np.flatnonzero(np.isnan(values)):
+        column[index] = None
+    return column
+
 
 class Activity(Base):
     """
@@ -10,6 +60,11 @@ class Activity(Base):
     """
 
     __tablename__ = "activities"
+    __table_args__ = (
+        # Serves per-athlete listings ordered by start time and date ranges
+        Index("ix_activities_athlete_id_start_time", "athlete_id", "start_time"),
+        Index("ix_activities_strava_activity_id", "strava_activity_id"),
+    )
 
     activity_id = Column(Integer, primary_key=True, index=True)
     athlete_id = Column(Integer, ForeignKey("athletes.athlete_id"), nullable=False)
@@ -55,8 +110,11 @@ class Activity(Base):
 
     # Relationships
     athlete = relationship("Athlete", back_populates="activities")
-    records = relationship(
-        "ActivityRecord", back_populates="activity", cascade="all, delete-orphan"
+    stream = relationship(
+        "ActivityStream",
+        back_populates="activity",
+        uselist=False,
+        cascade="all, delete-orphan",
     )
     bike = relationship("Equipment", foreign_keys=[bike_id])
     shoe = relationship("Equipment", foreign_keys=[shoe_id])
@@ -71,27 +129,144 @@ class Activity(Base):
         cascade="all, delete-orphan",
     )
 
+    power_curve = relationship(
+        "ActivityPowerCurve",
+        back_populates="activity",
+        uselist=False,
+        cascade="all, delete-orphan",
+    )
+
+    @property
+    def records(self) -> list[dict]:
+        """Second-by-second samples expanded from the columnar stream."""
+        if self.stream is None:
+            return []
+        return self.stream.to_records(self.start_time)
+
+
+class ActivityStream(Base):
+    """
+    Detailed, second-by-second time-series data for an activity, stored
+    column-wise: one zlib-compressed typed array per channel.
+    """
+
+    __tablename__ = "activity_streams"
+
+    activity_id = Column(
+        Integer, ForeignKey("activities.activity_id"), primary_key=True
+    )
+    sample_count = Column(Integer, nullable=False, default=0)
+    time = Column(LargeBinary, nullable=False)
+    power = Column(LargeBinary, nullable=True)
+    heart_rate = Column(LargeBinary, nullable=True)
+    cadence = Column(LargeBinary, nullable=True)
+    speed = Column(LargeBinary, nullable=True)
+    latitude = Column(LargeBinary, nullable=True)
+    longitude = Column(LargeBinary, nullable=True)
+    altitude = Column(LargeBinary, nullable=True)
+
+    # Relationship
+    activity = relationship("Activity", back_populates="stream")
+
+    @classmethod
+    def from_arrays(cls, channels: dict[str, np.ndarray]) -> "ActivityStream":
+        """
+        Packs per-channel arrays into a stream. Channels that are absent or
+        contain no valid samples are stored as NULL.
+        """
+        stream = cls(sample_count=len(channels["time"]))
+        for name in STREAM_CHANNELS:
+            if channels.get(name) is not None:
+                stream.set_channel(name, channels[name])
+        return stream
+
+    @classmethod
+    def from_records(
+        cls, records: list[dict], start_time: datetime
+    ) -> "ActivityStream":
+        """Packs a list of record dicts (one per sample) into a stream."""
+        channels = {
+            "time": [
+                int((record["timestamp"] - start_time).total_seconds())
+                for record in records
+            ]
+        }
+        for name in STREAM_CHANNELS:
+            if name == "time":
+                continue
+            channels[name] = [
+                np.nan if record.get(name) is None else record[name]
+                for record in records
+            ]
+        return cls.from_arrays(channels)
+
+    def channel(self, name: str) -> np.ndarray:
+        """
+        Decodes a single channel. Missing channels come back as an all-NaN
+        array of the stream's length.
+        """
+        dtype = STREAM_CHANNELS[name]
+        blob = getattr(self, name)
+        if blob is None:
+            return np.full(self.sample_count or 0, np.nan, dtype=dtype)
+        return np.frombuffer(zlib.decompress(blob), dtype=dtype)
 
-class ActivityRecord(Base):
+    def set_channel(self, name: str, values: np.ndarray) -> None:
+        """Replaces a single channel, keeping the stream's sample count."""
+        values = np.asarray(values, dtype=STREAM_CHANNELS[name])
+        if len(values) != self.sample_count:
+            raise ValueError(
+                f"Stream channel '{name}' has {len(values)} samples, "
+                f"expected {self.sample_count}"
+            )
+        if name != "time" and np.isnan(values).all():
+            setattr(self, name, None)
+        else:
+            setattr(self, name, zlib.compress(values.tobytes()))
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """Decodes every channel of the stream."""
+        return {name: self.channel(name) for name in STREAM_CHANNELS}
+
+    def to_records(self, start_time: datetime) -> list[dict]:
+        """Expands the stream into one dict per sample, with None for gaps."""
+        channels = self.to_arrays()
+        columns = {}
+        for name, values in channels.items():
+            if name == "time":
+                continue
+            columns[name] = channel_to_list(name, values)
+
+        timestamps = [
+            start_time + timedelta(seconds=offset)
+            for offset in channels["time"].tolist()
+        ]
+        return [
+            {"timestamp": timestamp, **{name: columns[name][i] for name in columns}}
+            for i, timestamp in enumerate(timestamps)
+        ]
+
+
+class ActivityPowerCurve(Base):
     """
-    Detailed, second-by-second time-series data for an activity.
+    Precomputed mean-max power curve of an activity: the best average power
+    for each duration of services.calculations.MMP_CURVE_DURATIONS, packed as
+    a float32 array (NaN where the activity is shorter than the duration).
     """
 
-    __tablename__ = "activity_records"
+    __tablename__ = "activity_power_curves"
 
-    record_id = Column(Integer, primary_key=True, index=True)
-    activity_id = Column(Integer, ForeignKey("activities.activity_id"), nullable=False)
-    timestamp = Column(DateTime, nullable=False, index=True)
-    power = Column(Integer)
-    heart_rate = Column(Integer)
-    cadence = Column(Integer)
-    speed = Column(Float)
-    latitude = Column(Float)
-    longitude = Column(Float)
-    altitude = Column(Float)
+    activity_id = Column(
+        Integer, ForeignKey("activities.activity_id"), primary_key=True
+    )
+    power = Column(LargeBinary, nullable=False)
 
     # Relationship
-    activity = relationship("Activity", back_populates="records")
+    activity = relationship("Activity", back_populates="power_curve")
+
+    def to_array(self) -> np.ndarray:
+        """Decodes the best average power per curve duration."""
+        return np.frombuffer(self.power, dtype=np.float32)
 
 
 class ActivityLap(Base):
@@ -102,7 +277,9 @@ class ActivityLap(Base):
     __tablename__ = "activity_laps"
 
     lap_id = Column(Integer, primary_key=True, index=True)
-    activity_id = Column(Integer, ForeignKey("activities.activity_id"), nullable=False)
+    activity_id = Column(
+        Integer, ForeignKey("activities.activity_id"), nullable=False, index=True
+    )
     lap_number = Column(Integer, nullable=False)
     duration = Column(Integer)  # seconds
     distance = Column(Float)  # meters
@@ -42,6 +42,9 @@ class Athlete(Base):
     daily_metrics = relationship(
         "DailyPerformanceMetric", back_populates="athlete", cascade="all, delete-orphan"
     )
+    daily_loads = relationship(
+        "DailyActivityLoad", back_populates="athlete", cascade="all, delete-orphan"
+    )
     potential_markers = relationship(
         "PotentialPerformanceMarker",
         back_populates="athlete",
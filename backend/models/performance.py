@@ -6,7 +6,9 @@ from sqlalchemy import (
     Enum as SQLAlchemyEnum,
     Float,
     ForeignKey,
+    Index,
     Integer,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
 
@@ -32,6 +34,15 @@ class AthleteMetric(Base):
     """
 
     __tablename__ = "athlete_metrics"
+    __table_args__ = (
+        # Serves the "latest FTP/LTHR/weight on or before a date" lookups
+        Index(
+            "ix_athlete_metrics_athlete_id_type_date",
+            "athlete_id",
+            "metric_type",
+            "date_established",
+        ),
+    )
 
     metric_id = Column(Integer, primary_key=True, index=True)
     athlete_id = Column(Integer, ForeignKey("athletes.athlete_id"), nullable=False)
@@ -51,6 +62,9 @@ class DailyPerformanceMetric(Base):
     """
 
     __tablename__ = "daily_performance_metrics"
+    __table_args__ = (
+        UniqueConstraint("athlete_id", "date", name="uq_daily_metrics_athlete_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     athlete_id = Column(Integer, ForeignKey("athletes.athlete_id"), nullable=False)
@@ -65,6 +79,38 @@ class DailyPerformanceMetric(Base):
     athlete = relationship("Athlete", back_populates="daily_metrics")
 
 
+class DailyActivityLoad(Base):
+    """
+    Per-athlete per-day rollup of activity loads, kept current on every
+    activity write (see crud.refresh_daily_activity_loads) so that the PMC and
+    workload views read one row per day instead of grouping activities.
+    """
+
+    __tablename__ = "daily_activity_loads"
+    __table_args__ = (
+        UniqueConstraint(
+            "athlete_id", "date", name="uq_daily_activity_loads_athlete_date"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    athlete_id = Column(Integer, ForeignKey("athletes.athlete_id"), nullable=False)
+    date = Column(Date, nullable=False)
+    activity_count = Column(Integer, nullable=False, default=0)
+    # Sums are NULL (and the average is NULL) when no activity of the day has
+    # a value, so days without e.g. TRIMP are distinguishable from zero TRIMP.
+    total_tss = Column(Integer, nullable=True)
+    total_trimp = Column(Integer, nullable=True)
+    total_pss = Column(Integer, nullable=True)
+    total_load = Column(Integer, nullable=True)
+    avg_intensity_factor = Column(Float, nullable=True)
+    total_distance = Column(Float, nullable=True)  # In meters
+    total_moving_time = Column(Integer, nullable=True)  # In seconds
+
+    # Relationship
+    athlete = relationship("Athlete", back_populates="daily_loads")
+
+
 class PotentialPerformanceMarker(Base):
     """
     Stores potential new FTP or LTHR values detected from activities.
@@ -72,6 +118,9 @@ class PotentialPerformanceMarker(Base):
     """
 
     __tablename__ = "potential_markers"
+    __table_args__ = (
+        Index("ix_potential_markers_athlete_id_status", "athlete_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     athlete_id = Column(Integer, ForeignKey("athletes.athlete_id"), nullable=False)
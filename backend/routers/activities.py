@@ -1,11 +1,23 @@
 import os
+import shutil
 import uuid
+import zipfile
 import fitparse
+import numpy as np
 import requests
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+)
 from sqlalchemy.orm import Session
 from fastapi.responses import FileResponse
-from typing import List, Optional, Tuple
+from typing import BinaryIO, List, Literal, Optional
 
 import crud
 import schemas
@@ -13,12 +25,25 @@ import services
 import models
 from services.strava_service import StravaService
 from database import get_db
-from datetime import datetime, timedelta
+from job_queue import queue
+from datetime import date, datetime, timedelta
 
 router = APIRouter(
     tags=["Activities"],
 )
 
+FIT_FILES_DIR = "/app/fit_files"
+BULK_IMPORT_JOB_TIMEOUT = 6 * 60 * 60  # seconds
+
+
+def _save_fit_file(source: BinaryIO) -> str:
+    """Copies a FIT file into the shared fit_files directory under a unique name."""
+    os.makedirs(FIT_FILES_DIR, exist_ok=True)
+    file_path = os.path.join(FIT_FILES_DIR, f"{uuid.uuid4()}.fit")
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(source, buffer)
+    return file_path
+
 
 @router.get("/activities/recent", response_model=List[schemas.RecentActivityResponse])
 def read_recent_activities(limit: int = 20, db: Session = Depends(get_db)):
@@ -68,39 +93,49 @@ def read_recent_activities(limit: int = 20, db: Session = Depends(get_db)):
     return result
 
 
-@router.get(
-    "/athlete/{athlete_id}/activities",
-    response_model=Tuple[List[schemas.ActivitySummary], int],
-)
+@router.get("/athlete/{athlete_id}/activities", response_model=schemas.ActivityPage)
 def read_athlete_activities(
     athlete_id: int,
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = Query(
+        None, description="next_cursor of the previous page; omit for the first page"
+    ),
+    limit: int = Query(100, ge=1, le=1000),
     sport: Optional[str] = None,
     sub_sport: Optional[str] = None,
     ride_type: Optional[str] = None,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    include_total: bool = Query(
+        False, description="Also count all matching activities (extra query)"
+    ),
     db: Session = Depends(get_db),
 ):
-    """Returns a list of all activities (summary view) for a given athlete."""
-    db_athlete = crud.get_athlete(db, athlete_id=athlete_id)
-    if db_athlete is None:
+    """
+    Returns one page of an athlete's activities (summary view), newest first.
+    Follow next_cursor to page through the rest.
+    """
+    if not crud.athlete_exists(db, athlete_id=athlete_id):
         raise HTTPException(status_code=404, detail="Athlete not found")
 
-    activities, total_count = crud.get_activities_by_athlete(
-        db,
-        athlete_id=athlete_id,
-        skip=skip,
-        limit=limit,
-        sport=sport,
-        sub_sport=sub_sport,
-        ride_type=ride_type,
-        start_date=start_date,
-        end_date=end_date,
-    )
+    try:
+        activities, next_cursor, total_count = crud.get_activities_by_athlete(
+            db,
+            athlete_id=athlete_id,
+            cursor=cursor,
+            limit=limit,
+            sport=sport,
+            sub_sport=sub_sport,
+            ride_type=ride_type,
+            start_date=start_date,
+            end_date=end_date,
+            include_total=include_total,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return activities, total_count
+    return schemas.ActivityPage(
+        activities=activities, next_cursor=next_cursor, total_count=total_count
+    )
 
 
 @router.get(
@@ -113,13 +148,12 @@ def read_visual_activity_log(
     sport: Optional[str] = None,
     sub_sport: Optional[str] = None,
     ride_type: Optional[str] = None,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
     db: Session = Depends(get_db),
 ):
     """Returns activities grouped by weeks for visual bubble chart display."""
-    db_athlete = crud.get_athlete(db, athlete_id=athlete_id)
-    if db_athlete is None:
+    if not crud.athlete_exists(db, athlete_id=athlete_id):
         raise HTTPException(status_code=404, detail="Athlete not found")
 
     # Validate metric parameter
@@ -131,11 +165,10 @@ def read_visual_activity_log(
         )
 
     # Get activities with filters
-    activities, _ = crud.get_activities_by_athlete(
+    activities, _, _ = crud.get_activities_by_athlete(
         db,
         athlete_id=athlete_id,
-        skip=0,
-        limit=10000,  # Get all activities for the period
+        limit=None,  # Get all activities for the period
         sport=sport,
         sub_sport=sub_sport,
         ride_type=ride_type,
@@ -153,13 +186,136 @@ def read_visual_activity_log(
 
 @router.get("/activity/{activity_id}", response_model=schemas.Activity)
 def read_activity(activity_id: int, db: Session = Depends(get_db)):
-    """Returns all details for a single activity, including its time-series records."""
+    """
+    Returns the summary, laps and equipment of a single activity. The time-series
+    data is served separately by /activity/{activity_id}/streams.
+    """
     db_activity = crud.get_activity(db, activity_id=activity_id)
     if db_activity is None:
         raise HTTPException(status_code=404, detail="Activity not found")
     return db_activity
 
 
+@router.get("/activity/{activity_id}/streams", response_model=schemas.ActivityStreams)
+def read_activity_streams(
+    activity_id: int,
+    response: Response,
+    channels: Optional[str] = Query(
+        None,
+        description="Comma-separated channels, e.g. power,heart_rate (default: all)",
+    ),
+    start: Optional[int] = Query(
+        None, ge=0, description="First second to include, as offset from the start"
+    ),
+    end: Optional[int] = Query(
+        None, ge=0, description="Last second to include, as offset from the start"
+    ),
+    max_points: Optional[int] = Query(
+        None,
+        ge=2,
+        description="Downsample to at most this many samples, e.g. the chart width in pixels",
+    ),
+    method: Literal["lttb", "minmax", "uniform"] = Query(
+        "lttb", description="Downsampling method used with max_points"
+    ),
+    accept: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Returns the time-series channels of an activity column-wise, optionally
+    restricted to some channels and a time range and downsampled for charting.
+    The time channel (seconds from the start) is always included.
+
+    Downsampling keeps the channels aligned: "lttb" (Largest-Triangle-Three-
+    Buckets over all selected channels) and "minmax" (per-bucket extremes of each
+    channel) preserve the shape of the series, "uniform" keeps every n-th sample.
+
+    Clients sending ``Accept: application/vnd.betta.streams`` get the channels as
+    packed little-endian typed arrays (see services.stream_format) instead of
+    JSON; missing samples are NaN rather than null.
+    """
+    available_channels = [
+        name for name in models.activity.STREAM_CHANNELS if name != "time"
+    ]
+    if channels is None:
+        selected_channels = available_channels
+    else:
+        selected_channels = [
+            name.strip() for name in channels.split(",") if name.strip()
+        ]
+        unknown_channels = set(selected_channels) - set(available_channels)
+        if unknown_channels:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown channels: {', '.join(sorted(unknown_channels))}",
+            )
+
+    db_activity = crud.get_activity(db, activity_id=activity_id)
+    if db_activity is None:
+        raise HTTPException(status_code=404, detail="Activity not found")
+
+    names = ["time", *selected_channels]
+    db_stream = crud.get_activity_stream(db, activity_id, selected_channels)
+    if db_stream is None:
+        arrays = {
+            name: np.empty(0, dtype=models.activity.STREAM_CHANNELS[name])
+            for name in names
+        }
+    else:
+        arrays = {name: db_stream.channel(name) for name in names}
+
+    # Samples are ordered by time, so the range is a contiguous slice
+    time = arrays["time"]
+    first = 0 if start is None else int(np.searchsorted(time, start, side="left"))
+    last = len(time) if end is None else int(np.searchsorted(time, end, side="right"))
+    sample_count = max(last - first, 0)
+    indices = first + np.arange(sample_count)
+    if max_points is not None and max_points < sample_count:
+        values = np.vstack(
+            [arrays[name][first:last] for name in selected_channels]
+            or [np.zeros(sample_count)]
+        )
+        if method == "lttb":
+            selected = services.downsampling.lttb_indices(
+                values, max_points, x=time[first:last]
+            )
+        elif method == "minmax":
+            selected = services.downsampling.min_max_indices(values, max_points)
+        else:
+            selected = services.downsampling.downsample_indices(
+                sample_count, max_points
+            )
+        indices = first + selected
+
+    # The representation depends on Accept, so caches must key on it too
+    vary = {"Vary": "Accept"}
+    if accept and services.stream_format.STREAMS_MEDIA_TYPE in accept:
+        payload = services.stream_format.encode_streams(
+            {
+                "activity_id": activity_id,
+                "start_time": db_activity.start_time.isoformat(),
+                "sample_count": sample_count,
+            },
+            {name: values[indices] for name, values in arrays.items()},
+        )
+        return Response(
+            content=payload,
+            media_type=services.stream_format.STREAMS_MEDIA_TYPE,
+            headers=vary,
+        )
+
+    response.headers.update(vary)
+    return schemas.ActivityStreams(
+        activity_id=activity_id,
+        start_time=db_activity.start_time,
+        sample_count=sample_count,
+        channels={
+            name: models.activity.channel_to_list(name, values[indices])
+            for name, values in arrays.items()
+        },
+    )
+
+
 @router.put("/activity/{activity_id}", response_model=schemas.Activity)
 def update_activity_details(
     activity_id: int,
@@ -229,46 +385,118 @@ def get_zone_analysis(activity_id: int, db: Session = Depends(get_db)):
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
 
-    power_data = [r.power for r in activity.records if r.power is not None]
-    hr_data = [r.heart_rate for r in activity.records if r.heart_rate is not None]
+    power_data, hr_data = None, None
+    if activity.stream is not None:
+        power_data = activity.stream.channel("power")
+        hr_data = activity.stream.channel("heart_rate")
 
     # Get athlete's thresholds at the time of the activity
-    ftp_record = crud.get_latest_ftp(
-        db, athlete_id=activity.athlete_id, activity_date=activity.start_time
+    ftp = services.thresholds.get_threshold(
+        db, activity.athlete_id, models.MetricType.FTP, on=activity.start_time
     )
-    lthr_record = crud.get_latest_lthr(
-        db, athlete_id=activity.athlete_id, activity_date=activity.start_time
+    lthr = services.thresholds.get_threshold(
+        db, activity.athlete_id, models.MetricType.THR, on=activity.start_time
     )
 
-    ftp = ftp_record[0] if ftp_record else None
-    lthr = lthr_record[0] if lthr_record else None
-
-    power_zones = None
-    if ftp and power_data:
-        power_zones = services.calculations.calculate_time_in_zones(
-            power_data, ftp, services.calculations.POWER_ZONE_DEFINITIONS
-        )
-
-    hr_zones = None
-    if lthr and hr_data:
-        hr_zones = services.calculations.calculate_time_in_zones(
-            hr_data, lthr, services.calculations.HR_ZONE_DEFINITIONS
-        )
+    # Power and heart rate zones are binned together in a single pass
+    power_zones, hr_zones = services.calculations.calculate_time_in_zones_multi(
+        [
+            (power_data, ftp, services.calculations.POWER_ZONE_DEFINITIONS),
+            (hr_data, lthr, services.calculations.HR_ZONE_DEFINITIONS),
+        ]
+    )
+    if not ftp or power_data is None or np.isnan(power_data).all():
+        power_zones = None
+    if not lthr or hr_data is None or np.isnan(hr_data).all():
+        hr_zones = None
 
     return schemas.ZoneAnalysis(
         power_zones=power_zones, hr_zones=hr_zones, ftp=ftp, lthr=lthr
     )
 
 
-@router.post("/activity/upload/{athlete_id}", response_model=schemas.Activity)
+BEST_EFFORT_DURATIONS = [5, 15, 30, 60, 120, 180, 300, 480, 600, 900, 1200, 1800]
+
+
+@router.get(
+    "/activity/{activity_id}/best-efforts", response_model=List[schemas.BestEffort]
+)
+def get_best_efforts(
+    activity_id: int,
+    durations: Optional[List[int]] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Returns the best power effort of an activity for each requested duration,
+    with the heart rate and elevation gain over that same window.
+    """
+    activity = crud.get_activity(db, activity_id=activity_id)
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    if activity.stream is None:
+        return []
+
+    power = activity.stream.channel("power")
+    if np.isnan(power).all():
+        return []
+    mean_max = services.calculations.calculate_mean_max(
+        np.nan_to_num(power), durations or BEST_EFFORT_DURATIONS
+    )
+
+    # Running sums give the per-window HR average (over the samples with a
+    # reading) and ascent in O(1) per effort
+    heart_rate = activity.stream.channel("heart_rate")
+    has_heart_rate = np.isfinite(heart_rate)
+    heart_rate_sums = np.concatenate(
+        ([0.0], np.cumsum(np.where(has_heart_rate, heart_rate, 0.0)))
+    )
+    heart_rate_counts = np.concatenate(([0], np.cumsum(has_heart_rate)))
+    ascent = np.clip(np.diff(activity.stream.channel("altitude")), 0, None)
+    ascent_sums = np.concatenate(([0.0], np.cumsum(np.nan_to_num(ascent))))
+
+    best_efforts = []
+    for duration, power_avg, start, end in zip(
+        mean_max["duration"],
+        mean_max["average"],
+        mean_max["start_index"],
+        mean_max["end_index"],
+    ):
+        if np.isnan(power_avg):
+            continue
+        heart_rate_samples = heart_rate_counts[end + 1] - heart_rate_counts[start]
+        best_efforts.append(
+            schemas.BestEffort(
+                duration=duration,
+                power=int(round(power_avg)),
+                start_index=start,
+                end_index=end,
+                average_heart_rate=(
+                    int(
+                        round(
+                            (heart_rate_sums[end + 1] - heart_rate_sums[start])
+                            / heart_rate_samples
+                        )
+                    )
+                    if heart_rate_samples
+                    else None
+                ),
+                elevation_gain=round(ascent_sums[end] - ascent_sums[start], 1),
+            )
+        )
+    return best_efforts
+
+
+@router.post(
+    "/activity/upload/{athlete_id}", response_model=schemas.JobStatus, status_code=202
+)
 async def upload_activity(
     athlete_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)
 ):
     """
-    Uploads a .fit file, parses it, performs calculations, and saves it to the database.
+    Accepts a .fit file, saves it to disk and enqueues it for parsing on the worker.
+    Poll /jobs/{job_id} for the result; once finished it holds the new activity_id.
     """
-    db_athlete = crud.get_athlete(db, athlete_id=athlete_id)
-    if db_athlete is None:
+    if not crud.athlete_exists(db, athlete_id=athlete_id):
         raise HTTPException(status_code=404, detail="Athlete not found")
 
     if not file.filename.lower().endswith(".fit"):
@@ -276,41 +504,74 @@ async def upload_activity(
             status_code=400, detail="Invalid file type. Please upload a .fit file."
         )
 
-    content = await file.read()
+    file_path = _save_fit_file(file.file)
+    job = queue.enqueue(
+        "tasks.process_fit_upload", athlete_id, file_path, file.filename
+    )
 
-    fit_files_dir = "/app/fit_files"
-    os.makedirs(fit_files_dir, exist_ok=True)
-    unique_filename = f"{uuid.uuid4()}.fit"
-    file_path = os.path.join(fit_files_dir, unique_filename)
-    with open(file_path, "wb") as buffer:
-        buffer.write(content)
+    return schemas.JobStatus(job_id=job.id, status=job.get_status().value)
 
-    activity_data, record_dicts, lap_dicts, potential_markers = (
-        services.fit_parser.parse_fit_file(
-            content=content,
-            db=db,
-            athlete_id=athlete_id,
-            file_name=file.filename,
+
+@router.post(
+    "/activity/bulk-upload/{athlete_id}",
+    response_model=schemas.JobStatus,
+    status_code=202,
+)
+def bulk_upload_activities(
+    athlete_id: int,
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+):
+    """
+    Accepts several .fit files and/or .zip archives of them and enqueues a single
+    import job. Once finished, the job result lists the new activity_ids and any
+    files that could not be imported.
+    """
+    if not crud.athlete_exists(db, athlete_id=athlete_id):
+        raise HTTPException(status_code=404, detail="Athlete not found")
+
+    if not all(f.filename.lower().endswith((".fit", ".zip")) for f in files):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid file type. Please upload .fit files or .zip archives.",
         )
-    )
 
-    new_activity = crud.create_activity_with_records(
-        db=db,
-        activity=activity_data,
-        records=record_dicts,
-        laps=lap_dicts,
-        potential_markers=potential_markers,
-        athlete_id=athlete_id,
-        fit_file_path=file_path,
-    )
+    saved_files = []
+    for upload in files:
+        if upload.filename.lower().endswith(".fit"):
+            saved_files.append((_save_fit_file(upload.file), upload.filename))
+            continue
+        try:
+            with zipfile.ZipFile(upload.file) as archive:
+                for member in archive.infolist():
+                    member_name = os.path.basename(member.filename)
+                    if (
+                        member.is_dir()
+                        or member_name.startswith(".")
+                        or not member_name.lower().endswith(".fit")
+                    ):
+                        continue
+                    with archive.open(member) as source:
+                        saved_files.append((_save_fit_file(source), member_name))
+        except zipfile.BadZipFile:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{upload.filename} is not a valid .zip archive.",
+            )
 
-    # After creating activity, update scaling factors and PMC
-    services.athlete_services.update_scaling_factors(db, athlete_id)
-    services.calculations.recalculate_pmc_from_date(
-        db, athlete_id, new_activity.start_time.date()
+    if not saved_files:
+        raise HTTPException(
+            status_code=400, detail="No .fit files found in the upload."
+        )
+
+    job = queue.enqueue(
+        "tasks.process_fit_import",
+        athlete_id,
+        saved_files,
+        job_timeout=BULK_IMPORT_JOB_TIMEOUT,
     )
 
-    return new_activity
+    return schemas.JobStatus(job_id=job.id, status=job.get_status().value)
 
 
 @router.post("/activity/{activity_id}/refresh-strava-data", response_model=schemas.Activity)
@@ -358,9 +619,6 @@ def refresh_strava_activity_data(activity_id: int, db: Session = Depends(get_db)
         else:
             raise
 
-    # Delete existing records
-    crud.delete_activity_records(db, activity_id)
-
     # Update activity summary fields
     db_activity.name = summary.get("name", db_activity.name)
     db_activity.total_moving_time = summary.get("moving_time", db_activity.total_moving_time)
@@ -377,7 +635,9 @@ def refresh_strava_activity_data(activity_id: int, db: Session = Depends(get_db)
     db_activity.max_cadence = summary.get("max_cadence", db_activity.max_cadence)
     db_activity.total_calories = summary.get("calories", db_activity.total_calories)
 
-    # Re-create records from streams
+    # Re-create the stream from Strava's streams, replacing the stored one
+    db_activity.stream = None
+    db.flush()
     time_data = streams.get("time", {}).get("data", [])
     if time_data:
         watts_data = streams.get("watts", {}).get("data", [])
@@ -387,19 +647,24 @@ def refresh_strava_activity_data(activity_id: int, db: Session = Depends(get_db)
         latlng_data = streams.get("latlng", {}).get("data", [])
         latlng = latlng_data + [None] * (len(time_data) - len(latlng_data))
 
+        records = []
         for i, timestamp in enumerate(time_data):
-            record = models.ActivityRecord(
-                activity_id=activity_id,
-                timestamp=db_activity.start_time + timedelta(seconds=timestamp),
-                power=watts[i] if watts[i] is not None else None,
-                heart_rate=heartrate[i] if heartrate[i] is not None else None,
-                latitude=latlng[i][0] if latlng[i] is not None else None,
-                longitude=latlng[i][1] if latlng[i] is not None else None,
+            records.append(
+                {
+                    "timestamp": db_activity.start_time + timedelta(seconds=timestamp),
+                    "power": watts[i] if watts[i] is not None else None,
+                    "heart_rate": heartrate[i] if heartrate[i] is not None else None,
+                    "latitude": latlng[i][0] if latlng[i] is not None else None,
+                    "longitude": latlng[i][1] if latlng[i] is not None else None,
+                }
             )
-            db.add(record)
+        db_activity.stream = models.ActivityStream.from_records(
+            records, start_time=db_activity.start_time
+        )
 
     # Recalculate derived metrics
     services.activity_processing.recalculate_virtual_power(db, db_activity, 0)
+    services.activity_processing.update_power_curve(db_activity)
 
     db.commit()
     db.refresh(db_activity)
@@ -416,8 +681,7 @@ def create_manual_activity(
     """
     Creates a new activity from manually entered data for a specific athlete.
     """
-    db_athlete = crud.get_athlete(db, athlete_id=athlete_id)
-    if db_athlete is None:
+    if not crud.athlete_exists(db, athlete_id=athlete_id):
         raise HTTPException(status_code=404, detail="Athlete not found")
 
     new_activity = crud.create_manual_activity(
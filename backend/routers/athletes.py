@@ -20,13 +20,27 @@ def create_athlete(athlete: schemas.AthleteCreate, db: Session = Depends(get_db)
     return crud.create_athlete(db=db, athlete=athlete)
 
 
-@router.get("/athlete/{athlete_id}", response_model=schemas.AthleteResponse)
+@router.get("/athlete/{athlete_id}", response_model=schemas.AthleteProfileResponse)
 def read_athlete(athlete_id: int, db: Session = Depends(get_db)):
-    """Retrieves a single athlete by their ID, including their metrics and activities."""
-    db_athlete = crud.get_athlete(db, athlete_id=athlete_id)
+    """
+    Retrieves a single athlete by their ID with their metrics and equipment.
+    Activities are only counted; page through them via the linked endpoint.
+    """
+    db_athlete = crud.get_athlete_profile(db, athlete_id=athlete_id)
     if db_athlete is None:
         raise HTTPException(status_code=404, detail="Athlete not found")
-    return db_athlete
+
+    return schemas.AthleteProfileResponse(
+        **schemas.AthleteResponse.model_validate(db_athlete).model_dump(),
+        metrics=db_athlete.metrics,
+        equipment=db_athlete.equipment,
+        counts=crud.get_athlete_counts(db, athlete_id),
+        links={
+            "activities": f"/athlete/{athlete_id}/activities",
+            "visual_activity_log": f"/athlete/{athlete_id}/visual-activity-log",
+            "pmc": f"/athlete/{athlete_id}/pmc",
+        },
+    )
 
 
 @router.get("/athletes", response_model=List[schemas.AthleteResponse])
@@ -59,8 +73,7 @@ async def upload_profile_picture(
 ):
     """Uploads a profile picture for the athlete."""
     # Check if athlete exists
-    db_athlete = crud.get_athlete(db, athlete_id=athlete_id)
-    if db_athlete is None:
+    if not crud.athlete_exists(db, athlete_id=athlete_id):
         raise HTTPException(status_code=404, detail="Athlete not found")
 
     # Validate file type
@@ -17,8 +17,7 @@ def create_equipment_endpoint(
     athlete_id: int, equipment: schemas.EquipmentCreate, db: Session = Depends(get_db)
 ):
     """Creates a new piece of equipment for an athlete."""
-    db_athlete = crud.get_athlete(db, athlete_id=athlete_id)
-    if db_athlete is None:
+    if not crud.athlete_exists(db, athlete_id=athlete_id):
         raise HTTPException(status_code=404, detail="Athlete not found")
     return crud.create_equipment(db=db, equipment=equipment, athlete_id=athlete_id)
 
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, HTTPException
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+
+import schemas
+from job_queue import redis_conn
+
+router = APIRouter(
+    tags=["Jobs"],
+)
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.JobStatus)
+def read_job_status(job_id: str):
+    """Returns the status of a background job, with its result once finished."""
+    try:
+        job = Job.fetch(job_id, connection=redis_conn)
+    except NoSuchJobError:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    status = job.get_status()
+    error = None
+    if job.is_failed and job.exc_info:
+        # Only surface the exception line, not the worker traceback
+        error = job.exc_info.strip().splitlines()[-1]
+
+    return schemas.JobStatus(
+        job_id=job.id,
+        status=status.value if status else "unknown",
+        result=job.result if job.is_finished else None,
+        error=error,
+        progress=job.meta.get("progress"),
+    )
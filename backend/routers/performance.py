@@ -1,16 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional, Dict
+from typing import List, Literal, Optional, Dict, Union
 from enum import Enum
 from pydantic import BaseModel
 from datetime import datetime, date, timedelta
+import numpy as np
 
 import models
 import schemas
 import services
 import crud
 from database import get_db
+from job_queue import queue
 
 router = APIRouter(
     prefix="/athlete/{athlete_id}",
@@ -26,24 +27,75 @@ class WorkloadMetric(str, Enum):
     utl = "utl"
 
 
+# Daily rollup column per workload metric: sums for loads, the mean for IF
 METRIC_COLUMN_MAP = {
-    WorkloadMetric.tss: "tss",
-    WorkloadMetric.pss: "perceived_strain_score",
-    WorkloadMetric.trimp: "trimp",
-    WorkloadMetric.if_avg: "intensity_factor",
-    WorkloadMetric.utl: "unified_training_load",
+    WorkloadMetric.tss: "total_tss",
+    WorkloadMetric.pss: "total_pss",
+    WorkloadMetric.trimp: "total_trimp",
+    WorkloadMetric.if_avg: "avg_intensity_factor",
+    WorkloadMetric.utl: "total_load",
 }
 
 
-@router.post("/metrics", response_model=schemas.AthleteMetric, status_code=201)
+# Metrics that activity scores (TSS, IF, TRIMP) are computed against
+RESCORING_METRIC_TYPES = {models.MetricType.FTP, models.MetricType.THR}
+
+
+def _enqueue_rescore(
+    db: Session, metric: models.AthleteMetric
+) -> Optional[schemas.JobStatus]:
+    """
+    Enqueues re-scoring of the activities a new FTP/THR applies to: from its
+    date up to the next later value of the same type.
+    """
+    if metric.metric_type not in RESCORING_METRIC_TYPES:
+        return None
+    start_date, end_date = services.thresholds.get_affected_date_range(
+        db, metric.athlete_id, metric.metric_type, metric.date_established
+    )
+    job = queue.enqueue(
+        "tasks.rescore_athlete_activities",
+        metric.athlete_id,
+        start_date.isoformat(),
+        end_date.isoformat() if end_date else None,
+    )
+    return schemas.JobStatus(job_id=job.id, status=job.get_status().value)
+
+
+@router.post("/metrics", response_model=schemas.AthleteMetricCreated, status_code=201)
 def create_athlete_metric(
     athlete_id: int, metric: schemas.AthleteMetricCreate, db: Session = Depends(get_db)
 ):
-    """Adds a new metric (e.g., weight, FTP) for a specific athlete."""
-    db_athlete = crud.get_athlete(db, athlete_id=athlete_id)
-    if db_athlete is None:
+    """
+    Adds a new metric (e.g., weight, FTP) for a specific athlete. A new FTP or
+    THR enqueues re-scoring of the activities it applies to.
+    """
+    if not crud.athlete_exists(db, athlete_id=athlete_id):
         raise HTTPException(status_code=404, detail="Athlete not found")
-    return crud.create_athlete_metric(db=db, metric=metric, athlete_id=athlete_id)
+    db_metric = crud.create_athlete_metric(db=db, metric=metric, athlete_id=athlete_id)
+    response = schemas.AthleteMetricCreated.model_validate(db_metric)
+    response.rescore_job = _enqueue_rescore(db, db_metric)
+    return response
+
+
+@router.post("/rescore", response_model=schemas.JobStatus, status_code=202)
+def rescore_activities(
+    athlete_id: int,
+    start_date: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Enqueues re-scoring of the athlete's activities (from start_date, or all)
+    against the thresholds in effect on each activity's date.
+    """
+    if not crud.athlete_exists(db, athlete_id=athlete_id):
+        raise HTTPException(status_code=404, detail="Athlete not found")
+    job = queue.enqueue(
+        "tasks.rescore_athlete_activities",
+        athlete_id,
+        start_date.isoformat() if start_date else None,
+    )
+    return schemas.JobStatus(job_id=job.id, status=job.get_status().value)
 
 
 @router.get("/weight-at-date", response_model=Optional[float])
@@ -52,12 +104,9 @@ def get_weight_at_date(athlete_id: int, date: datetime, db: Session = Depends(ge
     Retrieves the athlete's most recent established weight on or before a given date.
     This is useful for calculating W/kg for historical activities.
     """
-    weight_record = crud.get_latest_weight(
-        db, athlete_id=athlete_id, activity_date=date
+    return services.thresholds.get_threshold(
+        db, athlete_id, models.MetricType.WEIGHT, on=date
     )
-    if weight_record:
-        return weight_record[0]
-    return None
 
 
 @router.get("/ftp", response_model=Optional[float])
@@ -69,72 +118,61 @@ def get_ftp_at_date(
     If a 'date' query parameter is provided, it gets the FTP on or before that date.
     Otherwise, it returns the most current FTP.
     """
-    ftp_record = crud.get_latest_ftp(db, athlete_id=athlete_id, activity_date=date)
-    return ftp_record[0] if ftp_record else None
+    return services.thresholds.get_threshold(
+        db, athlete_id, models.MetricType.FTP, on=date
+    )
 
 
-@router.get("/pmc", response_model=List[schemas.DailyPerformanceMetric])
+@router.get(
+    "/pmc",
+    response_model=Union[List[schemas.DailyPerformanceMetric], schemas.PmcSeries],
+)
 def get_pmc_data_endpoint(
-    athlete_id: int, start_date: date, end_date: date, db: Session = Depends(get_db)
+    athlete_id: int,
+    start_date: date,
+    end_date: date,
+    layout: Literal["rows", "columns"] = Query(
+        "rows", description="One object per day, or one array per column"
+    ),
+    db: Session = Depends(get_db),
 ):
     """
     Retrieves historical and projected PMC data (CTL, ATL, TSB) for a given date range.
     It fills in any gaps (rest days) with calculated decayed values.
     """
-    last_metric_before_range = crud.get_latest_daily_metric_before_date(
-        db, athlete_id, start_date
-    )
-
-    if last_metric_before_range:
-        ctl = last_metric_before_range.ctl
-        atl = last_metric_before_range.atl
-    else:
-        ctl, atl = 0.0, 0.0
-
-    existing_metrics_raw = crud.get_pmc_data(db, athlete_id, start_date, end_date)
-    existing_metrics_map = {metric.date: metric for metric in existing_metrics_raw}
-
-    all_days_metrics = []
-    current_date = start_date
-
-    while current_date <= end_date:
-        if current_date in existing_metrics_map:
-            metric = existing_metrics_map[current_date]
-            ctl = metric.ctl
-            atl = metric.atl
-            all_days_metrics.append(metric)
-
-        else:
-            ctl += (0 - ctl) / services.calculations.CTL_TC
-            atl += (0 - atl) / services.calculations.ATL_TC
-            tsb = ctl - atl
-
-            transient_metric = schemas.DailyPerformanceMetric(
-                id=0,
-                athlete_id=athlete_id,
-                date=current_date,
-                ctl=ctl,
-                atl=atl,
-                tsb=tsb,
-                tss=0,
-                if_avg=0.0,
-            )
-            all_days_metrics.append(transient_metric)
-
-        current_date += timedelta(days=1)
+    series = services.calculations.get_pmc_series(db, athlete_id, start_date, end_date)
+    dates = series["dates"].astype(object).tolist()
+
+    if layout == "columns":
+        return schemas.PmcSeries(
+            dates=dates,
+            **{
+                column: series[column].tolist()
+                for column in ("ctl", "atl", "tsb", "tss", "if_avg")
+            },
+        )
 
-    return all_days_metrics
+    columns = {
+        column: series[column].tolist()
+        for column in ("id", "ctl", "atl", "tsb", "tss", "if_avg")
+    }
+    return [
+        {"athlete_id": athlete_id, "date": day, **dict(zip(columns, values))}
+        for day, *values in zip(dates, *columns.values())
+    ]
 
 
 @router.get("/mmp-curve", response_model=List[Dict[str, int]])
 def get_mmp_curve_endpoint(
     athlete_id: int, start_date: date, end_date: date, db: Session = Depends(get_db)
 ):
-    """Calculates the Mean Maximal Power curve from all activities in a date range."""
-    power_records = crud.get_power_records_for_date_range(
-        db, athlete_id, start_date, end_date
-    )
-    power_data = [r[0] for r in power_records if r[0] is not None]
+    """
+    Returns the Mean Maximal Power curve over all activities in a date range,
+    combined from the curves precomputed for each activity at ingest.
+    """
+    curves = crud.get_power_curves_for_date_range(db, athlete_id, start_date, end_date)
+    combined_curve = services.calculations.combine_power_curves(curves)
+    durations = services.calculations.MMP_CURVE_DURATIONS
     intervals = [
         1,
         5,
@@ -156,7 +194,11 @@ def get_mmp_curve_endpoint(
         2700,
         3600,
     ]
-    mmp_curve = services.calculations.calculate_historical_mmp(power_data, intervals)
+    mmp_curve = []
+    for interval in intervals:
+        power = combined_curve[np.searchsorted(durations, interval)]
+        if not np.isnan(power):
+            mmp_curve.append({"duration": interval, "power": int(round(power))})
     return mmp_curve
 
 
@@ -192,16 +234,12 @@ def get_weekly_workload_endpoint(
             detail=f"Invalid metric type for workload analysis: {metric}",
         )
 
-    # Use AVG for intensity metrics and SUM for load metrics
-    agg_func = func.avg if metric == WorkloadMetric.if_avg else func.sum
-
     daily_aggregates = crud.get_daily_aggregates_for_metric(
         db,
         athlete_id=athlete_id,
         start_date=history_start_date,
         end_date=week_end_date,
         metric_column=metric_column,
-        agg_func=agg_func,
     )
 
     return services.activity_processing.process_weekly_workload(
@@ -222,7 +260,8 @@ class MarkerAction(BaseModel):
 
 
 @router.put(
-    "/potential-markers/{marker_id}", response_model=schemas.PotentialPerformanceMarker
+    "/potential-markers/{marker_id}",
+    response_model=schemas.PotentialMarkerActionResponse,
 )
 def action_on_potential_marker(
     athlete_id: int,
@@ -245,6 +284,7 @@ def action_on_potential_marker(
             status_code=403, detail="Marker does not belong to this athlete"
         )
 
+    new_metric = None
     if marker_action.action == "accept":
         # Create a new official AthleteMetric
         new_metric = schemas.AthleteMetricCreate(
@@ -252,7 +292,9 @@ def action_on_potential_marker(
             value=marker.value,
             date_established=marker.date_detected.date(),
         )
-        crud.create_athlete_metric(db, metric=new_metric, athlete_id=marker.athlete_id)
+        new_metric = crud.create_athlete_metric(
+            db, metric=new_metric, athlete_id=marker.athlete_id
+        )
 
         marker.status = models.PotentialMarkerStatus.ACCEPTED
     elif marker_action.action == "dismiss":
@@ -264,7 +306,10 @@ def action_on_potential_marker(
 
     db.commit()
     db.refresh(marker)
-    return marker
+    response = schemas.PotentialMarkerActionResponse.model_validate(marker)
+    if new_metric is not None:
+        response.rescore_job = _enqueue_rescore(db, new_metric)
+    return response
 
 
 @router.get("/daily-workload-for-week", response_model=List[schemas.DailyAggregate])
@@ -290,15 +335,11 @@ async def get_daily_workload_for_week_endpoint(
 
     week_end_date = week_start_date + timedelta(days=6)
 
-    # Use AVG for intensity metrics and SUM for load metrics
-    agg_func = func.avg if metric == WorkloadMetric.if_avg else func.sum
-
     daily_aggregates = crud.get_daily_aggregates_for_metric(
         db,
         athlete_id=athlete_id,
         start_date=week_start_date,
         end_date=week_end_date,
         metric_column=metric_column,
-        agg_func=agg_func,
     )
     return daily_aggregates
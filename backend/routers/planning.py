@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from datetime import timedelta
+import numpy as np
+
+import crud
+import schemas
+import services
+from database import get_db
+
+router = APIRouter(
+    prefix="/pmc",
+    tags=["Planning"],
+)
+
+# Upper bounds for one projection request
+MAX_PROJECTION_DAYS = 365
+MAX_PROJECTION_ATHLETES = 100
+
+
+@router.post("/projection", response_model=schemas.PmcProjection)
+def project_pmc(
+    projection: schemas.PmcProjectionRequest, db: Session = Depends(get_db)
+):
+    """
+    Projects CTL/ATL/TSB of one or more athletes (e.g. a coach's squad) under a
+    planned daily load schedule starting at start_date. Each athlete starts
+    from their PMC on the day before; all athletes are projected in one
+    vectorized computation.
+    """
+    athlete_ids = list(dict.fromkeys(projection.athlete_ids))
+    days = len(projection.planned_load)
+    if not athlete_ids or len(athlete_ids) > MAX_PROJECTION_ATHLETES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Provide between 1 and {MAX_PROJECTION_ATHLETES} athlete IDs.",
+        )
+    if not 1 <= days <= MAX_PROJECTION_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"planned_load must cover between 1 and {MAX_PROJECTION_DAYS} days.",
+        )
+    for athlete_id, planned_load in projection.athlete_planned_load.items():
+        if athlete_id not in athlete_ids or len(planned_load) != days:
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"athlete_planned_load for athlete {athlete_id} must be for a "
+                    f"requested athlete and cover {days} days."
+                ),
+            )
+
+    missing = set(athlete_ids) - crud.get_existing_athlete_ids(db, athlete_ids)
+    if missing:
+        raise HTTPException(
+            status_code=404, detail=f"Athletes not found: {sorted(missing)}"
+        )
+
+    planned_load = np.array(
+        [
+            projection.athlete_planned_load.get(athlete_id, projection.planned_load)
+            for athlete_id in athlete_ids
+        ]
+    )
+    pmc = services.calculations.project_athletes_pmc(
+        db, athlete_ids, projection.start_date, planned_load
+    )
+    return schemas.PmcProjection(
+        dates=[projection.start_date + timedelta(days=i) for i in range(days)],
+        athletes=[
+            schemas.AthletePmcProjection(
+                athlete_id=athlete_id,
+                ctl=pmc["ctl"][i].tolist(),
+                atl=pmc["atl"][i].tolist(),
+                tsb=pmc["tsb"][i].tolist(),
+            )
+            for i, athlete_id in enumerate(athlete_ids)
+        ],
+    )
@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 import os
 import requests
-from datetime import datetime
-from rq import Queue
-from redis import Redis
+from datetime import datetime, timedelta
 
 import crud
+import schemas
+import services
 from database import get_db
+from job_queue import queue, redis_conn
 from services.strava_service import StravaService
 
 router = APIRouter(
@@ -21,10 +22,6 @@ STRAVA_REDIRECT_URI = os.getenv(
 )
 VERIFY_TOKEN = os.getenv("STRAVA_VERIFY_TOKEN", "betta_verify")
 
-# RQ Queue
-redis_conn = Redis(host="redis", port=6379, db=0)
-queue = Queue(connection=redis_conn)
-
 
 def ensure_webhook_subscription():
     """Ensure a webhook subscription exists for the app."""
@@ -132,13 +129,30 @@ def verify_webhook(request: Request):
 
 @router.post("/strava/webhook")
 async def strava_webhook(request: Request):
-    """Handle Strava webhook."""
+    """
+    Handle Strava webhook. Activity events go to the webhook inbox, which
+    drops redeliveries and coalesces bursts per activity; the first pending
+    event of an activity schedules one job after the coalescing window.
+    """
     data = await request.json()
-    if data.get("aspect_type") == "create" and data.get("object_type") == "activity":
-        athlete_id = data.get("owner_id")
+    if (
+        data.get("object_type") == "activity"
+        and data.get("aspect_type") in services.strava_webhook.ACTIVITY_ASPECTS
+    ):
         strava_activity_id = data.get("object_id")
-        # Enqueue async job
-        queue.enqueue("tasks.process_strava_activity", strava_activity_id, athlete_id)
+        inbox = services.strava_webhook.StravaWebhookInbox(redis_conn)
+        if inbox.record(
+            strava_activity_id,
+            data.get("owner_id"),
+            data["aspect_type"],
+            data.get("updates"),
+            data.get("event_time"),
+        ):
+            queue.enqueue_in(
+                timedelta(seconds=services.strava_webhook.WEBHOOK_COALESCE_SECONDS),
+                "tasks.process_strava_webhook_event",
+                strava_activity_id,
+            )
     return {"message": "Event received"}
 
 
@@ -184,9 +198,16 @@ def get_strava_activities(
 def ingest_selected_strava_activities(
     athlete_id: int,
     selected_ids: list[int],
+    use_async: bool = False,
+    concurrency: int = Query(
+        services.strava_async.ASYNC_INGEST_CONCURRENCY, ge=1, le=32
+    ),
     db: Session = Depends(get_db)
 ):
-    """Ingest selected Strava activities."""
+    """
+    Ingest selected Strava activities. With ``use_async`` the backfill runs on
+    an asyncio pipeline with ``concurrency`` activities in flight.
+    """
     athlete = crud.get_athlete(db, athlete_id)
     if not athlete or not athlete.strava_access_token:
         raise HTTPException(status_code=400, detail="Strava not connected")
@@ -207,14 +228,43 @@ def ingest_selected_strava_activities(
         )
         athlete = crud.get_athlete(db, athlete_id)
 
-    # Enqueue jobs for selected activities
-    for strava_activity_id in selected_ids:
-        # Check if already exists
-        existing = crud.get_activity_by_strava_id(db, strava_activity_id)
-        if not existing:
-            queue.enqueue("tasks.process_strava_activity", strava_activity_id, athlete.strava_athlete_id)
+    # One rate-limit-aware backfill job for all new activities
+    existing = crud.get_existing_strava_activity_ids(db, selected_ids)
+    new_ids = [
+        strava_activity_id
+        for strava_activity_id in dict.fromkeys(selected_ids)
+        if strava_activity_id not in existing
+    ]
+    if not new_ids:
+        return {"message": "All selected activities are already ingested"}
+
+    services.strava_backfill.BackfillProgress(redis_conn, athlete_id).start(
+        len(new_ids)
+    )
+    if use_async:
+        job = queue.enqueue(
+            "tasks.backfill_strava_activities_async",
+            athlete_id,
+            new_ids,
+            concurrency=concurrency,
+        )
+    else:
+        job = queue.enqueue("tasks.backfill_strava_activities", athlete_id, new_ids)
+    return {
+        "message": f"Enqueued {len(new_ids)} activities for ingestion",
+        "job_id": job.id,
+    }
+
 
-    return {"message": f"Enqueued {len(selected_ids)} activities for ingestion"}
+@router.get(
+    "/strava/backfill/{athlete_id}", response_model=schemas.StravaBackfillStatus
+)
+def get_strava_backfill_status(athlete_id: int):
+    """Progress, throughput and ETA of the athlete's Strava backfill."""
+    status = services.strava_backfill.BackfillProgress(redis_conn, athlete_id).status()
+    if status is None:
+        raise HTTPException(status_code=404, detail="No Strava backfill for athlete")
+    return status
 
 
 @router.delete("/strava/disconnect/{athlete_id}")
@@ -5,10 +5,11 @@ from .activity import (
     ActivityLap,
     ActivityLapBase,
     ActivityListResponse,
-    ActivityRecord,
-    ActivityRecordBase,
+    ActivityPage,
+    ActivityStreams,
     ActivitySummary,
     ActivityUpdate,
+    BestEffort,
     ChartDataPoint,
     DailyActivity,
     RecentActivityResponse,
@@ -16,7 +17,9 @@ from .activity import (
     WeeklyActivityData,
 )
 from .athlete import (
+    AthleteCounts,
     AthleteCreate,
+    AthleteProfileResponse,
     AthleteResponse,
     AthleteUpdate,
 )
@@ -25,16 +28,23 @@ from .equipment import (
     EquipmentCreate,
     EquipmentUpdate,
 )
+from .job import JobStatus, StravaBackfillStatus
 from .performance import (
     AthleteMetric,
     AthleteMetricBase,
     AthleteMetricCreate,
+    AthleteMetricCreated,
     DailyAggregate,
     DailyPerformanceMetric,
     DailyPerformanceMetricBase,
+    AthletePmcProjection,
+    PmcProjection,
+    PmcProjectionRequest,
+    PmcSeries,
     PotentialPerformanceMarker,
     PotentialPerformanceMarkerBase,
     PotentialPerformanceMarkerCreate,
+    PotentialMarkerActionResponse,
     WeeklyWorkload,
     WeeklyWorkloadDataPoint,
     ZoneAnalysis,
@@ -48,33 +58,45 @@ __all__ = [
     "ActivityLap",
     "ActivityLapBase",
     "ActivityListResponse",
-    "ActivityRecord",
-    "ActivityRecordBase",
+    "ActivityPage",
+    "ActivityStreams",
     "ActivitySummary",
     "ActivityUpdate",
+    "BestEffort",
     "ChartDataPoint",
     "DailyActivity",
     "RecentActivityResponse",
     "VisualActivityLogResponse",
     "WeeklyActivityData",
     # Athlete schemas
+    "AthleteCounts",
     "AthleteCreate",
+    "AthleteProfileResponse",
     "AthleteResponse",
     "AthleteUpdate",
     # Equipment schemas
     "Equipment",
     "EquipmentCreate",
     "EquipmentUpdate",
+    # Job schemas
+    "JobStatus",
+    "StravaBackfillStatus",
     # Performance schemas
     "AthleteMetric",
     "AthleteMetricBase",
     "AthleteMetricCreate",
+    "AthleteMetricCreated",
     "DailyAggregate",
     "DailyPerformanceMetric",
     "DailyPerformanceMetricBase",
+    "AthletePmcProjection",
+    "PmcProjection",
+    "PmcProjectionRequest",
+    "PmcSeries",
     "PotentialPerformanceMarker",
     "PotentialPerformanceMarkerBase",
     "PotentialPerformanceMarkerCreate",
+    "PotentialMarkerActionResponse",
     "WeeklyWorkload",
     "WeeklyWorkloadDataPoint",
     "ZoneAnalysis",
@@ -1,26 +1,18 @@
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 
 from .equipment import Equipment
 
 
-# --- ActivityRecord ---
-class ActivityRecordBase(BaseModel):
-    timestamp: datetime
-    power: Optional[int] = None
-    heart_rate: Optional[int] = None
-    cadence: Optional[int] = None
-    speed: Optional[float] = None
-    latitude: Optional[float] = None
-    longitude: Optional[float] = None
-    altitude: Optional[float] = None
+# --- ActivityStreams ---
+class ActivityStreams(BaseModel):
+    """Column-wise samples of an activity; each channel is aligned with time."""
 
-
-class ActivityRecord(ActivityRecordBase):
-    record_id: int
     activity_id: int
-    model_config = ConfigDict(from_attributes=True)
+    start_time: datetime
+    sample_count: int  # samples in the requested range, before downsampling
+    channels: Dict[str, List[Optional[Union[int, float]]]]
 
 
 # --- ActivityLap ---
@@ -96,6 +88,17 @@ class ActivityListResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ActivityPage(BaseModel):
+    """
+    One page of an athlete's activities. Pass ``next_cursor`` back as
+    ``cursor`` to get the next page; it is None on the last page.
+    """
+
+    activities: List[ActivitySummary]
+    next_cursor: Optional[str] = None
+    total_count: Optional[int] = None
+
+
 class ActivityUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
@@ -131,7 +134,6 @@ class ActivityCreateManual(BaseModel):
 
 
 class Activity(ActivitySummary):
-    records: List[ActivityRecord] = []
     laps: List[ActivityLap] = []
     bike: Optional[Equipment] = None
     shoe: Optional[Equipment] = None
@@ -147,6 +149,15 @@ class RecentActivityResponse(ActivitySummary):
     model_config = ConfigDict(from_attributes=True)
 
 
+class BestEffort(BaseModel):
+    duration: int  # seconds
+    power: int
+    start_index: int
+    end_index: int
+    average_heart_rate: Optional[int] = None
+    elevation_gain: Optional[float] = None
+
+
 # --- Visual Activity Log ---
 class DailyActivity(BaseModel):
     activity_id: int
@@ -1,9 +1,8 @@
 from pydantic import BaseModel, ConfigDict
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from .performance import AthleteMetric
 from .equipment import Equipment
-from .activity import ActivitySummary
 
 
 class AthleteBase(BaseModel):
@@ -32,10 +31,25 @@ class AthleteSummary(AthleteBase):
 class AthleteResponse(AthleteBase):
     athlete_id: int
     created_at: datetime
-    metrics: List[AthleteMetric] = []
-    activities: List[ActivitySummary] = []
     psf_trimp: float
     psf_pss: float
-    equipment: List[Equipment] = []
     is_strava_connected: bool = False
     model_config = ConfigDict(from_attributes=True)
+
+
+class AthleteCounts(BaseModel):
+    activities: int
+    metrics: int
+    equipment: int
+
+
+class AthleteProfileResponse(AthleteResponse):
+    """
+    The athlete with its metrics and equipment. Activities are not embedded:
+    ``counts`` gives their number and ``links`` the paginated endpoint.
+    """
+
+    metrics: List[AthleteMetric] = []
+    equipment: List[Equipment] = []
+    counts: AthleteCounts
+    links: Dict[str, str]
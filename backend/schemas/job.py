@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    # Published by long-running jobs, e.g. {"processed": 50, "total": 400}
+    progress: Optional[Dict[str, Any]] = None
+
+
+class StravaBackfillStatus(BaseModel):
+    total: int
+    completed: int
+    failed: int
+    remaining: int
+    # Since the backfill started, including time waiting for the rate limit
+    activities_per_minute: float
+    eta_seconds: Optional[int] = None
+    # Set while the backfill waits for the Strava rate limit to reset
+    retry_at: Optional[datetime] = None
+    errors: List[str] = []
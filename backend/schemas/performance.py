@@ -1,8 +1,9 @@
 from pydantic import BaseModel, ConfigDict
 from datetime import date, datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 from models.performance import MetricType, PotentialMarkerStatus
+from .job import JobStatus
 
 
 # --- AthleteMetric ---
@@ -22,6 +23,11 @@ class AthleteMetric(AthleteMetricBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class AthleteMetricCreated(AthleteMetric):
+    # The job re-scoring the affected activities, for FTP and THR changes
+    rescore_job: Optional[JobStatus] = None
+
+
 class ZoneAnalysis(BaseModel):
     power_zones: Optional[dict[str, int]] = None
     hr_zones: Optional[dict[str, int]] = None
@@ -45,6 +51,39 @@ class DailyPerformanceMetric(DailyPerformanceMetricBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PmcSeries(BaseModel):
+    # Columnar PMC: the i-th value of every column is for dates[i]
+    dates: List[date]
+    ctl: List[float]
+    atl: List[float]
+    tsb: List[float]
+    tss: List[int]
+    if_avg: List[float]
+
+
+# --- PMC projection ---
+class PmcProjectionRequest(BaseModel):
+    athlete_ids: List[int]
+    start_date: date  # First planned day
+    # Planned daily load from start_date, shared by all athletes
+    planned_load: List[float]
+    # Per-athlete schedules replacing planned_load, of the same length
+    athlete_planned_load: Dict[int, List[float]] = {}
+
+
+class AthletePmcProjection(BaseModel):
+    athlete_id: int
+    ctl: List[float]
+    atl: List[float]
+    tsb: List[float]
+
+
+class PmcProjection(BaseModel):
+    # Columnar: the i-th CTL/ATL/TSB value of every athlete is for dates[i]
+    dates: List[date]
+    athletes: List[AthletePmcProjection]
+
+
 # --- Weekly Workload ---
 class WeeklyWorkloadDataPoint(BaseModel):
     week_start_date: date
@@ -83,3 +122,8 @@ class PotentialPerformanceMarker(PotentialPerformanceMarkerBase):
     status: PotentialMarkerStatus
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class PotentialMarkerActionResponse(PotentialPerformanceMarker):
+    # Set when accepting the marker established a new FTP or THR
+    rescore_job: Optional[JobStatus] = None
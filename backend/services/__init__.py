@@ -3,6 +3,14 @@ from . import calculations
 from . import activity_processing
 from . import athlete_services
 from . import strava_service
+from . import strava_rate_limit
+from . import strava_backfill
+from . import strava_async
+from . import strava_webhook
+from . import downsampling
+from . import stream_format
+from . import thresholds
+from . import rescoring
 
 __all__ = [
     "fit_parser",
@@ -10,4 +18,12 @@ __all__ = [
     "activity_processing",
     "athlete_services",
     "strava_service",
+    "strava_rate_limit",
+    "strava_backfill",
+    "strava_async",
+    "strava_webhook",
+    "downsampling",
+    "stream_format",
+    "thresholds",
+    "rescoring",
 ]
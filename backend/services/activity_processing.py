@@ -1,4 +1,5 @@
 from sqlalchemy.orm import Session
+import numpy as np
 import pandas as pd
 from datetime import date, timedelta
 from collections import defaultdict
@@ -6,7 +7,7 @@ from typing import List
 
 import models
 import schemas
-from . import calculations
+from . import calculations, thresholds
 
 
 def recalculate_virtual_power(
@@ -21,49 +22,73 @@ def recalculate_virtual_power(
     if activity.average_power is not None and activity.average_power > 0:
         return activity
 
-    # 2. Iterate through records and calculate virtual power
-    power_data = []
-    records_to_update = []
-    for record in activity.records:
-        if record.speed is not None and record.speed > 0:
-            speed_kmh = record.speed * 3.6
-            virtual_power = calculations.estimate_power_tacx(speed_kmh, trainer_setting)
-            record.power = int(virtual_power)
-            records_to_update.append(record)
-            power_data.append(record.power)
-        else:
-            power_data.append(0)
-
-    if not records_to_update:
+    # 2. Calculate virtual power from the speed channel of the stream
+    if activity.stream is None:
+        return activity
+
+    speed = activity.stream.channel("speed")
+    moving = ~np.isnan(speed) & (speed > 0)
+    if not moving.any():
         return activity  # No speed data to calculate from
 
+    speed_kmh = speed[moving] * 3.6
+    virtual_power = np.trunc(
+        calculations.estimate_power_tacx(speed_kmh, trainer_setting)
+    )
+    stored_power = activity.stream.channel("power").copy()
+    stored_power[moving] = virtual_power
+    activity.stream.set_channel("power", stored_power)
+
+    power_data = np.where(moving, stored_power, 0).tolist()
+
     # 3. Recalculate power-dependent summary statistics
     activity.average_power = int(sum(power_data) / len(power_data)) if power_data else 0
     activity.max_power = int(max(power_data)) if power_data else 0
 
     # Get FTP for TSS/IF calculation
-    from crud import get_latest_ftp  # Local import to avoid circular dependency
-
-    ftp_record = get_latest_ftp(
-        db, athlete_id=activity.athlete_id, activity_date=activity.start_time
+    ftp = (
+        thresholds.get_threshold(
+            db, activity.athlete_id, models.MetricType.FTP, on=activity.start_time
+        )
+        or 0
     )
-    ftp = ftp_record[0] if ftp_record else 0
 
-    np = calculations.calculate_normalized_power(power_data)
-    activity.normalized_power = np
+    normalized_power = calculations.calculate_normalized_power(power_data)
+    activity.normalized_power = normalized_power
     activity.tss = (
-        calculations.calculate_tss(np, ftp, activity.total_moving_time)
+        calculations.calculate_tss(normalized_power, ftp, activity.total_moving_time)
         if ftp > 0
         else 0
     )
-    activity.intensity_factor = round(np / ftp, 2) if ftp > 0 else 0.0
+    activity.intensity_factor = round(normalized_power / ftp, 2) if ftp > 0 else 0.0
+    update_power_curve(activity)
 
-    # The activity object and its records are part of the session, so they will be
+    # The activity object and its stream are part of the session, so they will be
     # committed by the calling function (crud.update_activity).
     db.add(activity)
     return activity
 
 
+def update_power_curve(activity: models.Activity, power: np.ndarray | None = None):
+    """
+    (Re)computes the stored mean-max power curve of an activity from the power
+    channel of its stream, or from ``power`` when the stream is not attached to
+    the activity yet. Activities without power data get no curve.
+    """
+    if power is None and activity.stream is not None:
+        power = activity.stream.channel("power")
+    if power is None or np.isnan(power).all():
+        activity.power_curve = None
+        return activity
+
+    curve = calculations.calculate_power_curve(power).astype(np.float32).tobytes()
+    if activity.power_curve is not None:
+        activity.power_curve.power = curve
+    else:
+        activity.power_curve = models.ActivityPowerCurve(power=curve)
+    return activity
+
+
 def process_weekly_workload(
     daily_aggregates: list, end_date: date
 ) -> schemas.WeeklyWorkload:
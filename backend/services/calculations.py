@@ -1,7 +1,7 @@
 from __future__ import annotations
 import numpy as np
 import pandas as pd
-from datetime import date, timedelta
+from datetime import date
 import crud
 
 # --- Perceived Strain Score (PSS) based on Perceived Exertion ---
@@ -41,10 +41,41 @@ def calculate_trimp(time_in_hr_zones: dict) -> int:
     return int(round(total_trimp))
 
 
+def calculate_trimp_batch(
+    hr_arrays: list[np.ndarray], lthrs: np.ndarray | list[float]
+) -> np.ndarray:
+    """
+    zTRIMP of many activities at once, matching calculate_trimp over
+    calculate_time_in_zones per activity. ``lthrs`` holds the LTHR in effect
+    for each activity (NaN or 0 where unknown, giving a TRIMP of 0). All samples
+    are binned in one pass and summed per activity with a weighted bincount.
+    """
+    activity_count = len(hr_arrays)
+    if activity_count == 0:
+        return np.zeros(0, dtype=int)
+
+    lengths = [len(hr) for hr in hr_arrays]
+    activity_index = np.repeat(np.arange(activity_count), lengths)
+    hr = np.concatenate(hr_arrays).astype(np.float64)
+    lthr = np.asarray(lthrs, dtype=np.float64)[activity_index]
+    valid = np.isfinite(hr) & (lthr > 0)
+
+    upper_bounds = np.fromiter(HR_ZONE_DEFINITIONS.values(), dtype=np.float64)
+    # Samples above the last bound land in an extra bin without a weight
+    weights = np.array(
+        [TRIMP_ZONE_WEIGHTS.get(zone, 0) for zone in HR_ZONE_DEFINITIONS] + [0.0]
+    )
+    zones = np.digitize(hr[valid] / lthr[valid], upper_bounds)
+    weighted_seconds = np.bincount(
+        activity_index[valid], weights=weights[zones], minlength=activity_count
+    )
+    return np.rint(weighted_seconds / 60).astype(int)
+
+
 # --- Normalized Power and TSS Calculations ---
 
 
-def calculate_normalized_power(power_data: list[int]) -> int:
+def calculate_normalized_power(power_data: list[int] | np.ndarray) -> int:
     """
     Calculates Normalized Power (NP) from a list of second-by-second power data.
 
@@ -55,13 +86,13 @@ def calculate_normalized_power(power_data: list[int]) -> int:
     4. Take the fourth root of that average.
 
     Args:
-        power_data: A list of integers representing power in watts for each second.
+        power_data: A list or array of power in watts for each second.
 
     Returns:
         The calculated Normalized Power as an integer. Returns 0 if input is empty.
         If the activity is shorter than 30s, it falls back to average power.
     """
-    if not power_data:
+    if power_data is None or len(power_data) == 0:
         return 0
 
     power_series = pd.Series(power_data)
@@ -87,6 +118,53 @@ def calculate_normalized_power(power_data: list[int]) -> int:
     return int(round(normalized_power))
 
 
+NP_ROLLING_WINDOW = 30
+
+
+def calculate_normalized_power_batch(power_arrays: list[np.ndarray]) -> np.ndarray:
+    """
+    Normalized Power of many activities at once, matching
+    calculate_normalized_power per activity (missing samples should be passed
+    as 0 W, as at ingest). The 30 s rolling means of all activities come from
+    one cumulative sum over the concatenated samples; windows that would span
+    two activities are dropped before the per-activity fourth-power means.
+    """
+    activity_count = len(power_arrays)
+    lengths = np.array([len(power) for power in power_arrays], dtype=np.int64)
+    if activity_count == 0 or lengths.sum() == 0:
+        return np.zeros(activity_count, dtype=int)
+
+    power = np.concatenate(power_arrays).astype(np.float64)
+    activity_index = np.repeat(np.arange(activity_count), lengths)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    cumulative = np.concatenate(([0.0], np.cumsum(power)))
+
+    # Rolling mean of the window ending at each sample from the 30th onwards
+    window_ends = np.arange(NP_ROLLING_WINDOW, len(power) + 1)
+    rolling_avg = (
+        cumulative[window_ends] - cumulative[window_ends - NP_ROLLING_WINDOW]
+    ) / NP_ROLLING_WINDOW
+    window_activity = activity_index[window_ends - 1]
+    complete = window_ends - starts[window_activity] >= NP_ROLLING_WINDOW
+
+    window_counts = np.bincount(window_activity[complete], minlength=activity_count)
+    fourth_power_sums = np.bincount(
+        window_activity[complete],
+        weights=rolling_avg[complete] ** 4,
+        minlength=activity_count,
+    )
+    # Activities shorter than the window fall back to their average power
+    average_power = np.bincount(
+        activity_index, weights=power, minlength=activity_count
+    ) / np.maximum(lengths, 1)
+    normalized_power = np.where(
+        window_counts > 0,
+        (fourth_power_sums / np.maximum(window_counts, 1)) ** 0.25,
+        average_power,
+    )
+    return np.rint(normalized_power).astype(int)
+
+
 def calculate_tss(normalized_power: int, ftp: int, duration_seconds: int) -> int:
     """
     Calculates Training Stress Score (TSS).
@@ -111,6 +189,48 @@ def calculate_tss(normalized_power: int, ftp: int, duration_seconds: int) -> int
     return int(round(tss))
 
 
+def calculate_tss_batch(
+    normalized_power: np.ndarray, ftp: np.ndarray, duration_seconds: np.ndarray
+) -> np.ndarray:
+    """
+    Element-wise calculate_tss; activities without a valid (positive) FTP,
+    duration or Normalized Power get a TSS of 0.
+    """
+    normalized_power = np.asarray(normalized_power, dtype=np.float64)
+    ftp = np.nan_to_num(np.asarray(ftp, dtype=np.float64))
+    duration_seconds = np.asarray(duration_seconds, dtype=np.float64)
+
+    valid = (ftp > 0) & (duration_seconds > 0) & (normalized_power > 0)
+    safe_ftp = np.where(valid, ftp, 1.0)
+    intensity_factor = normalized_power / safe_ftp
+    tss = (
+        (duration_seconds * normalized_power * intensity_factor)
+        / (safe_ftp * 3600)
+        * 100
+    )
+    return np.where(valid, np.rint(tss), 0).astype(int)
+
+
+def calculate_unified_training_load(
+    tss: int | None,
+    trimp: int | None,
+    perceived_strain_score: int | None,
+    psf_trimp: float,
+    psf_pss: float,
+) -> int:
+    """
+    The load used for the PMC: TSS when available, otherwise TRIMP or PSS scaled
+    to TSS by the athlete's personalized scaling factors.
+    """
+    if tss and tss > 0:
+        return tss
+    if trimp and trimp > 0:
+        return int(round(trimp * psf_trimp))
+    if perceived_strain_score and perceived_strain_score > 0:
+        return int(round(perceived_strain_score * psf_pss))
+    return 0
+
+
 # --- Virtual Power Calculation (Tacx Blue Motion T2600) ---
 
 # Reference Data Table:
@@ -183,27 +303,60 @@ HR_ZONE_DEFINITIONS = {
 }
 
 
+def _zone_indices(data_stream, threshold: float, zone_definitions: dict) -> np.ndarray:
+    """
+    Bins every valid sample of a stream into its zone index. Missing samples
+    (None/NaN) are masked out; a sample falls into the first zone whose upper
+    bound is strictly greater than its percentage of the threshold.
+    """
+    values = np.asarray(data_stream, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    upper_bounds = np.fromiter(zone_definitions.values(), dtype=np.float64)
+    return np.digitize(values / threshold, upper_bounds)
+
+
 def calculate_time_in_zones(
-    data_stream: list[int], threshold: int, zone_definitions: dict
+    data_stream: list[int] | np.ndarray, threshold: int, zone_definitions: dict
 ) -> dict[str, int]:
     """
     Calculates the total time in seconds spent in each physiological zone.
     """
-    if not threshold or not data_stream:
-        return {zone_name: 0 for zone_name in zone_definitions}
+    (zones,) = calculate_time_in_zones_multi(
+        [(data_stream, threshold, zone_definitions)]
+    )
+    return zones
 
-    zones = {zone_name: 0 for zone_name in zone_definitions}
-    for value in data_stream:
-        if value is None:
-            continue
 
-        percent_of_threshold = value / threshold
-        for zone_name, upper_bound in zone_definitions.items():
-            if percent_of_threshold < upper_bound:
-                zones[zone_name] += 1
-                break
+def calculate_time_in_zones_multi(
+    zone_requests: list[tuple[list[int] | np.ndarray, int, dict]],
+) -> list[dict[str, int]]:
+    """
+    Calculates time in zones for several (data_stream, threshold, zone_definitions)
+    requests at once, e.g. power and heart rate zones for the same activity.
+    All samples are binned and counted in a single bincount pass.
+    """
+    indices, offsets, total_bins = [], [], 0
+    for data_stream, threshold, zone_definitions in zone_requests:
+        offsets.append(total_bins)
+        if threshold and data_stream is not None and len(data_stream) > 0:
+            indices.append(
+                _zone_indices(data_stream, threshold, zone_definitions) + total_bins
+            )
+        # One extra bin per request catches values above the last upper bound
+        total_bins += len(zone_definitions) + 1
+
+    counts = np.bincount(
+        np.concatenate(indices) if indices else np.empty(0, dtype=np.int64),
+        minlength=total_bins,
+    )
 
-    return zones
+    return [
+        {
+            zone_name: int(counts[offset + i])
+            for i, zone_name in enumerate(zone_definitions)
+        }
+        for (_, _, zone_definitions), offset in zip(zone_requests, offsets)
+    ]
 
 
 # --- Performance Management Chart (PMC) Calculations ---
@@ -224,6 +377,81 @@ def calculate_daily_pmc(
     return {"ctl": ctl_today, "atl": atl_today, "tsb": tsb_today}
 
 
+# --- Mean-max kernel ---
+
+# Durations up to this limit (seconds) are evaluated every second; beyond it
+# the default duration grid grows geometrically to stay fast on long files.
+DENSE_DURATION_LIMIT = 600
+LOG_DURATION_STEP = 1.02
+
+
+def mean_max_durations(sample_count: int) -> np.ndarray:
+    """
+    Default durations for the mean-max kernel: every second from 1 s to
+    DENSE_DURATION_LIMIT, then log-spaced steps up to the full activity length.
+    """
+    dense = np.arange(1, min(sample_count, DENSE_DURATION_LIMIT) + 1)
+    if sample_count <= DENSE_DURATION_LIMIT:
+        return dense
+
+    step_count = int(
+        np.ceil(np.log(sample_count / DENSE_DURATION_LIMIT) / np.log(LOG_DURATION_STEP))
+    )
+    sparse = np.geomspace(DENSE_DURATION_LIMIT, sample_count, step_count + 1)
+    return np.unique(np.concatenate((dense, np.round(sparse).astype(np.int64))))
+
+
+def calculate_mean_max(
+    data_stream: list | np.ndarray, durations: list[int] | np.ndarray | None = None
+) -> dict[str, np.ndarray]:
+    """
+    Finds the best average of a second-by-second stream for many durations at
+    once, using a single cumulative sum shared by every duration.
+
+    A window containing a missing sample (None/NaN) is not a valid effort, in
+    line with pandas rolling means. If no durations are given, every second up
+    to DENSE_DURATION_LIMIT and log-spaced durations beyond it are evaluated.
+
+    Returns parallel arrays: "duration", "average" (NaN when no valid window
+    exists), and the inclusive "start_index"/"end_index" of the best window
+    (-1 when there is none).
+    """
+    values = np.asarray(data_stream, dtype=np.float64)
+    sample_count = len(values)
+    if durations is None:
+        durations = mean_max_durations(sample_count)
+    durations = np.asarray(durations, dtype=np.int64)
+
+    missing = np.isnan(values)
+    cumulative = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, values))))
+    cumulative_missing = np.concatenate(([0], np.cumsum(missing)))
+    has_missing = bool(missing.any())
+
+    averages = np.full(len(durations), np.nan)
+    start_indices = np.full(len(durations), -1, dtype=np.int64)
+    for i, duration in enumerate(durations):
+        if duration < 1 or duration > sample_count:
+            continue
+        window_sums = cumulative[duration:] - cumulative[:-duration]
+        if has_missing:
+            window_missing = (
+                cumulative_missing[duration:] - cumulative_missing[:-duration]
+            )
+            window_sums[window_missing > 0] = -np.inf
+        best_start = int(np.argmax(window_sums))
+        if np.isfinite(window_sums[best_start]):
+            averages[i] = window_sums[best_start] / duration
+            start_indices[i] = best_start
+
+    end_indices = np.where(start_indices >= 0, start_indices + durations - 1, -1)
+    return {
+        "duration": durations,
+        "average": averages,
+        "start_index": start_indices,
+        "end_index": end_indices,
+    }
+
+
 def calculate_historical_mmp(power_data: list[int], intervals: list[int]) -> list[dict]:
     """
     Calculates the Mean Maximal Power (MMP) curve from a large series of power data.
@@ -231,17 +459,179 @@ def calculate_historical_mmp(power_data: list[int], intervals: list[int]) -> lis
     if not power_data:
         return []
 
-    power_series = pd.Series(power_data)
-    mmp_curve = []
+    mean_max = calculate_mean_max(power_data, intervals)
+    return [
+        {"duration": int(duration), "power": int(round(power))}
+        for duration, power in zip(mean_max["duration"], mean_max["average"])
+        if not np.isnan(power)
+    ]
+
+
+# Durations (in seconds) at which per-activity mean-max power curves are stored:
+# every second up to 2 minutes, then progressively coarser steps up to 12 hours.
+MMP_CURVE_DURATIONS = np.concatenate(
+    (
+        np.arange(1, 121),
+        np.arange(125, 601, 5),
+        np.arange(630, 3601, 30),
+        np.arange(3900, 43201, 300),
+    )
+)
+
+
+def calculate_power_curve(
+    power_data: list[int] | np.ndarray, durations: np.ndarray = MMP_CURVE_DURATIONS
+) -> np.ndarray:
+    """
+    Calculates the mean-max power curve of a single activity: the best average
+    power for each duration. Missing samples count as zero watts. Durations
+    longer than the activity are NaN.
+    """
+    power = np.nan_to_num(np.asarray(power_data, dtype=np.float64))
+    return calculate_mean_max(power, durations)["average"]
+
+
+def combine_power_curves(curves: list[np.ndarray]) -> np.ndarray:
+    """
+    Combines per-activity mean-max curves into one curve by taking the
+    element-wise maximum, ignoring durations an activity does not cover.
+    """
+    if not curves:
+        return np.full(len(MMP_CURVE_DURATIONS), np.nan)
+    return np.fmax.reduce(np.vstack(curves), axis=0)
+
+
+def calculate_pmc_series(
+    daily_tss: np.ndarray, ctl_start: float, atl_start: float
+) -> dict[str, np.ndarray]:
+    """
+    Runs the CTL/ATL recurrence of calculate_daily_pmc over a whole series of
+    daily loads at once. Each value is an exponentially weighted moving average
+    seeded with the state of the day before the series starts.
+    """
+    seeded = np.concatenate(([0.0], np.asarray(daily_tss, dtype=np.float64)))
+
+    seeded[0] = ctl_start
+    ctl = pd.Series(seeded).ewm(alpha=1 / CTL_TC, adjust=False).mean().to_numpy()[1:]
+    seeded[0] = atl_start
+    atl = pd.Series(seeded).ewm(alpha=1 / ATL_TC, adjust=False).mean().to_numpy()[1:]
 
-    for interval in intervals:
-        if len(power_series) >= interval:
-            # Calculate rolling average and find the max
-            max_power = power_series.rolling(window=interval).mean().max()
-            if bool(pd.notna(max_power)):
-                mmp_curve.append({"duration": interval, "power": int(round(max_power))})
+    return {"ctl": ctl, "atl": atl, "tsb": ctl - atl}
 
-    return mmp_curve
+
+def decay_pmc(ctl, atl, rest_days):
+    """
+    CTL/ATL after ``rest_days`` days without load, in closed form: each rest
+    day multiplies the values by (1 - 1/TC). Works element-wise on arrays.
+    """
+    rest_days = np.asarray(rest_days)
+    ctl = np.asarray(ctl, dtype=np.float64) * (1 - 1 / CTL_TC) ** rest_days
+    atl = np.asarray(atl, dtype=np.float64) * (1 - 1 / ATL_TC) ** rest_days
+    return ctl, atl
+
+
+def get_pmc_series(
+    db, athlete_id: int, start_date: date, end_date: date
+) -> dict[str, np.ndarray]:
+    """
+    Dense daily PMC arrays for [start_date, end_date]: stored days as stored,
+    rest days decayed in closed form from the last stored day before them
+    (k days after it, the values are the stored ones times (1 - 1/TC)^k).
+    Rest days have tss/if_avg 0 and id 0. Returns "dates" plus one array per
+    column.
+    """
+    rows = crud.get_pmc_rows_with_seed(db, athlete_id, start_date, end_date)
+    days = max((end_date - start_date).days + 1, 0)
+    positions = np.arange(days)
+    series = {
+        "dates": np.datetime64(start_date, "D") + positions,
+        "id": np.zeros(days, dtype=int),
+        "ctl": np.zeros(days),
+        "atl": np.zeros(days),
+        "tsb": np.zeros(days),
+        "tss": np.zeros(days, dtype=int),
+        "if_avg": np.zeros(days),
+    }
+    if not rows:
+        return series
+
+    offsets = np.array([(row.date - start_date).days for row in rows])
+    stored_values = {
+        column: np.array([getattr(row, column) or 0 for row in rows])
+        for column in ("id", "ctl", "atl", "tss", "if_avg")
+    }
+    # Index of the row each day carries forward: the latest stored day on or
+    # before it, else the seed row before the range (-1 when there is none)
+    anchor = np.full(days, 0 if offsets[0] < 0 else -1)
+    in_range = offsets >= 0
+    anchor[offsets[in_range]] = np.flatnonzero(in_range)
+    anchor = np.maximum.accumulate(anchor)
+
+    found = anchor >= 0
+    anchor = anchor[found]
+    rest_days = positions[found] - offsets[anchor]
+    stored = rest_days == 0
+
+    series["ctl"][found], series["atl"][found] = decay_pmc(
+        stored_values["ctl"][anchor], stored_values["atl"][anchor], rest_days
+    )
+    series["tsb"] = series["ctl"] - series["atl"]
+    for column in ("id", "tss", "if_avg"):
+        series[column][found] = np.where(stored, stored_values[column][anchor], 0)
+    return series
+
+
+def project_pmc(
+    planned_load: np.ndarray, ctl_start: np.ndarray, atl_start: np.ndarray
+) -> dict[str, np.ndarray]:
+    """
+    Projects CTL/ATL/TSB for several athletes at once. ``planned_load`` is an
+    (athletes, days) array of daily loads, ``ctl_start``/``atl_start`` the
+    state of each athlete on the day before the first planned day.
+
+    Unrolling the recurrence gives, for day i and decay d = 1 - 1/TC,
+        value[i] = d^(i+1) * start + sum_{j<=i} d^(i-j) * load[j] / TC
+    so the whole projection is one matrix product with a lower-triangular
+    decay kernel per time constant, with no loop over days or athletes.
+    """
+    load = np.atleast_2d(np.asarray(planned_load, dtype=np.float64))
+    days = np.arange(load.shape[1])
+    lag = days[:, None] - days[None, :]
+
+    def project(time_constant, start):
+        decay = 1 - 1 / time_constant
+        kernel = np.where(lag >= 0, decay ** np.maximum(lag, 0), 0.0) / time_constant
+        start = np.asarray(start, dtype=np.float64)[:, None]
+        return load @ kernel.T + start * decay ** (days + 1)
+
+    ctl = project(CTL_TC, ctl_start)
+    atl = project(ATL_TC, atl_start)
+    return {"ctl": ctl, "atl": atl, "tsb": ctl - atl}
+
+
+def project_athletes_pmc(
+    db, athlete_ids: list[int], start_date: date, planned_load: np.ndarray
+) -> dict[str, np.ndarray]:
+    """
+    Projects the PMC of several athletes from start_date under a planned
+    (athletes, days) load schedule. Each athlete starts from their last stored
+    PMC day before start_date, decayed over any rest days up to it.
+    """
+    latest = {
+        metric.athlete_id: metric
+        for metric in crud.get_latest_daily_metrics_before_date(
+            db, athlete_ids, start_date
+        )
+    }
+    ctl_start, atl_start, rest_days = (np.zeros(len(athlete_ids)) for _ in range(3))
+    for i, athlete_id in enumerate(athlete_ids):
+        metric = latest.get(athlete_id)
+        if metric is not None:
+            ctl_start[i], atl_start[i] = metric.ctl, metric.atl
+            rest_days[i] = (start_date - metric.date).days - 1
+
+    ctl_start, atl_start = decay_pmc(ctl_start, atl_start, rest_days)
+    return project_pmc(planned_load, ctl_start, atl_start)
 
 
 def recalculate_pmc_from_date(db, athlete_id: int, start_recalc_date: date):
@@ -249,6 +639,10 @@ def recalculate_pmc_from_date(db, athlete_id: int, start_recalc_date: date):
     Recalculates all PMC data for an athlete from a specific date forward.
     This handles historical uploads, deleted activities, and data corrections.
 
+    Daily loads for the whole range are fetched with one grouped query, the
+    CTL/ATL recurrence runs as a single vectorized pass and the results are
+    written back with one bulk upsert.
+
     NOTE: This function is imported and used by routers/activities.py. It is placed
     here to keep all performance calculation logic together.
     """
@@ -271,23 +665,38 @@ def recalculate_pmc_from_date(db, athlete_id: int, start_recalc_date: date):
     if last_metric and last_metric.date > today:
         end_recalc_date = last_metric.date
 
-    # 3. Loop through each day in the range, recalculating and upserting.
-    current_date = start_recalc_date
-    while current_date <= end_recalc_date:
-        daily_summary = crud.get_daily_activity_summary(db, athlete_id, current_date)
-        pmc_values = calculate_daily_pmc(
-            current_ctl, current_atl, daily_summary["total_tss"]
-        )
-        crud.upsert_daily_metric(
-            db,
-            athlete_id=athlete_id,
-            date=current_date,
-            **pmc_values,
-            tss=daily_summary["total_tss"],
-            if_avg=daily_summary["avg_if"],
-        )
-        current_ctl, current_atl = pmc_values["ctl"], pmc_values["atl"]
-        current_date += timedelta(days=1)
+    if end_recalc_date < start_recalc_date:
+        return
+
+    # 3. Build dense daily load / IF arrays for the range from one grouped query.
+    days = pd.date_range(start=start_recalc_date, end=end_recalc_date, freq="D")
+    daily_tss = np.zeros(len(days))
+    daily_if = np.zeros(len(days))
+    daily_loads = crud.get_daily_activity_loads(
+        db, athlete_id, start_recalc_date, end_recalc_date
+    )
+    for row in daily_loads:
+        day_index = (pd.Timestamp(row.date) - days[0]).days
+        daily_tss[day_index] = row.total_load or 0
+        daily_if[day_index] = row.avg_if or 0.0
+
+    # 4. Run the PMC recurrence over the whole range and upsert in bulk.
+    pmc = calculate_pmc_series(daily_tss, current_ctl, current_atl)
+    crud.bulk_upsert_daily_metrics(
+        db,
+        athlete_id=athlete_id,
+        metrics=[
+            {
+                "date": day.date(),
+                "ctl": float(pmc["ctl"][i]),
+                "atl": float(pmc["atl"][i]),
+                "tsb": float(pmc["tsb"][i]),
+                "tss": int(daily_tss[i]),
+                "if_avg": float(daily_if[i]),
+            }
+            for i, day in enumerate(days)
+        ],
+    )
 
     db.commit()
 
@@ -300,22 +709,16 @@ def find_best_n_minute_average(data_stream: list, interval_minutes: int) -> dict
     Finds the best N-minute average from a second-by-second data stream.
     Returns the max average value and the start/end indices of that segment.
     """
-    if not data_stream or len(data_stream) < interval_minutes * 60:
+    if data_stream is None or len(data_stream) < interval_minutes * 60:
         return {}
 
-    interval_seconds = interval_minutes * 60
-    series = pd.Series(data_stream)
-
-    # Calculate the rolling average
-    rolling_avg = series.rolling(window=interval_seconds).mean()
-
-    # Find the maximum average value and the index where it occurs
-    max_avg = rolling_avg.max()
-    if bool(pd.isna(max_avg)):
+    mean_max = calculate_mean_max(data_stream, [interval_minutes * 60])
+    max_avg = mean_max["average"][0]
+    if np.isnan(max_avg):
         return {}
 
-    # idxmax() gives the end index of the window where the max average was found
-    end_index = int(rolling_avg.idxmax())
-    start_index = end_index - interval_seconds + 1
-
-    return {"max_average": max_avg, "start_index": start_index, "end_index": end_index}
+    return {
+        "max_average": float(max_avg),
+        "start_index": int(mean_max["start_index"][0]),
+        "end_index": int(mean_max["end_index"][0]),
+    }
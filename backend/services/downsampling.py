@@ -0,0 +1,99 @@
+import numpy as np
+
+
+def downsample_indices(sample_count: int, max_points: int) -> np.ndarray:
+    """
+    Picks at most ``max_points`` evenly spaced sample indices, always keeping
+    the first and last sample.
+    """
+    if max_points >= sample_count:
+        return np.arange(sample_count)
+    return np.unique(np.linspace(0, sample_count - 1, max_points).round().astype(int))
+
+
+def _normalise(values: np.ndarray) -> np.ndarray:
+    """Scales each channel (row) to [0, 1] so no channel dominates; NaN -> 0."""
+    missing = np.isnan(values)
+    low = np.where(missing, np.inf, values).min(axis=1, keepdims=True)
+    high = np.where(missing, -np.inf, values).max(axis=1, keepdims=True)
+    span = high - low
+    span[~(span > 0)] = 1.0
+    low[~np.isfinite(low)] = 0.0
+    return np.nan_to_num((values - low) / span)
+
+
+def lttb_indices(
+    values: np.ndarray, max_points: int, x: np.ndarray | None = None
+) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: picks ``max_points`` sample indices that
+    preserve the visual shape of the series. ``values`` is one channel or a
+    (channels, samples) array; with several channels the triangle areas of the
+    normalised channels are summed, so all channels share the same indices.
+    ``x`` defaults to the sample index (pass the time channel to respect gaps).
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    sample_count = values.shape[1]
+    if max_points >= sample_count or max_points < 3:
+        return downsample_indices(sample_count, max_points)
+
+    x = (
+        np.arange(sample_count, dtype=np.float64)
+        if x is None
+        else np.asarray(x, dtype=np.float64)
+    )
+    y = _normalise(values)
+
+    # First and last samples are always kept; the rest are split into buckets
+    edges = np.linspace(1, sample_count - 1, max_points - 1).astype(int)
+    indices = np.empty(max_points, dtype=int)
+    indices[0], indices[-1] = 0, sample_count - 1
+
+    selected = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = sample_count - 1, sample_count
+        next_x = x[next_start:next_end].mean()
+        next_y = y[:, next_start:next_end].mean(axis=1, keepdims=True)
+
+        # Twice the area of the triangle (selected, candidate, next bucket mean)
+        a_x, a_y = x[selected], y[:, selected : selected + 1]
+        areas = np.abs(
+            (a_x - next_x) * (y[:, start:end] - a_y)
+            - (a_x - x[start:end]) * (next_y - a_y)
+        ).sum(axis=0)
+
+        selected = start + int(np.argmax(areas))
+        indices[bucket + 1] = selected
+
+    return indices
+
+
+def min_max_indices(values: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Splits the series into buckets and keeps the minimum and maximum sample of
+    every channel in each bucket, so spikes survive. ``values`` is one channel
+    or a (channels, samples) array; the bucket count is chosen so that at most
+    ``max_points`` indices are returned.
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    channel_count, sample_count = values.shape
+    if max_points >= sample_count:
+        return np.arange(sample_count)
+
+    bucket_count = max((max_points - 2) // (2 * channel_count), 1)
+    bucket_size = -(-sample_count // bucket_count)
+    padded = np.full((channel_count, bucket_count * bucket_size), np.nan)
+    padded[:, :sample_count] = values
+    buckets = padded.reshape(channel_count, bucket_count, bucket_size)
+
+    # NaN never wins: it is +inf for the minimum and -inf for the maximum
+    offsets = np.arange(bucket_count)[:, None] * bucket_size
+    minima = np.nan_to_num(buckets, nan=np.inf).argmin(axis=2).T + offsets
+    maxima = np.nan_to_num(buckets, nan=-np.inf).argmax(axis=2).T + offsets
+
+    indices = np.concatenate([minima.ravel(), maxima.ravel(), [0, sample_count - 1]])
+    return np.unique(indices[indices < sample_count])
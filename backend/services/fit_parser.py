@@ -1,10 +1,172 @@
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+
 import fitparse
+import numpy as np
 from sqlalchemy.orm import Session
 
 import crud
 import schemas
 import models
-from . import calculations
+from . import calculations, thresholds
+
+SEMICIRCLES_TO_DEGREES = 180 / 2**31
+
+# FIT record fields decoded into stream channels
+RECORD_CHANNELS = {
+    "power": "power",
+    "heart_rate": "heart_rate",
+    "cadence": "cadence",
+    "speed": "speed",
+    "altitude": "altitude",
+    "position_lat": "latitude",
+    "position_long": "longitude",
+}
+
+# FIT lap fields mapped onto ActivityLap columns
+LAP_FIELDS = {
+    "message_index": "lap_number",
+    "total_timer_time": "duration",
+    "total_distance": "distance",
+    "avg_power": "average_power",
+    "total_ascent": "total_elevation_gain",
+    "avg_speed": "average_speed",
+    "avg_cadence": "average_cadence",
+    "avg_heart_rate": "average_heart_rate",
+}
+
+# Rough lower bound on the encoded size of one record message, used to size
+# the channel buffers up front. Buffers are grown if a file beats it.
+BYTES_PER_RECORD_ESTIMATE = 24
+
+
+def _grow_buffers(buffers: dict[str, np.ndarray], capacity: int) -> None:
+    for name, buffer in buffers.items():
+        grown = np.full(capacity, np.nan, dtype=buffer.dtype)
+        grown[: len(buffer)] = buffer
+        buffers[name] = grown
+
+
+def decode_fit_file(content: bytes) -> dict:
+    """
+    Decodes FIT file content in a single pass over its messages.
+
+    Record fields are written straight into preallocated per-channel arrays
+    instead of one dict per record, and the lap, session and device_info
+    messages are captured along the way. Returns a dict with the sample
+    ``timestamps`` (raw FIT seconds), the record ``channels``, the ``laps``,
+    the first ``session`` and ``device_info`` field values, and the raw
+    session ``start_time``.
+    """
+    fitfile = fitparse.FitFile(content)
+
+    capacity = max(len(content) // BYTES_PER_RECORD_ESTIMATE, 1)
+    buffers = {"timestamp": np.full(capacity, np.nan)}
+    buffers.update(
+        {channel: np.full(capacity, np.nan) for channel in RECORD_CHANNELS.values()}
+    )
+    sample_count = 0
+    lap_dicts = []
+    session, session_start_raw, device_info = None, None, None
+
+    for message in fitfile.get_messages():
+        name = message.name
+
+        if name == "record":
+            if sample_count == capacity:
+                capacity *= 2
+                _grow_buffers(buffers, capacity)
+
+            has_timestamp = False
+            for field in message.fields:
+                if field.value is None:
+                    continue
+                if field.name == "timestamp":
+                    buffers["timestamp"][sample_count] = field.raw_value
+                    has_timestamp = True
+                    continue
+                channel = RECORD_CHANNELS.get(field.name)
+                if channel is not None:
+                    buffers[channel][sample_count] = field.value
+
+            if has_timestamp:
+                sample_count += 1
+            else:
+                # Discard the partially written row; it gets overwritten next
+                for buffer in buffers.values():
+                    buffer[sample_count] = np.nan
+
+        elif name == "lap":
+            lap_data = {column: None for column in LAP_FIELDS.values()}
+            for field in message.fields:
+                column = LAP_FIELDS.get(field.name)
+                if column is not None:
+                    lap_data[column] = field.value
+            if lap_data["lap_number"] is None:
+                lap_data["lap_number"] = len(lap_dicts) + 1
+            lap_data["duration"] = int(lap_data["duration"] or 0)
+            lap_dicts.append(lap_data)
+
+        elif name == "session" and session is None:
+            session = {field.name: field.value for field in message.fields}
+            start_field = message.get("start_time")
+            session_start_raw = start_field.raw_value if start_field else None
+
+        elif name == "device_info" and device_info is None:
+            device_info = {field.name: field.value for field in message.fields}
+
+    channels = {
+        channel: buffers[channel][:sample_count] for channel in RECORD_CHANNELS.values()
+    }
+    channels["latitude"] *= SEMICIRCLES_TO_DEGREES
+    channels["longitude"] *= SEMICIRCLES_TO_DEGREES
+
+    return {
+        "timestamps": buffers["timestamp"][:sample_count],
+        "channels": channels,
+        "laps": lap_dicts,
+        "session": session,
+        "session_start_raw": session_start_raw,
+        "device_info": device_info,
+    }
+
+
+def _decode_fit_path(file_path: str) -> dict:
+    with open(file_path, "rb") as fit_file:
+        return decode_fit_file(fit_file.read())
+
+
+def iter_decoded_fit_files(
+    file_paths: list[str], max_workers: int | None = None
+) -> Iterator[tuple[str, dict | Exception]]:
+    """
+    Decodes FIT files in a process pool, yielding (file_path, decoded) in input
+    order. A file that fails to decode yields its exception instead. Only a few
+    files per worker are in flight at once, so memory stays bounded however many
+    files are passed in.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    paths = iter(file_paths)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque(
+            (path, executor.submit(_decode_fit_path, path))
+            for path in itertools.islice(paths, 2 * max_workers)
+        )
+        while pending:
+            file_path, future = pending.popleft()
+            next_path = next(paths, None)
+            if next_path is not None:
+                pending.append(
+                    (next_path, executor.submit(_decode_fit_path, next_path))
+                )
+            try:
+                decoded = future.result()
+            except Exception as e:
+                decoded = e
+            yield file_path, decoded
 
 
 def parse_fit_file(
@@ -14,76 +176,44 @@ def parse_fit_file(
     file_name: str,
 ) -> tuple[
     schemas.ActivityBase,
-    list[dict],
+    dict[str, np.ndarray],
     list[dict],
     list[schemas.PotentialPerformanceMarkerCreate],
 ]:
     """
     Parses FIT file content, calculates metrics, and prepares data for database insertion.
-    """
-    fitfile = fitparse.FitFile(content)
-
-    record_dicts, power_data, lap_dicts = [], [], []
-    record_fields = [
-        "timestamp",
-        "power",
-        "heart_rate",
-        "cadence",
-        "speed",
-        "altitude",
-        "position_lat",
-        "position_long",
-    ]
-
-    for message in fitfile.get_messages():
-        if message.name == "lap":
-            lap_data = {}
-            lap_number = message.get_value("message_index")
-            lap_data["lap_number"] = (
-                lap_number if lap_number is not None else len(lap_dicts) + 1
-            )
-            lap_data["duration"] = int(message.get_value("total_timer_time") or 0)
-            lap_data["distance"] = message.get_value("total_distance")
-            lap_data["average_power"] = message.get_value("avg_power")
-            lap_data["total_elevation_gain"] = message.get_value("total_ascent")
-            lap_data["average_speed"] = message.get_value("avg_speed")
-            lap_data["average_cadence"] = message.get_value("avg_cadence")
-            lap_data["average_heart_rate"] = message.get_value("avg_heart_rate")
-            lap_dicts.append(lap_data)
-
-        if message.name != "record":
-            continue
-
-        record_data = {field: message.get_value(field) for field in record_fields}
-        if not record_data.get("timestamp"):
-            continue
-
-        if record_data["position_lat"] is not None:
-            record_data["latitude"] = record_data["position_lat"] * (180 / 2**31)
-        else:
-            record_data["latitude"] = None
-
-        if record_data["position_long"] is not None:
-            record_data["longitude"] = record_data["position_long"] * (180 / 2**31)
-        else:
-            record_data["longitude"] = None
 
-        del record_data["position_lat"]
-        del record_data["position_long"]
+    The returned streams map channel names to per-second arrays, with ``time``
+    holding each sample's offset in seconds from the activity start.
+    """
+    return build_activity(decode_fit_file(content), db, athlete_id, file_name)
 
-        record_dicts.append(record_data)
-        power_data.append(record_data.get("power", 0) or 0)
 
-    if not record_dicts:
+def build_activity(
+    decoded: dict,
+    db: Session,
+    athlete_id: int,
+    file_name: str,
+) -> tuple[
+    schemas.ActivityBase,
+    dict[str, np.ndarray],
+    list[dict],
+    list[schemas.PotentialPerformanceMarkerCreate],
+]:
+    """
+    Calculates metrics for a decoded FIT file (see decode_fit_file) and prepares
+    the same data as parse_fit_file.
+    """
+    if len(decoded["timestamps"]) == 0:
         raise ValueError("No valid record messages found in FIT file.")
 
     # --- Device information ---
 
     device_id = None
-    device_info_msg = next(fitfile.get_messages("device_info"), None)
-    if device_info_msg:
-        manufacturer = device_info_msg.get_value("manufacturer")
-        product_name = device_info_msg.get_value("product_name")
+    device_info = decoded["device_info"]
+    if device_info:
+        manufacturer = device_info.get("manufacturer")
+        product_name = device_info.get("product_name")
         if (
             manufacturer
             and isinstance(manufacturer, str)
@@ -97,26 +227,35 @@ def parse_fit_file(
 
     # --- Activity summary ---
 
-    session_summary = next(fitfile.get_messages("session"), None)
+    session_summary = decoded["session"]
     if not session_summary:
         raise ValueError("No session summary message found in FIT file.")
 
-    start_time = session_summary.get_value("start_time")
-    total_moving_time = int(session_summary.get_value("total_timer_time") or 0)
-    total_elapsed_time = int(session_summary.get_value("total_elapsed_time") or 0)
+    start_time = session_summary.get("start_time")
+    total_moving_time = int(session_summary.get("total_timer_time") or 0)
+    total_elapsed_time = int(session_summary.get("total_elapsed_time") or 0)
     duration_seconds = total_moving_time
 
+    # --- Streams ---
+
+    timestamps = decoded["timestamps"]
+    start_raw = decoded["session_start_raw"]
+    if start_raw is None:
+        start_raw = timestamps[0]
+    streams = {"time": (timestamps - start_raw).astype(np.int32)}
+    streams.update(decoded["channels"])
+
+    power_data = np.nan_to_num(streams["power"], nan=0.0)
+    hr_data = streams["heart_rate"]
+    has_hr = bool(np.isfinite(hr_data).any())
+
     # --- TRIMP Calculation ---
     trimp = 0
-    hr_data = [
-        r.get("heart_rate") for r in record_dicts if r.get("heart_rate") is not None
-    ]
-    lthr_record = crud.get_latest_lthr(
-        db, athlete_id=athlete_id, activity_date=start_time
+    lthr = thresholds.get_threshold(
+        db, athlete_id, models.MetricType.THR, on=start_time
     )
-    lthr = lthr_record[0] if lthr_record else None
 
-    if lthr and hr_data:
+    if lthr and has_hr:
         time_in_hr_zones = calculations.calculate_time_in_zones(
             hr_data, lthr, calculations.HR_ZONE_DEFINITIONS
         )
@@ -124,14 +263,18 @@ def parse_fit_file(
 
     # --- Normalized Power and TSS Calculations ---
 
-    ftp_record = crud.get_latest_ftp(
-        db, athlete_id=athlete_id, activity_date=start_time
+    ftp = (
+        thresholds.get_threshold(db, athlete_id, models.MetricType.FTP, on=start_time)
+        or 0
     )
-    ftp = ftp_record[0] if ftp_record else 0
 
-    np = calculations.calculate_normalized_power(power_data)
-    tss = calculations.calculate_tss(np, ftp, duration_seconds) if ftp > 0 else 0
-    intensity_factor = round(np / ftp, 2) if ftp > 0 else 0.0
+    normalized_power = calculations.calculate_normalized_power(power_data)
+    tss = (
+        calculations.calculate_tss(normalized_power, ftp, duration_seconds)
+        if ftp > 0
+        else 0
+    )
+    intensity_factor = round(normalized_power / ftp, 2) if ftp > 0 else 0.0
 
     # --- Unified Training Load Calculation ---
     athlete = crud.get_athlete(db, athlete_id)
@@ -145,7 +288,7 @@ def parse_fit_file(
     # --- Automatic Performance Marker Detection ---
     potential_markers_to_create: list[schemas.PotentialPerformanceMarkerCreate] = []
 
-    if power_data:
+    if len(power_data) > 0:
         best_20_min = calculations.find_best_n_minute_average(power_data, 20)
         if best_20_min:
             best_20_min_power = best_20_min["max_average"]
@@ -163,11 +306,12 @@ def parse_fit_file(
                 )
 
             # LTHR Detection (from the same 20-minute segment)
-            if hr_data:
-                segment_hr = hr_data[
-                    best_20_min["start_index"] : best_20_min["end_index"] + 1
-                ]
-                estimated_lthr = sum(segment_hr) / len(segment_hr) if segment_hr else 0
+            segment_hr = hr_data[
+                best_20_min["start_index"] : best_20_min["end_index"] + 1
+            ]
+            segment_hr = segment_hr[np.isfinite(segment_hr)]
+            if len(segment_hr) > 0:
+                estimated_lthr = float(segment_hr.mean())
                 current_lthr = lthr  # We already fetched this
                 if estimated_lthr > (current_lthr or 0):
                     potential_markers_to_create.append(
@@ -182,28 +326,28 @@ def parse_fit_file(
 
     activity_data = schemas.ActivityBase(
         name=file_name.removesuffix(".fit").replace("_", " "),
-        sport=session_summary.get_value("sport"),
-        sub_sport=session_summary.get_value("sub_sport"),
+        sport=session_summary.get("sport"),
+        sub_sport=session_summary.get("sub_sport"),
         start_time=start_time,
         total_elapsed_time=total_elapsed_time,
         total_moving_time=total_moving_time,
-        total_distance=session_summary.get_value("total_distance"),
-        total_elevation_gain=session_summary.get_value("total_ascent"),
-        total_calories=session_summary.get_value("total_calories"),
-        normalized_power=np,
+        total_distance=session_summary.get("total_distance"),
+        total_elevation_gain=session_summary.get("total_ascent"),
+        total_calories=session_summary.get("total_calories"),
+        normalized_power=normalized_power,
         intensity_factor=intensity_factor,
         tss=tss,
         unified_training_load=int(round(unified_training_load)),
         trimp=trimp,
-        average_power=session_summary.get_value("avg_power"),
-        max_power=session_summary.get_value("max_power"),
-        average_speed=session_summary.get_value("avg_speed"),
-        max_speed=session_summary.get_value("max_speed"),
-        average_heart_rate=session_summary.get_value("avg_heart_rate"),
-        max_heart_rate=session_summary.get_value("max_heart_rate"),
-        average_cadence=session_summary.get_value("avg_cadence"),
-        max_cadence=session_summary.get_value("max_cadence"),
+        average_power=session_summary.get("avg_power"),
+        max_power=session_summary.get("max_power"),
+        average_speed=session_summary.get("avg_speed"),
+        max_speed=session_summary.get("max_speed"),
+        average_heart_rate=session_summary.get("avg_heart_rate"),
+        max_heart_rate=session_summary.get("max_heart_rate"),
+        average_cadence=session_summary.get("avg_cadence"),
+        max_cadence=session_summary.get("max_cadence"),
         device_id=device_id,
     )
 
-    return activity_data, record_dicts, lap_dicts, potential_markers_to_create
+    return activity_data, streams, decoded["laps"], potential_markers_to_create
@@ -0,0 +1,130 @@
+from datetime import date
+from typing import Callable, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+import crud
+import models
+from . import athlete_services, calculations, thresholds
+
+# Activities (with their power and heart rate channels) loaded per batch
+RESCORE_BATCH_SIZE = 50
+
+
+def rescore_activities(
+    db: Session,
+    athlete_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    batch_size: int = RESCORE_BATCH_SIZE,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> dict:
+    """
+    Recomputes NP, IF, TSS, TRIMP and unified training load of an athlete's
+    activities starting in [start_date, end_date) from their stored streams and
+    the thresholds in effect on each activity date, e.g. after an FTP or LTHR
+    change. Activities are processed oldest first in batches, with the
+    calculations vectorized over each batch, and committed per batch.
+    Afterwards scaling factors and the PMC are updated once, from the earliest
+    activity whose load changed. ``on_progress(processed, total)`` is called
+    after every batch.
+
+    Activities without power samples keep their stored NP (e.g. Strava
+    summaries); activities without heart rate samples keep their TRIMP.
+    """
+    athlete = crud.get_athlete(db, athlete_id)
+    if athlete is None:
+        raise ValueError(f"Athlete {athlete_id} not found")
+    # The threshold change that triggered the rescore may have been made in
+    # another process, so this process's cached timeline can predate it
+    thresholds.invalidate_threshold_timeline(athlete_id)
+    psf_trimp, psf_pss = athlete.psf_trimp, athlete.psf_pss
+
+    activity_ids = crud.get_activity_ids_by_athlete(
+        db, athlete_id, start_date=start_date, end_date=end_date
+    )
+    total, changed, earliest_changed = len(activity_ids), 0, None
+
+    for offset in range(0, total, batch_size):
+        activities = crud.get_activities_with_streams(
+            db, activity_ids[offset : offset + batch_size], ["power", "heart_rate"]
+        )
+        power = [_channel(activity, "power") for activity in activities]
+        heart_rate = [_channel(activity, "heart_rate") for activity in activities]
+        start_times = [activity.start_time for activity in activities]
+
+        normalized_power = np.where(
+            [bool(np.isfinite(samples).any()) for samples in power],
+            calculations.calculate_normalized_power_batch(
+                [np.nan_to_num(samples) for samples in power]
+            ),
+            [activity.normalized_power or 0 for activity in activities],
+        )
+        ftp = thresholds.get_thresholds(
+            db, athlete_id, models.MetricType.FTP, start_times
+        )
+        tss = calculations.calculate_tss_batch(
+            normalized_power,
+            ftp,
+            [activity.total_moving_time or 0 for activity in activities],
+        )
+        lthr = thresholds.get_thresholds(
+            db, athlete_id, models.MetricType.THR, start_times
+        )
+        trimp = calculations.calculate_trimp_batch(heart_rate, lthr)
+
+        for i, activity in enumerate(activities):
+            has_ftp = ftp[i] > 0  # False for NaN
+            scores = {
+                "normalized_power": int(normalized_power[i]),
+                "intensity_factor": (
+                    round(float(normalized_power[i] / ftp[i]), 2) if has_ftp else 0.0
+                ),
+                "tss": int(tss[i]),
+                "trimp": (
+                    int(trimp[i])
+                    if np.isfinite(heart_rate[i]).any()
+                    else activity.trimp
+                ),
+            }
+            scores["unified_training_load"] = (
+                calculations.calculate_unified_training_load(
+                    scores["tss"],
+                    scores["trimp"],
+                    activity.perceived_strain_score,
+                    psf_trimp,
+                    psf_pss,
+                )
+            )
+
+            if any(getattr(activity, field) != scores[field] for field in scores):
+                changed += 1
+                activity_date = activity.start_time.date()
+                if earliest_changed is None or activity_date < earliest_changed:
+                    earliest_changed = activity_date
+                for field, value in scores.items():
+                    setattr(activity, field, value)
+
+        db.commit()
+        # Drop the batch's streams from the session before loading the next one
+        db.expunge_all()
+        if on_progress:
+            on_progress(min(offset + batch_size, total), total)
+
+    if earliest_changed is not None:
+        athlete_services.update_scaling_factors(db, athlete_id)
+        calculations.recalculate_pmc_from_date(db, athlete_id, earliest_changed)
+
+    return {
+        "rescored": total,
+        "changed": changed,
+        "pmc_recalculated_from": earliest_changed,
+    }
+
+
+def _channel(activity: models.Activity, name: str) -> np.ndarray:
+    """A stream channel of the activity; empty when it has no stream."""
+    if activity.stream is None:
+        return np.empty(0, dtype=np.float32)
+    return activity.stream.channel(name)
@@ -0,0 +1,199 @@
+import asyncio
+from typing import Any, Optional
+
+import httpx
+from sqlalchemy.orm import Session
+
+from .strava_backfill import (
+    BackfillProgress,
+    ingest_result,
+    record_ingested,
+    record_rate_limited,
+)
+from .strava_rate_limit import StravaRateLimiter, StravaRateLimitExceeded
+from .strava_service import HTTP_TIMEOUT, StravaService, get_scaling_factors
+
+# Activities in flight at once (each fetches its summary and streams
+# concurrently, so up to twice as many requests)
+ASYNC_INGEST_CONCURRENCY = 8
+# Mapped activities inserted per commit
+ASYNC_INGEST_BATCH_SIZE = 25
+
+
+class AsyncStravaClient:
+    """
+    Async counterpart of the StravaService fetch methods on an httpx
+    AsyncClient, drawing from the same shared rate limit budget.
+    """
+
+    def __init__(
+        self,
+        access_token: str,
+        rate_limiter: Optional[StravaRateLimiter] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        concurrency: int = ASYNC_INGEST_CONCURRENCY,
+    ):
+        self.access_token = access_token
+        self.rate_limiter = rate_limiter
+        self.client = client or httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_TIMEOUT[1], connect=HTTP_TIMEOUT[0]),
+            limits=httpx.Limits(
+                max_connections=2 * concurrency,
+                max_keepalive_connections=2 * concurrency,
+            ),
+            # Retries failed connection attempts
+            transport=httpx.AsyncHTTPTransport(retries=3),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose()
+
+    async def _get(self, path: str, params: Optional[dict] = None) -> httpx.Response:
+        if self.rate_limiter is not None:
+            # The limiter talks to Redis synchronously, so all its calls run
+            # in threads to keep the loop free
+            await asyncio.to_thread(self.rate_limiter.acquire)
+        response = await self.client.get(
+            f"{StravaService.BASE_URL}{path}",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+            params=params,
+        )
+        if self.rate_limiter is not None:
+            if response.status_code == 429:
+                raise StravaRateLimitExceeded(
+                    await asyncio.to_thread(
+                        self.rate_limiter.retry_after_throttled, response.headers
+                    )
+                )
+            await asyncio.to_thread(
+                self.rate_limiter.update_from_headers, response.headers
+            )
+        return response
+
+    async def get_activity_summary(self, activity_id: int) -> dict[str, Any]:
+        response = await self._get(f"/activities/{activity_id}")
+        response.raise_for_status()
+        return response.json()
+
+    async def get_activity_streams(self, activity_id: int) -> dict[str, Any]:
+        """The activity's streams; empty if Strava has none (404)."""
+        response = await self._get(
+            f"/activities/{activity_id}/streams",
+            params={
+                "keys": "time,watts,heartrate,latlng,moving,cadence,velocity_smooth,altitude",
+                "key_by_type": "true",
+            },
+        )
+        if response.status_code == 404:
+            return {}
+        response.raise_for_status()
+        return response.json()
+
+    async def fetch_activity(self, activity_id: int) -> dict[str, Any]:
+        """Summary and streams of an activity, fetched concurrently."""
+        # Both requests are awaited even if one fails, so none is left running
+        summary, streams = await asyncio.gather(
+            self.get_activity_summary(activity_id),
+            self.get_activity_streams(activity_id),
+            return_exceptions=True,
+        )
+        for result in (summary, streams):
+            if isinstance(result, BaseException):
+                raise result
+        return {"summary": summary, "streams": streams}
+
+
+async def ingest_strava_activities_async(
+    db: Session,
+    client: AsyncStravaClient,
+    service: StravaService,
+    athlete_id: int,
+    strava_activity_ids: list[int],
+    progress: BackfillProgress,
+    concurrency: int = ASYNC_INGEST_CONCURRENCY,
+    batch_size: int = ASYNC_INGEST_BATCH_SIZE,
+) -> dict[str, Any]:
+    """
+    Pipelines activities through fetch -> map -> batched insert: up to
+    ``concurrency`` activities are fetched at once while completed ones are
+    mapped (with ``service.map_to_betta_activity``) and inserted in batches.
+    If a batch fails to commit, its activities are committed one at a time so
+    only the bad ones are recorded as failed.
+    Once the rate limit is hit, activities not started yet are reported as
+    rate limited without calling the API. Returns like
+    strava_backfill.ingest_strava_activities.
+    """
+    result = ingest_result()
+    scaling_factors = get_scaling_factors(db, athlete_id)
+    semaphore = asyncio.Semaphore(concurrency)
+    rate_limited: Optional[StravaRateLimitExceeded] = None
+    batch = []
+
+    async def fetch(strava_activity_id):
+        nonlocal rate_limited
+        async with semaphore:
+            if rate_limited is not None:
+                return strava_activity_id, rate_limited
+            try:
+                return strava_activity_id, await client.fetch_activity(
+                    strava_activity_id
+                )
+            except StravaRateLimitExceeded as e:
+                rate_limited = e
+                return strava_activity_id, e
+            except Exception as e:
+                return strava_activity_id, e
+
+    def insert_batch():
+        try:
+            db.add_all(activity for _, activity in batch)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error inserting Strava activities, retrying one by one: {e}")
+            for strava_activity_id, activity in batch:
+                insert_one(strava_activity_id, activity)
+        else:
+            progress.record_completed(len(batch))
+            for _, activity in batch:
+                record_ingested(result, activity)
+        batch.clear()
+
+    def insert_one(strava_activity_id, activity):
+        try:
+            db.add(activity)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error ingesting Strava activity {strava_activity_id}: {e}")
+            progress.record_failed(strava_activity_id, str(e))
+        else:
+            progress.record_completed()
+            record_ingested(result, activity)
+
+    fetches = [asyncio.create_task(fetch(id)) for id in strava_activity_ids]
+    for next_fetched in asyncio.as_completed(fetches):
+        strava_activity_id, strava_data = await next_fetched
+        if isinstance(strava_data, StravaRateLimitExceeded):
+            record_rate_limited(result, strava_activity_id, strava_data)
+            continue
+        try:
+            if isinstance(strava_data, Exception):
+                raise strava_data
+            activity = service.map_to_betta_activity(
+                strava_data, athlete_id, db, scaling_factors
+            )
+        except Exception as e:
+            print(f"Error ingesting Strava activity {strava_activity_id}: {e}")
+            progress.record_failed(strava_activity_id, str(e))
+            continue
+        batch.append((strava_activity_id, activity))
+        if len(batch) >= batch_size:
+            insert_batch()
+
+    if batch:
+        insert_batch()
+    return result
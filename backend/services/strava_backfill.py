@@ -0,0 +1,222 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Any, Iterator, Optional
+
+import requests
+from redis import Redis
+from sqlalchemy.orm import Session
+
+import models
+from .strava_rate_limit import StravaRateLimitExceeded
+from .strava_service import StravaService, get_scaling_factors
+
+# Activities fetched in parallel by one backfill job (two API calls each)
+BACKFILL_CONCURRENCY = 4
+# Backoff after rate limiting: doubles per consecutive attempt without progress
+BACKFILL_RETRY_BASE_SECONDS = 60
+BACKFILL_RETRY_MAX_SECONDS = 6 * 60 * 60
+# How long the progress of a finished backfill stays available
+BACKFILL_PROGRESS_TTL_SECONDS = 24 * 60 * 60
+# Failed activities kept for the status endpoint
+BACKFILL_MAX_ERRORS = 50
+
+
+def fetch_strava_activity(
+    service: StravaService, strava_activity_id: int
+) -> dict[str, Any]:
+    """Summary and streams of one activity; streams are empty if Strava has none."""
+    summary = service.get_activity_summary(strava_activity_id)
+    try:
+        streams = service.get_activity_streams(strava_activity_id)
+    except requests.exceptions.HTTPError as e:
+        if e.response.status_code != 404:
+            raise
+        streams = {}
+    return {"summary": summary, "streams": streams}
+
+
+def fetch_strava_activities(
+    service: StravaService,
+    strava_activity_ids: list[int],
+    concurrency: int = BACKFILL_CONCURRENCY,
+) -> Iterator[tuple[int, Any]]:
+    """
+    Fetches activities on ``concurrency`` threads and yields
+    (strava_activity_id, data or exception) as they complete. Once the rate
+    limit is hit, the activities not started yet are yielded with that
+    StravaRateLimitExceeded without calling the API.
+    """
+    rate_limited: Optional[StravaRateLimitExceeded] = None
+
+    def fetch(strava_activity_id):
+        nonlocal rate_limited
+        if rate_limited is not None:
+            return rate_limited
+        try:
+            return fetch_strava_activity(service, strava_activity_id)
+        except StravaRateLimitExceeded as e:
+            rate_limited = e
+            return e
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(fetch, strava_activity_id): strava_activity_id
+            for strava_activity_id in strava_activity_ids
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def ingest_strava_activities(
+    db: Session,
+    service: StravaService,
+    athlete_id: int,
+    strava_activity_ids: list[int],
+    progress: "BackfillProgress",
+    concurrency: int = BACKFILL_CONCURRENCY,
+) -> dict[str, Any]:
+    """
+    Fetches activities on a thread pool and stores them one by one as they
+    arrive. Returns the earliest ingested date, the rate limited activity IDs
+    and the time until the budget resets (see ingest_result).
+    """
+    result = ingest_result()
+    scaling_factors = get_scaling_factors(db, athlete_id)
+    fetched = fetch_strava_activities(service, strava_activity_ids, concurrency)
+    for strava_activity_id, strava_data in fetched:
+        if isinstance(strava_data, StravaRateLimitExceeded):
+            record_rate_limited(result, strava_activity_id, strava_data)
+            continue
+        try:
+            if isinstance(strava_data, Exception):
+                raise strava_data
+            activity = service.map_to_betta_activity(
+                strava_data, athlete_id, db, scaling_factors
+            )
+            db.add(activity)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error ingesting Strava activity {strava_activity_id}: {e}")
+            progress.record_failed(strava_activity_id, str(e))
+            continue
+        progress.record_completed()
+        record_ingested(result, activity)
+    return result
+
+
+def ingest_result() -> dict[str, Any]:
+    """The outcome of one ingestion run, filled in by the record_* helpers."""
+    return {"earliest_date": None, "rate_limited": [], "retry_after": 0.0}
+
+
+def record_ingested(result: dict, activity: models.Activity):
+    activity_date = activity.start_time.date()
+    if result["earliest_date"] is None or activity_date < result["earliest_date"]:
+        result["earliest_date"] = activity_date
+
+
+def record_rate_limited(
+    result: dict, strava_activity_id: int, error: StravaRateLimitExceeded
+):
+    result["rate_limited"].append(strava_activity_id)
+    result["retry_after"] = max(result["retry_after"], error.retry_after)
+
+
+def retry_delay(attempt: int, retry_after: float) -> float:
+    """
+    Seconds before a rate limited backfill runs again: at least until the
+    budget resets, and exponentially longer for repeated attempts without
+    progress (e.g. when other clients keep using the budget up).
+    """
+    backoff = min(BACKFILL_RETRY_BASE_SECONDS * 2**attempt, BACKFILL_RETRY_MAX_SECONDS)
+    return max(retry_after, backoff)
+
+
+class BackfillProgress:
+    """
+    Progress of an athlete's Strava backfill in Redis, shared by the jobs that
+    re-enqueue the backfill after rate limiting.
+    """
+
+    def __init__(self, redis: Redis, athlete_id: int):
+        self.redis = redis
+        self.key = f"strava:backfill:{athlete_id}"
+        self.errors_key = f"{self.key}:errors"
+
+    def start(self, total: int):
+        """Adds activities to the backfill, starting a new one if none is running."""
+        if not self.redis.exists(self.key) or self._remaining() <= 0:
+            self.redis.delete(self.key, self.errors_key)
+            self.redis.hset(self.key, "started_at", time.time())
+        self.redis.hincrby(self.key, "total", total)
+        self.redis.hdel(self.key, "retry_at")
+        self._touch()
+
+    def record_completed(self, count: int = 1):
+        self.redis.hincrby(self.key, "completed", count)
+        self._touch()
+
+    def record_failed(self, strava_activity_id: int, error: str):
+        self.redis.hincrby(self.key, "failed", 1)
+        self.redis.rpush(self.errors_key, f"{strava_activity_id}: {error}")
+        self.redis.ltrim(self.errors_key, -BACKFILL_MAX_ERRORS, -1)
+        self._touch()
+
+    def record_retry(self, retry_at: float):
+        self.redis.hset(self.key, "retry_at", retry_at)
+        self._touch()
+
+    def _touch(self):
+        self.redis.expire(self.key, BACKFILL_PROGRESS_TTL_SECONDS)
+        self.redis.expire(self.errors_key, BACKFILL_PROGRESS_TTL_SECONDS)
+
+    def _remaining(self) -> int:
+        state = self.redis.hmget(self.key, "total", "completed", "failed")
+        total, completed, failed = (int(value or 0) for value in state)
+        return total - completed - failed
+
+    def status(self) -> Optional[dict]:
+        """
+        Counts, throughput (activities per minute since the start) and ETA of
+        the backfill, or None if there is none. The ETA extrapolates the
+        throughput, which includes time spent waiting for the rate limit.
+        """
+        state = self.redis.hgetall(self.key)
+        if not state:
+            return None
+        state = {key.decode(): value.decode() for key, value in state.items()}
+        total, completed, failed = (
+            int(state.get(field, 0)) for field in ("total", "completed", "failed")
+        )
+        remaining = total - completed - failed
+        elapsed = max(time.time() - float(state["started_at"]), 1.0)
+        per_minute = completed * 60 / elapsed
+        retry_at = float(state["retry_at"]) if "retry_at" in state else None
+
+        if remaining <= 0:
+            eta_seconds = 0.0
+        elif per_minute > 0:
+            eta_seconds = remaining * 60 / per_minute
+        else:
+            eta_seconds = None
+        if eta_seconds is not None and retry_at is not None:
+            eta_seconds = max(eta_seconds, retry_at - time.time())
+
+        return {
+            "total": total,
+            "completed": completed,
+            "failed": failed,
+            "remaining": remaining,
+            "activities_per_minute": round(per_minute, 2),
+            "eta_seconds": round(eta_seconds) if eta_seconds is not None else None,
+            "retry_at": (
+                datetime.fromtimestamp(retry_at, timezone.utc) if retry_at else None
+            ),
+            "errors": [
+                error.decode() for error in self.redis.lrange(self.errors_key, 0, -1)
+            ],
+        }
@@ -0,0 +1,150 @@
+import time
+from typing import Mapping, Optional
+
+from redis import Redis
+
+# Strava meters API usage per application in two fixed windows: 15 minutes
+# (aligned to :00, :15, :30 and :45) and one UTC day. Every response reports
+# the current limits and usage in the X-RateLimit-Limit / X-RateLimit-Usage
+# headers as "<15 min>,<daily>"; the defaults are Strava's read limits.
+SHORT_WINDOW_SECONDS = 15 * 60
+DAILY_WINDOW_SECONDS = 24 * 60 * 60
+DEFAULT_LIMITS = (100, 1000)
+# Requests per window left for interactive calls (activity lists, refreshes)
+RESERVED_REQUESTS = (10, 50)
+
+KEY_PREFIX = "strava:rate_limit"
+
+# Takes ``tokens`` from both windows if both have room; otherwise takes
+# nothing and returns the index (1: short, 2: daily) of the exhausted window.
+_ACQUIRE_SCRIPT = """
+local tokens = tonumber(ARGV[1])
+for i = 1, 2 do
+    local limit = tonumber(redis.call('HGET', KEYS[3], i) or ARGV[1 + i])
+    local used = tonumber(redis.call('GET', KEYS[i]) or '0')
+    if used + tokens > limit - tonumber(ARGV[3 + i]) then
+        return i
+    end
+end
+for i = 1, 2 do
+    redis.call('INCRBY', KEYS[i], tokens)
+    redis.call('EXPIRE', KEYS[i], ARGV[5 + i])
+end
+return 0
+"""
+
+# Raises the counters to the usage Strava reports (never lowers them, since
+# requests in flight may not be included yet) and stores the reported limits.
+_SYNC_SCRIPT = """
+for i = 1, 2 do
+    local reported = tonumber(ARGV[i])
+    if reported > tonumber(redis.call('GET', KEYS[i]) or '0') then
+        redis.call('SET', KEYS[i], reported, 'EX', ARGV[4 + i])
+    end
+    if tonumber(ARGV[2 + i]) > 0 then
+        redis.call('HSET', KEYS[3], i, ARGV[2 + i])
+    end
+end
+"""
+
+
+class StravaRateLimitExceeded(Exception):
+    """The Strava request budget is used up for ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Strava rate limit reached, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def parse_rate_limit_header(value: Optional[str]) -> Optional[tuple[int, int]]:
+    """Parses a "<15 min>,<daily>" rate limit header, or None if absent/invalid."""
+    try:
+        short, daily = (int(part) for part in value.split(","))
+    except (AttributeError, ValueError):
+        return None
+    return short, daily
+
+
+def seconds_until_reset(window: int, now: Optional[float] = None) -> float:
+    """Seconds until the 15 minute (1) or daily (2) window starts over."""
+    now = time.time() if now is None else now
+    length = SHORT_WINDOW_SECONDS if window == 1 else DAILY_WINDOW_SECONDS
+    return length - now % length
+
+
+class StravaRateLimiter:
+    """
+    Token bucket over Strava's two rate limit windows, shared through Redis by
+    every worker process. Each window's bucket refills when Strava's window
+    starts over; the counters follow the usage Strava reports, so calls made
+    outside the limiter are accounted for too.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._acquire = redis.register_script(_ACQUIRE_SCRIPT)
+        self._sync = redis.register_script(_SYNC_SCRIPT)
+
+    def _keys(self, now: float) -> list[str]:
+        return [
+            f"{KEY_PREFIX}:short:{int(now // SHORT_WINDOW_SECONDS)}",
+            f"{KEY_PREFIX}:daily:{int(now // DAILY_WINDOW_SECONDS)}",
+            f"{KEY_PREFIX}:limits",
+        ]
+
+    def acquire(self, tokens: int = 1):
+        """
+        Takes ``tokens`` requests from the budget, or raises
+        StravaRateLimitExceeded with the time until the exhausted window resets.
+        """
+        now = time.time()
+        exhausted = self._acquire(
+            keys=self._keys(now),
+            args=[
+                tokens,
+                *DEFAULT_LIMITS,
+                *RESERVED_REQUESTS,
+                SHORT_WINDOW_SECONDS,
+                DAILY_WINDOW_SECONDS,
+            ],
+        )
+        if exhausted:
+            raise StravaRateLimitExceeded(seconds_until_reset(exhausted, now))
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Syncs the buckets with the rate limit headers of a response."""
+        usage, limits = _reported_usage(headers)
+        if usage is None:
+            return
+        self._sync(
+            keys=self._keys(time.time()),
+            args=[
+                *usage,
+                *(limits or (0, 0)),
+                SHORT_WINDOW_SECONDS,
+                DAILY_WINDOW_SECONDS,
+            ],
+        )
+
+    def retry_after_throttled(self, headers: Mapping[str, str]) -> float:
+        """
+        Seconds to wait after a 429: until the daily window resets if the
+        reported daily usage is at its limit, else until the 15 minute one does.
+        """
+        self.update_from_headers(headers)
+        usage, limits = _reported_usage(headers)
+        daily_exhausted = usage and limits and usage[1] >= limits[1]
+        return seconds_until_reset(2 if daily_exhausted else 1)
+
+
+def _reported_usage(headers: Mapping[str, str]):
+    """
+    (usage, limits) from a response's headers. Strava reports a separate,
+    lower budget for read requests (everything the ingestion does) in
+    X-ReadRateLimit-*; that one is preferred when present.
+    """
+    for prefix in ("X-ReadRateLimit", "X-RateLimit"):
+        usage = parse_rate_limit_header(headers.get(f"{prefix}-Usage"))
+        if usage is not None:
+            return usage, parse_rate_limit_header(headers.get(f"{prefix}-Limit"))
+    return None, None
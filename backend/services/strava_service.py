@@ -1,28 +1,200 @@
 import requests
 import os
-from datetime import datetime, timedelta
-from typing import Dict, Any
+import threading
+import numpy as np
+from datetime import datetime
+from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
 from sqlalchemy.orm import Session
+from urllib3.util.retry import Retry
 
-import models
 import crud
-from . import activity_processing, calculations
+import models
+from . import activity_processing, calculations, thresholds
+from .strava_rate_limit import StravaRateLimiter, StravaRateLimitExceeded
+
+# (connect, read) timeouts in seconds for Strava API calls
+HTTP_TIMEOUT = (5, 30)
+# Keep-alive connections per host; at least the backfill concurrency
+HTTP_POOL_SIZE = 10
+# Transient failures are retried with exponential backoff (0.5s, 1s, 2s).
+# 429s are not: the rate limiter decides when to call Strava again.
+HTTP_RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(500, 502, 503, 504),
+    allowed_methods=frozenset({"GET"}),
+    raise_on_status=False,
+)
+
+# Strava sport types mapped to Betta sports; unknown types map to cycling
+STRAVA_SPORT_MAPPING = {
+    "Ride": "cycling",
+    "Run": "run",
+    "Swim": "swim",
+    "Hike": "hike",
+    "Walk": "walk",
+    "AlpineSki": "ski",
+    "BackcountrySki": "ski",
+    "Canoeing": "other",
+    "Crossfit": "gym",
+    "EBikeRide": "cycling",
+    "Elliptical": "other",
+    "Golf": "other",
+    "Handcycle": "cycling",
+    "IceSkate": "other",
+    "InlineSkate": "other",
+    "Kayaking": "other",
+    "Kitesurf": "other",
+    "NordicSki": "ski",
+    "RockClimbing": "other",
+    "RollerSki": "ski",
+    "Rowing": "other",
+    "Snowboard": "ski",
+    "Snowshoe": "walk",
+    "Soccer": "other",
+    "StairStepper": "other",
+    "StandUpPaddling": "other",
+    "Surfing": "other",
+    "Velomobile": "cycling",
+    "VirtualRide": "cycling",
+    "VirtualRun": "run",
+    "WeightTraining": "gym",
+    "Wheelchair": "other",
+    "Windsurf": "other",
+    "Workout": "gym",
+    "Yoga": "yoga",
+}
+
+# Strava stream keys of the scalar stream channels
+STRAVA_STREAM_CHANNELS = {
+    "power": "watts",
+    "heart_rate": "heartrate",
+    "cadence": "cadence",
+    "speed": "velocity_smooth",
+    "altitude": "altitude",
+}
+
+
+def _stream_data(streams: Dict[str, Any], key: str) -> list:
+    return (streams.get(key) or {}).get("data") or []
+
+
+def _padded_channel(data: list, sample_count: int, width: int = 1) -> np.ndarray:
+    """
+    A Strava stream as a float array of ``sample_count`` samples: missing
+    values (None) and samples beyond the end of a shorter stream are NaN.
+    """
+    shape = (sample_count,) if width == 1 else (sample_count, width)
+    channel = np.full(shape, np.nan)
+    data = data[:sample_count]
+    if not data:
+        return channel
+    try:
+        values = np.asarray(data, dtype=np.float64)
+    except (TypeError, ValueError):
+        # Missing entries of a vector stream (None instead of [lat, lng])
+        values = np.array(
+            [[np.nan] * width if value is None else value for value in data],
+            dtype=np.float64,
+        )
+    if values.shape[1:] != shape[1:]:
+        return channel
+    channel[: len(values)] = values
+    return channel
+
+
+def strava_streams_to_arrays(
+    streams: Dict[str, Any],
+) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Strava streams (key_by_type) as the per-channel arrays of an
+    ActivityStream, or None without a time stream. Every channel is padded
+    to the length of the time stream, with NaN marking missing samples.
+    """
+    time_data = _stream_data(streams, "time")
+    if not time_data:
+        return None
+
+    sample_count = len(time_data)
+    channels = {"time": np.asarray(time_data, dtype=np.int32)}
+    for name, key in STRAVA_STREAM_CHANNELS.items():
+        channels[name] = _padded_channel(_stream_data(streams, key), sample_count)
+    latlng = _padded_channel(_stream_data(streams, "latlng"), sample_count, width=2)
+    channels["latitude"], channels["longitude"] = latlng[:, 0], latlng[:, 1]
+    return channels
+
+
+def get_scaling_factors(db: Session, athlete_id: int) -> tuple[float, float]:
+    """
+    The athlete's (psf_trimp, psf_pss) for the unified training load; zero
+    (no TRIMP/PSS based load) for an unknown athlete.
+    """
+    athlete = crud.get_athlete(db, athlete_id)
+    if athlete is None:
+        return 0.0, 0.0
+    return athlete.psf_trimp, athlete.psf_pss
+
+
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    The pooled keep-alive session shared by every StravaService of the
+    process, so API calls of consecutive activities (and jobs, in a
+    non-forking worker) reuse TCP/TLS connections.
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            session.mount(
+                "https://",
+                HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE, max_retries=HTTP_RETRY),
+            )
+            _http_session = session
+    return _http_session
 
 
 class StravaService:
     BASE_URL = "https://www.strava.com/api/v3"
 
-    def __init__(self, access_token: str):
+    def __init__(
+        self,
+        access_token: str,
+        rate_limiter: Optional[StravaRateLimiter] = None,
+        session: Optional[requests.Session] = None,
+    ):
         self.access_token = access_token
+        # With a rate limiter, API calls draw from the shared Strava budget and
+        # raise StravaRateLimitExceeded instead of running into 429s
+        self.rate_limiter = rate_limiter
+        self.session = session or get_http_session()
+
+    def _get(self, url: str, params: Optional[Dict[str, Any]] = None):
+        """GET an API endpoint, within the rate limit budget if one is set."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        headers = {"Authorization": f"Bearer {self.access_token}"}
+        response = self.session.get(
+            url, headers=headers, params=params, timeout=HTTP_TIMEOUT
+        )
+        if self.rate_limiter is not None:
+            if response.status_code == 429:
+                raise StravaRateLimitExceeded(
+                    self.rate_limiter.retry_after_throttled(response.headers)
+                )
+            self.rate_limiter.update_from_headers(response.headers)
+        response.raise_for_status()
+        return response
 
     def get_activity_streams(self, activity_id: int) -> Dict[str, Any]:
         """Fetch activity streams from Strava."""
         url = f"{self.BASE_URL}/activities/{activity_id}/streams"
         params = {"keys": "time,watts,heartrate,latlng,moving,cadence,velocity_smooth,altitude", "key_by_type": True}
-        headers = {"Authorization": f"Bearer {self.access_token}"}
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        streams = response.json()
+        streams = self._get(url, params=params).json()
         # Log stream availability
         available_streams = list(streams.keys())
         print(f"Fetched streams for activity {activity_id}: {available_streams}")
@@ -33,10 +205,7 @@ class StravaService:
     def get_activity_summary(self, activity_id: int) -> Dict[str, Any]:
         """Fetch activity summary from Strava."""
         url = f"{self.BASE_URL}/activities/{activity_id}"
-        headers = {"Authorization": f"Bearer {self.access_token}"}
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        return self._get(url).json()
 
     def refresh_access_token(self, refresh_token: str) -> Dict[str, Any]:
         """Refresh access token using refresh token."""
@@ -45,7 +214,7 @@ class StravaService:
         if not client_id or not client_secret:
             raise ValueError("Strava credentials not configured")
 
-        response = requests.post(
+        response = self.session.post(
             "https://www.strava.com/oauth/token",
             data={
                 "client_id": client_id,
@@ -53,61 +222,30 @@ class StravaService:
                 "refresh_token": refresh_token,
                 "grant_type": "refresh_token",
             },
+            timeout=HTTP_TIMEOUT,
         )
         response.raise_for_status()
         return response.json()
 
     def map_to_betta_activity(
-        self, strava_data: Dict[str, Any], athlete_id: int, db: Session
+        self,
+        strava_data: Dict[str, Any],
+        athlete_id: int,
+        db: Session,
+        scaling_factors: Optional[tuple[float, float]] = None,
     ) -> models.Activity:
-        """Map Strava data to Betta Activity."""
+        """
+        Map Strava data to Betta Activity. Streams are mapped column-wise into
+        an ActivityStream and all derived metrics are computed on the arrays.
+        ``scaling_factors`` (see get_scaling_factors) are loaded when omitted;
+        pass them when mapping many activities of one athlete.
+        """
         summary = strava_data["summary"]
-        streams = strava_data["streams"]
-
-        # Map Strava sport types to Betta sports
-        sport_mapping = {
-            "Ride": "cycling",
-            "Run": "run",
-            "Swim": "swim",
-            "Hike": "hike",
-            "Walk": "walk",
-            "AlpineSki": "ski",
-            "BackcountrySki": "ski",
-            "Canoeing": "other",
-            "Crossfit": "gym",
-            "EBikeRide": "cycling",
-            "Elliptical": "other",
-            "Golf": "other",
-            "Handcycle": "cycling",
-            "IceSkate": "other",
-            "InlineSkate": "other",
-            "Kayaking": "other",
-            "Kitesurf": "other",
-            "NordicSki": "ski",
-            "RockClimbing": "other",
-            "RollerSki": "ski",
-            "Rowing": "other",
-            "Snowboard": "ski",
-            "Snowshoe": "walk",
-            "Soccer": "other",
-            "StairStepper": "other",
-            "StandUpPaddling": "other",
-            "Surfing": "other",
-            "Velomobile": "cycling",
-            "VirtualRide": "cycling",
-            "VirtualRun": "run",
-            "WeightTraining": "gym",
-            "Wheelchair": "other",
-            "Windsurf": "other",
-            "Workout": "gym",
-            "Yoga": "yoga",
-        }
-        betta_sport = sport_mapping.get(summary.get("type", "Ride"), "cycling")
 
         activity = models.Activity(
             athlete_id=athlete_id,
             name=summary.get("name", "Strava Activity"),
-            sport=betta_sport,
+            sport=STRAVA_SPORT_MAPPING.get(summary.get("type", "Ride"), "cycling"),
             start_time=datetime.fromisoformat(
                 summary["start_date"].replace("Z", "+00:00")
             ),
@@ -128,47 +266,6 @@ class StravaService:
             strava_activity_id=summary["id"],
         )
 
-        # Add records from streams
-        time_data = streams.get("time", {}).get("data", [])
-        if not time_data:
-            # No time stream, cannot create records
-            pass
-        else:
-            watts_data = streams.get("watts", {}).get("data", [])
-            watts = watts_data + [None] * (len(time_data) - len(watts_data))
-            heartrate_data = streams.get("heartrate", {}).get("data", [])
-            heartrate = heartrate_data + [None] * (len(time_data) - len(heartrate_data))
-            latlng_data = streams.get("latlng", {}).get("data", [])
-            latlng = latlng_data + [None] * (len(time_data) - len(latlng_data))
-            cadence_data = streams.get("cadence", {}).get("data", [])
-            cadence = cadence_data + [None] * (len(time_data) - len(cadence_data))
-            velocity_smooth_data = streams.get("velocity_smooth", {}).get("data", [])
-            velocity_smooth = velocity_smooth_data + [None] * (len(time_data) - len(velocity_smooth_data))
-            altitude_data = streams.get("altitude", {}).get("data", [])
-            altitude = altitude_data + [None] * (len(time_data) - len(altitude_data))
-
-            power_data = []
-            for i, timestamp in enumerate(time_data):
-                power_value = watts[i] if watts[i] is not None else None
-                if power_value is not None:
-                    power_data.append(power_value)
-                record = models.ActivityRecord(
-                    activity_id=activity.activity_id,
-                    timestamp=activity.start_time + timedelta(seconds=timestamp),
-                    power=power_value,
-                    heart_rate=heartrate[i] if heartrate[i] is not None else None,
-                    cadence=cadence[i] if cadence[i] is not None else None,
-                    speed=velocity_smooth[i] if velocity_smooth[i] is not None else None,
-                    latitude=latlng[i][0] if latlng[i] is not None else None,
-                    longitude=latlng[i][1] if latlng[i] is not None else None,
-                    altitude=altitude[i] if altitude[i] is not None else None,
-                )
-                activity.records.append(record)
-
-            # Calculate normalized power if power data available
-            if power_data:
-                activity.normalized_power = calculations.calculate_normalized_power(power_data)
-
         # Process laps from Strava activity summary
         laps_data = summary.get("laps", [])
         for lap_idx, lap in enumerate(laps_data):
@@ -186,38 +283,54 @@ class StravaService:
             # Note: Strava lap data doesn't include per-point altitude, only elevation gain
             activity.laps.append(lap_record)
 
-        # Calculate derived metrics
-        activity_processing.recalculate_virtual_power(
-            db, activity, 0
-        )  # Assume no trainer
-
-        # Calculate training load metrics
-        athlete = db.query(models.Athlete).filter(models.Athlete.athlete_id == activity.athlete_id).first()
-        if athlete:
-            # Calculate TSS if normalized power available
-            if activity.normalized_power and activity.total_moving_time:
-                ftp_metric = crud.get_latest_ftp(db, athlete.athlete_id)
-                if ftp_metric:
-                    ftp = ftp_metric.value
-                    if ftp > 0:
-                        activity.tss = calculations.calculate_tss(
-                            normalized_power=activity.normalized_power,
-                            ftp=ftp,
-                            duration_seconds=activity.total_moving_time
-                        )
-                        activity.intensity_factor = activity.normalized_power / ftp
-                    else:
-                        print(f"Invalid FTP value ({ftp}) for athlete {athlete.athlete_id}, skipping TSS calculation")
-                else:
-                    print(f"No FTP metric found for athlete {athlete.athlete_id}, skipping TSS calculation")
-
-            # Note: TRIMP calculation requires zone analysis, skipping for now
-
-            # Calculate unified training load
-            if activity.tss and activity.tss > 0:
-                activity.unified_training_load = activity.tss
+        channels = strava_streams_to_arrays(strava_data["streams"])
+        if channels is None:
+            # No time stream, cannot create a stream or stream-based metrics
+            activity.unified_training_load = 0
+            return activity
+
+        # No virtual power: Strava does not report a trainer setting to
+        # estimate it from, and outdoor speed says little about power
+        power = channels["power"]
+        has_power = bool(np.isfinite(power).any())
+        activity.stream = models.ActivityStream.from_arrays(channels)
+        activity_processing.update_power_curve(activity, power)
+
+        # Training load metrics with the thresholds in effect on the day
+        if has_power:
+            activity.normalized_power = calculations.calculate_normalized_power(
+                np.nan_to_num(power)
+            )
+            ftp = thresholds.get_threshold(
+                db, athlete_id, models.MetricType.FTP, on=activity.start_time
+            )
+            if ftp and ftp > 0 and activity.total_moving_time:
+                activity.tss = calculations.calculate_tss(
+                    activity.normalized_power, ftp, activity.total_moving_time
+                )
+                activity.intensity_factor = round(activity.normalized_power / ftp, 2)
             else:
-                activity.unified_training_load = 0
+                print(f"No valid FTP for athlete {athlete_id}, skipping TSS calculation")
+
+        heart_rate = channels["heart_rate"]
+        lthr = thresholds.get_threshold(
+            db, athlete_id, models.MetricType.THR, on=activity.start_time
+        )
+        if lthr and np.isfinite(heart_rate).any():
+            activity.trimp = calculations.calculate_trimp(
+                calculations.calculate_time_in_zones(
+                    heart_rate, lthr, calculations.HR_ZONE_DEFINITIONS
+                )
+            )
+
+        if scaling_factors is None:
+            scaling_factors = get_scaling_factors(db, athlete_id)
+        activity.unified_training_load = calculations.calculate_unified_training_load(
+            activity.tss,
+            activity.trimp,
+            activity.perceived_strain_score,
+            *scaling_factors,
+        )
 
         return activity
 
@@ -225,7 +338,4 @@ class StravaService:
         """Fetch paginated list of athlete activities from Strava."""
         url = f"{self.BASE_URL}/athlete/activities"
         params = {"page": page, "per_page": per_page}
-        headers = {"Authorization": f"Bearer {self.access_token}"}
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
+        return self._get(url, params=params).json()
@@ -0,0 +1,229 @@
+import json
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Callable, Iterator, Optional
+
+from redis import Redis
+from redis.exceptions import LockError
+from sqlalchemy.orm import Session
+
+import crud
+import models
+from .strava_backfill import fetch_strava_activity
+from .strava_service import STRAVA_SPORT_MAPPING, StravaService
+
+# Activity events within this window after the first one are coalesced into
+# a single job
+WEBHOOK_COALESCE_SECONDS = 10
+# Pending events of an activity expire if their job never runs
+WEBHOOK_PENDING_TTL_SECONDS = 24 * 60 * 60
+# Redelivered events (same activity, aspect and event time) are dropped for
+# this long
+WEBHOOK_SEEN_TTL_SECONDS = 60 * 60
+# Upper bound on one job's work on an activity; the lock expires after it
+ACTIVITY_LOCK_TTL_SECONDS = 5 * 60
+# Failed jobs put their events back and retry (with the backfill's backoff)
+# up to this many times before the events are dropped
+WEBHOOK_MAX_ATTEMPTS = 5
+
+ACTIVITY_ASPECTS = ("create", "update", "delete")
+
+KEY_PREFIX = "strava:webhook"
+
+# Merges an event into the activity's pending state. The strongest aspect
+# wins (delete > create > update: a create fetches the latest state anyway)
+# and update fields are merged. Returns 1 if the activity had no pending
+# event (a job must be scheduled), 0 if the event was coalesced and -1 if it
+# is a redelivery of an event already recorded.
+_RECORD_SCRIPT = """
+if ARGV[4] ~= '' then
+    if not redis.call('SET', KEYS[2], 1, 'NX', 'EX', ARGV[6]) then
+        return -1
+    end
+end
+local rank = {update = 1, create = 2, delete = 3}
+local pending = redis.call('HGET', KEYS[1], 'aspect')
+local aspect = ARGV[1]
+if pending and rank[pending] > rank[aspect] then
+    aspect = pending
+end
+local updates = cjson.decode(redis.call('HGET', KEYS[1], 'updates') or '{}')
+for field, value in pairs(cjson.decode(ARGV[3])) do
+    updates[field] = value
+end
+redis.call(
+    'HSET', KEYS[1], 'aspect', aspect, 'owner_id', ARGV[2],
+    'updates', cjson.encode(updates)
+)
+redis.call('HINCRBY', KEYS[1], 'events', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+if pending then
+    return 0
+end
+return 1
+"""
+
+
+class StravaWebhookInbox:
+    """
+    Pending Strava activity webhook events in Redis, one coalesced event per
+    activity until its job takes it.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._record = redis.register_script(_RECORD_SCRIPT)
+
+    def _key(self, strava_activity_id: int) -> str:
+        return f"{KEY_PREFIX}:pending:{strava_activity_id}"
+
+    def record(
+        self,
+        strava_activity_id: int,
+        owner_id: int,
+        aspect: str,
+        updates: Optional[dict] = None,
+        event_time: Optional[int] = None,
+    ) -> bool:
+        """
+        Adds an event to the activity's pending event. True if there was none,
+        so the caller has to schedule a job for the activity.
+        """
+        seen_key = f"{KEY_PREFIX}:seen:{strava_activity_id}:{aspect}:{event_time or ''}"
+        return (
+            self._record(
+                keys=[self._key(strava_activity_id), seen_key],
+                args=[
+                    aspect,
+                    owner_id,
+                    json.dumps(updates or {}),
+                    event_time or "",
+                    WEBHOOK_PENDING_TTL_SECONDS,
+                    WEBHOOK_SEEN_TTL_SECONDS,
+                ],
+            )
+            == 1
+        )
+
+    def restore(self, strava_activity_id: int, event: dict[str, Any]) -> bool:
+        """
+        Puts a popped event back, merged with any that arrived since. True if
+        nothing was pending, so the caller has to schedule a job again.
+        """
+        return self.record(
+            strava_activity_id, event["owner_id"], event["aspect"], event["updates"]
+        )
+
+    def pop(self, strava_activity_id: int) -> Optional[dict[str, Any]]:
+        """
+        Takes the activity's pending event (aspect, owner_id, updates and the
+        number of coalesced events), or None if there is none.
+        """
+        pipe = self.redis.pipeline()
+        pipe.hgetall(self._key(strava_activity_id))
+        pipe.delete(self._key(strava_activity_id))
+        state, _ = pipe.execute()
+        if not state:
+            return None
+        state = {key.decode(): value.decode() for key, value in state.items()}
+        return {
+            "aspect": state["aspect"],
+            "owner_id": int(state["owner_id"]),
+            # cjson encodes an empty table as an array
+            "updates": json.loads(state["updates"]) or {},
+            "events": int(state["events"]),
+        }
+
+
+@contextmanager
+def activity_lock(redis: Redis, strava_activity_id: int) -> Iterator[bool]:
+    """
+    Tries to lock a Strava activity for one job without waiting; yields
+    whether the lock was acquired.
+    """
+    lock = redis.lock(
+        f"{KEY_PREFIX}:lock:{strava_activity_id}", timeout=ACTIVITY_LOCK_TTL_SECONDS
+    )
+    acquired = lock.acquire(blocking=False)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except LockError:
+                # Expired after ACTIVITY_LOCK_TTL_SECONDS
+                pass
+
+
+def apply_activity_updates(activity: models.Activity, updates: dict) -> bool:
+    """
+    Applies the fields of a Strava update event (title, type) to an activity.
+    True if anything changed.
+    """
+    changes = {}
+    if "title" in updates:
+        changes["name"] = updates["title"]
+    if "type" in updates:
+        changes["sport"] = STRAVA_SPORT_MAPPING.get(updates["type"], "cycling")
+    changed = False
+    for field, value in changes.items():
+        if getattr(activity, field) != value:
+            setattr(activity, field, value)
+            changed = True
+    return changed
+
+
+def apply_activity_event(
+    db: Session,
+    strava_activity_id: int,
+    event: dict,
+    get_service: Callable[[models.Athlete], StravaService],
+) -> Optional[tuple[int, date]]:
+    """
+    Brings the stored activity in line with a (coalesced) webhook event:
+    deletes it, ingests it if it is missing (a create, or an update of an
+    activity never ingested) or applies the updated fields without calling
+    the API. ``get_service`` is only called when the API is needed.
+
+    Returns the athlete ID and date from which the PMC has to be
+    recalculated, or None if training load did not change.
+    """
+    activity = crud.get_activity_by_strava_id(db, strava_activity_id)
+
+    if event["aspect"] == "delete":
+        if activity is None:
+            return None
+        athlete_id, activity_date = activity.athlete_id, activity.start_time.date()
+        crud.delete_activity(db, activity.activity_id)
+        print(f"Strava activity {strava_activity_id} deleted")
+        return athlete_id, activity_date
+
+    if activity is not None:
+        if apply_activity_updates(activity, event["updates"]):
+            db.commit()
+            print(f"Strava activity {strava_activity_id} updated")
+        else:
+            print(f"Activity {strava_activity_id} already up to date, skipping")
+        return None
+
+    athlete = crud.get_athlete_by_strava_id(db, event["owner_id"])
+    if not athlete or not athlete.strava_access_token:
+        print(f"No athlete or token for strava_id {event['owner_id']}")
+        return None
+
+    service = get_service(athlete)
+    activity = service.map_to_betta_activity(
+        fetch_strava_activity(service, strava_activity_id),
+        athlete.athlete_id,
+        db,
+        (athlete.psf_trimp, athlete.psf_pss),
+    )
+    sample_count = activity.stream.sample_count if activity.stream else 0
+    print(
+        f"Created {sample_count} records and {len(activity.laps)} laps for activity {strava_activity_id}. TSS: {activity.tss or 0}"
+    )
+    db.add(activity)
+    db.commit()
+    print(f"Activity {strava_activity_id} ingested for athlete {athlete.athlete_id}")
+    return athlete.athlete_id, activity.start_time.date()
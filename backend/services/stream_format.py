@@ -0,0 +1,75 @@
+import json
+import struct
+
+import numpy as np
+
+# Columnar binary representation of activity streams, negotiated through the
+# Accept header. Layout:
+#   uint32 (little-endian) header length, then the UTF-8 JSON header, padded to
+#   an 8-byte boundary, then each channel as a raw little-endian typed array
+#   starting at an 8-byte aligned offset.
+# The header carries the stream metadata plus, per channel, its name, dtype,
+# byte offset (from the start of the payload) and length, so a browser can wrap
+# each channel in a typed array view without copying. Missing samples are NaN.
+STREAMS_MEDIA_TYPE = "application/vnd.betta.streams"
+
+ALIGNMENT = 8
+
+
+def _padding(size: int) -> int:
+    return -size % ALIGNMENT
+
+
+def encode_streams(metadata: dict, channels: dict[str, np.ndarray]) -> bytes:
+    """Packs channel arrays and JSON-serialisable metadata into one payload."""
+    arrays = {
+        name: np.ascontiguousarray(values, dtype=values.dtype.newbyteorder("<"))
+        for name, values in channels.items()
+    }
+
+    def build_header(data_start: int) -> bytes:
+        entries, offset = [], data_start
+        for name, values in arrays.items():
+            entries.append(
+                {
+                    "name": name,
+                    "dtype": values.dtype.name,
+                    "offset": offset,
+                    "length": len(values),
+                }
+            )
+            offset += values.nbytes + _padding(values.nbytes)
+        return json.dumps({**metadata, "channels": entries}).encode()
+
+    # The offsets depend on the header size, which depends on the offsets;
+    # iterate until the (padded) data start no longer moves.
+    data_start = 0
+    while True:
+        header = build_header(data_start)
+        prefix = 4 + len(header)
+        required_start = prefix + _padding(prefix)
+        if required_start == data_start:
+            break
+        data_start = required_start
+
+    parts = [struct.pack("<I", len(header)), header, b"\0" * _padding(prefix)]
+    for values in arrays.values():
+        parts.append(values.tobytes())
+        parts.append(b"\0" * _padding(values.nbytes))
+    return b"".join(parts)
+
+
+def decode_streams(payload: bytes) -> tuple[dict, dict[str, np.ndarray]]:
+    """Inverse of encode_streams: returns the metadata and the channel arrays."""
+    (header_length,) = struct.unpack_from("<I", payload)
+    metadata = json.loads(payload[4 : 4 + header_length])
+    channels = {
+        entry["name"]: np.frombuffer(
+            payload,
+            dtype=np.dtype(entry["dtype"]).newbyteorder("<"),
+            count=entry["length"],
+            offset=entry["offset"],
+        )
+        for entry in metadata.pop("channels")
+    }
+    return metadata, channels
@@ -0,0 +1,105 @@
+import time
+from bisect import bisect_right
+from datetime import date, datetime, timezone
+from typing import Iterable, Optional, Union
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+import crud
+import models
+
+# Per-athlete threshold timelines: for every MetricType the dates a value was
+# established (sorted) and the values. "Value at date X" is then a bisect
+# instead of a query. Entries are dropped by invalidate_threshold_timeline when
+# metrics change in this process; the TTL bounds how long another process
+# (API vs. RQ worker) can serve a timeline that misses a new metric.
+THRESHOLD_CACHE_TTL_SECONDS = 300
+
+_timelines: dict[int, tuple[float, dict]] = {}
+
+
+def _as_date(on: Union[date, datetime, None]) -> date:
+    if on is None:
+        return datetime.now(timezone.utc).date()
+    return on.date() if isinstance(on, datetime) else on
+
+
+def get_threshold_timeline(
+    db: Session, athlete_id: int
+) -> dict[models.MetricType, tuple[list[date], list[float]]]:
+    """Returns the cached (dates, values) timeline per metric type of an athlete."""
+    cached = _timelines.get(athlete_id)
+    if (
+        cached is not None
+        and time.monotonic() - cached[0] < THRESHOLD_CACHE_TTL_SECONDS
+    ):
+        return cached[1]
+
+    timeline = {metric_type: ([], []) for metric_type in models.MetricType}
+    for metric_type, date_established, value in crud.get_metric_timeline(
+        db, athlete_id
+    ):
+        dates, values = timeline[metric_type]
+        dates.append(date_established)
+        values.append(value)
+
+    _timelines[athlete_id] = (time.monotonic(), timeline)
+    return timeline
+
+
+def invalidate_threshold_timeline(athlete_id: Optional[int] = None):
+    """Drops the cached timeline of an athlete, or of all athletes."""
+    if athlete_id is None:
+        _timelines.clear()
+    else:
+        _timelines.pop(athlete_id, None)
+
+
+def get_threshold(
+    db: Session,
+    athlete_id: int,
+    metric_type: models.MetricType,
+    on: Union[date, datetime, None] = None,
+) -> Optional[float]:
+    """
+    The most recent value of a metric established on or before ``on`` (default:
+    today), or None if there is none.
+    """
+    dates, values = get_threshold_timeline(db, athlete_id)[metric_type]
+    index = bisect_right(dates, _as_date(on))
+    return values[index - 1] if index else None
+
+
+def get_thresholds(
+    db: Session,
+    athlete_id: int,
+    metric_type: models.MetricType,
+    dates: Iterable[Union[date, datetime]],
+) -> np.ndarray:
+    """
+    Batch version of get_threshold: the value in effect at each of ``dates``,
+    as a float array with NaN where no value had been established yet.
+    """
+    established, values = get_threshold_timeline(db, athlete_id)[metric_type]
+    lookup = np.array([_as_date(on) for on in dates], dtype="datetime64[D]")
+    indices = np.searchsorted(
+        np.array(established, dtype="datetime64[D]"), lookup, side="right"
+    )
+    return np.concatenate([[np.nan], np.asarray(values, dtype=float)])[indices]
+
+
+def get_affected_date_range(
+    db: Session,
+    athlete_id: int,
+    metric_type: models.MetricType,
+    date_established: date,
+) -> tuple[date, Optional[date]]:
+    """
+    The dates for which a value of ``metric_type`` established on
+    ``date_established`` is the one in effect: from that date up to (excluding)
+    the next later value of the same type, or open-ended (None).
+    """
+    dates, _ = get_threshold_timeline(db, athlete_id)[metric_type]
+    index = bisect_right(dates, date_established)
+    return date_established, dates[index] if index < len(dates) else None
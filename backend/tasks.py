@@ -1,61 +1,364 @@
 from database import SessionLocal
+from job_queue import queue, redis_conn
+from rq import get_current_job
+from services.strava_rate_limit import StravaRateLimiter, StravaRateLimitExceeded
 from services.strava_service import StravaService
 import crud
-from datetime import datetime
-import requests
+import services
+from datetime import date, datetime, timedelta
+import asyncio
+import time
+
+# Parsed activities inserted per commit during a bulk import
+IMPORT_BATCH_SIZE = 25
+
+
+def _strava_service(db, athlete, rate_limiter=None):
+    """A StravaService for the athlete, refreshing an expired access token first."""
+    if athlete.strava_expires_at and athlete.strava_expires_at <= datetime.utcnow():
+        refresh_data = StravaService("").refresh_access_token(
+            athlete.strava_refresh_token
+        )
+        athlete = crud.update_athlete_strava_tokens(
+            db,
+            athlete.athlete_id,
+            refresh_data["access_token"],
+            refresh_data["refresh_token"],
+            datetime.fromtimestamp(refresh_data["expires_at"]),
+        )
+    return StravaService(athlete.strava_access_token, rate_limiter=rate_limiter)
 
 
 def process_strava_activity(strava_activity_id, strava_athlete_id):
-    """Process a Strava activity asynchronously."""
+    """
+    Ingest a Strava activity. Goes through the webhook event inbox, so it is
+    coalesced with (and locked against) webhook events of the same activity.
+    """
+    inbox = services.strava_webhook.StravaWebhookInbox(redis_conn)
+    if inbox.record(strava_activity_id, strava_athlete_id, "create"):
+        process_strava_webhook_event(strava_activity_id)
+
+
+def process_strava_webhook_event(strava_activity_id, attempt=0):
+    """
+    Apply the coalesced webhook events of a Strava activity. Holds the
+    activity's lock while working on it; if another job holds it, the events
+    stay in the inbox and this job runs again after the coalescing window.
+    On failure the events go back into the inbox and are retried with
+    backoff (after rate limiting: once the budget resets); the error is
+    re-raised so RQ records the failed job.
+    """
+    inbox = services.strava_webhook.StravaWebhookInbox(redis_conn)
+    with services.strava_webhook.activity_lock(
+        redis_conn, strava_activity_id
+    ) as acquired:
+        if not acquired:
+            _schedule_strava_webhook_event(
+                strava_activity_id,
+                services.strava_webhook.WEBHOOK_COALESCE_SECONDS,
+                attempt,
+            )
+            return
+
+        event = inbox.pop(strava_activity_id)
+        if event is None:
+            return
+        db = SessionLocal()
+        try:
+            changed = services.strava_webhook.apply_activity_event(
+                db,
+                strava_activity_id,
+                event,
+                lambda athlete: _strava_service(
+                    db, athlete, StravaRateLimiter(redis_conn)
+                ),
+            )
+            if changed is not None:
+                athlete_id, changed_from = changed
+                services.athlete_services.update_scaling_factors(db, athlete_id)
+                services.calculations.recalculate_pmc_from_date(
+                    db, athlete_id, changed_from
+                )
+        except StravaRateLimitExceeded as e:
+            db.rollback()
+            print(f"{e}, deferring events of activity {strava_activity_id}")
+            if inbox.restore(strava_activity_id, event):
+                _schedule_strava_webhook_event(
+                    strava_activity_id, e.retry_after, attempt
+                )
+        except Exception as e:
+            db.rollback()
+            if attempt + 1 < services.strava_webhook.WEBHOOK_MAX_ATTEMPTS:
+                delay = services.strava_backfill.retry_delay(attempt, 0)
+                print(f"Error processing activity {strava_activity_id}: {e}, retrying in {delay:.0f}s")
+                if inbox.restore(strava_activity_id, event):
+                    _schedule_strava_webhook_event(
+                        strava_activity_id, delay, attempt + 1
+                    )
+            else:
+                print(f"Error processing activity {strava_activity_id}: {e}, dropping {event['aspect']} event after {attempt + 1} attempts")
+            raise
+        finally:
+            db.close()
+
+
+def _schedule_strava_webhook_event(strava_activity_id, delay_seconds, attempt=0):
+    queue.enqueue_in(
+        timedelta(seconds=delay_seconds),
+        "tasks.process_strava_webhook_event",
+        strava_activity_id,
+        attempt,
+    )
+
+
+def process_fit_upload(athlete_id, file_path, file_name):
+    """Parse and store an uploaded FIT file, then update scaling factors and PMC."""
+    db = SessionLocal()
+    try:
+        with open(file_path, "rb") as fit_file:
+            content = fit_file.read()
+
+        activity_data, streams, lap_dicts, potential_markers = (
+            services.fit_parser.parse_fit_file(
+                content=content,
+                db=db,
+                athlete_id=athlete_id,
+                file_name=file_name,
+            )
+        )
+        new_activity = crud.create_activity_with_records(
+            db=db,
+            activity=activity_data,
+            streams=streams,
+            laps=lap_dicts,
+            potential_markers=potential_markers,
+            athlete_id=athlete_id,
+            fit_file_path=file_path,
+        )
+
+        services.athlete_services.update_scaling_factors(db, athlete_id)
+        services.calculations.recalculate_pmc_from_date(
+            db, athlete_id, new_activity.start_time.date()
+        )
+        print(f"Uploaded {file_name} as activity {new_activity.activity_id} for athlete {athlete_id}")
+        return {"activity_id": new_activity.activity_id}
+    except Exception as e:
+        print(f"Error processing upload {file_name}: {e}")
+        db.rollback()
+        # Re-raise so the job is marked as failed for the status endpoint
+        raise
+    finally:
+        db.close()
+
+
+def process_fit_import(athlete_id, files):
+    """
+    Import many FIT files, given as (file_path, file_name) pairs. Files are decoded
+    in parallel and inserted in batches, then scaling factors and the PMC are
+    updated once from the earliest imported date.
+    """
+    db = SessionLocal()
+    file_names = dict(files)
+    activity_ids, failed, batch = [], [], []
+    earliest_date = None
+
+    def insert_batch():
+        db_activities = crud.create_activities_with_records(db, athlete_id, batch)
+        activity_ids.extend(activity.activity_id for activity in db_activities)
+        batch.clear()
+
+    try:
+        decoded_files = services.fit_parser.iter_decoded_fit_files(
+            [file_path for file_path, _ in files]
+        )
+        for file_path, decoded in decoded_files:
+            file_name = file_names[file_path]
+            if not isinstance(decoded, Exception):
+                try:
+                    parsed = services.fit_parser.build_activity(
+                        decoded, db, athlete_id, file_name
+                    )
+                except ValueError as e:
+                    decoded = e
+            if isinstance(decoded, Exception):
+                # Unreadable files are reported back rather than failing the import
+                print(f"Skipping {file_name}: {decoded}")
+                failed.append({"file_name": file_name, "error": str(decoded)})
+                continue
+
+            batch.append((*parsed, file_path))
+            activity_date = parsed[0].start_time.date()
+            if earliest_date is None or activity_date < earliest_date:
+                earliest_date = activity_date
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                insert_batch()
+
+        if batch:
+            insert_batch()
+
+        if activity_ids:
+            services.athlete_services.update_scaling_factors(db, athlete_id)
+            services.calculations.recalculate_pmc_from_date(
+                db, athlete_id, earliest_date
+            )
+        print(f"Imported {len(activity_ids)} of {len(files)} files for athlete {athlete_id}")
+        return {"activity_ids": activity_ids, "failed": failed}
+    except Exception as e:
+        print(f"Error importing files for athlete {athlete_id}: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def rescore_athlete_activities(athlete_id, start_date=None, end_date=None):
+    """
+    Re-score an athlete's activities in [start_date, end_date) after a threshold
+    change. Progress is published in the job's meta for the status endpoint.
+    """
+    job = get_current_job()
+
+    def report_progress(processed, total):
+        if job is not None:
+            job.meta["progress"] = {"processed": processed, "total": total}
+            job.save_meta()
+
+    db = SessionLocal()
+    try:
+        result = services.rescoring.rescore_activities(
+            db,
+            athlete_id,
+            start_date=date.fromisoformat(start_date) if start_date else None,
+            end_date=date.fromisoformat(end_date) if end_date else None,
+            on_progress=report_progress,
+        )
+        recalculated_from = result["pmc_recalculated_from"]
+        print(f"Re-scored {result['rescored']} activities for athlete {athlete_id}, {result['changed']} changed")
+        return {
+            **result,
+            "pmc_recalculated_from": recalculated_from.isoformat()
+            if recalculated_from
+            else None,
+        }
+    except Exception as e:
+        print(f"Error re-scoring activities for athlete {athlete_id}: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def backfill_strava_activities(athlete_id, strava_activity_ids, attempt=0):
+    """
+    Ingest many Strava activities for an athlete. Activities are fetched
+    concurrently within the Strava budget shared by all workers; once it is
+    used up (or Strava answers 429), the rest is re-enqueued for when the
+    budget resets, with exponential backoff while no progress is made.
+    Scaling factors and the PMC are updated once per run.
+    """
+
+    def ingest(db, service, pending, progress):
+        return services.strava_backfill.ingest_strava_activities(
+            db, service, athlete_id, pending, progress
+        )
+
+    return _run_strava_backfill(
+        "tasks.backfill_strava_activities",
+        athlete_id,
+        strava_activity_ids,
+        attempt,
+        ingest,
+    )
+
+
+def backfill_strava_activities_async(
+    athlete_id,
+    strava_activity_ids,
+    attempt=0,
+    concurrency=services.strava_async.ASYNC_INGEST_CONCURRENCY,
+):
+    """
+    Like backfill_strava_activities, but fetches on an asyncio event loop:
+    up to ``concurrency`` activities (summary and streams concurrently) are
+    in flight while completed ones are mapped and inserted in batches.
+    """
+
+    def ingest(db, service, pending, progress):
+        async def run():
+            async with services.strava_async.AsyncStravaClient(
+                service.access_token, service.rate_limiter, concurrency=concurrency
+            ) as client:
+                return await services.strava_async.ingest_strava_activities_async(
+                    db, client, service, athlete_id, pending, progress, concurrency
+                )
+
+        return asyncio.run(run())
+
+    return _run_strava_backfill(
+        "tasks.backfill_strava_activities_async",
+        athlete_id,
+        strava_activity_ids,
+        attempt,
+        ingest,
+        concurrency=concurrency,
+    )
+
+
+def _run_strava_backfill(
+    task_name, athlete_id, strava_activity_ids, attempt, ingest, **task_kwargs
+):
+    """
+    Runs ``ingest(db, service, pending_ids, progress)`` for the activities not
+    ingested yet, updates scaling factors and the PMC and re-enqueues
+    ``task_name`` for the rate limited activities.
+    """
     db = SessionLocal()
+    progress = services.strava_backfill.BackfillProgress(redis_conn, athlete_id)
     try:
-        athlete = crud.get_athlete_by_strava_id(db, strava_athlete_id)
+        athlete = crud.get_athlete(db, athlete_id)
         if not athlete or not athlete.strava_access_token:
-            print(f"No athlete or token for strava_id {strava_athlete_id}")
+            print(f"No athlete or token for athlete {athlete_id}, dropping backfill")
             return
 
-        # Idempotency check: skip if activity already exists
-        existing_activity = crud.get_activity_by_strava_id(db, strava_activity_id)
-        if existing_activity:
-            print(f"Activity {strava_activity_id} already exists, skipping")
-            return
+        existing = crud.get_existing_strava_activity_ids(db, strava_activity_ids)
+        if existing:
+            progress.record_completed(len(existing))
+        pending = [
+            strava_activity_id
+            for strava_activity_id in strava_activity_ids
+            if strava_activity_id not in existing
+        ]
 
-        # Check if token is expired
-        now = datetime.utcnow()
-        if athlete.strava_expires_at and athlete.strava_expires_at <= now:
-            # Refresh token
-            service = StravaService("")  # No access token needed for refresh
-            refresh_data = service.refresh_access_token(athlete.strava_refresh_token)
-            expires_at = datetime.fromtimestamp(refresh_data["expires_at"])
-            crud.update_athlete_strava_tokens(
-                db,
-                athlete.athlete_id,
-                refresh_data["access_token"],
-                refresh_data["refresh_token"],
-                expires_at,
+        service = _strava_service(db, athlete, StravaRateLimiter(redis_conn))
+        result = ingest(db, service, pending, progress)
+        earliest_date, rate_limited = result["earliest_date"], result["rate_limited"]
+
+        if earliest_date is not None:
+            services.athlete_services.update_scaling_factors(db, athlete_id)
+            services.calculations.recalculate_pmc_from_date(
+                db, athlete_id, earliest_date
             )
-            athlete = crud.get_athlete_by_strava_id(db, strava_athlete_id)
 
-        service = StravaService(athlete.strava_access_token)
-        summary = service.get_activity_summary(strava_activity_id)
-        try:
-            streams = service.get_activity_streams(strava_activity_id)
-            print(f"Fetched streams for activity {strava_activity_id}: {list(streams.keys())}")
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
-                print(f"Streams not available for activity {strava_activity_id}, proceeding with summary only")
-                streams = {}
-            else:
-                raise
-        activity = service.map_to_betta_activity(
-            {"summary": summary, "streams": streams}, athlete.athlete_id, db
-        )
-        print(f"Created {len(activity.records)} records and {len(activity.laps)} laps for activity {strava_activity_id}. TSS: {activity.tss or 0}")
-        db.add(activity)
-        db.commit()
-        print(f"Activity {strava_activity_id} ingested for athlete {athlete.athlete_id}")
+        if rate_limited:
+            # Back off further only while runs make no progress
+            attempt = 0 if earliest_date is not None else attempt + 1
+            delay = services.strava_backfill.retry_delay(
+                attempt, result["retry_after"]
+            )
+            progress.record_retry(time.time() + delay)
+            queue.enqueue_in(
+                timedelta(seconds=delay),
+                task_name,
+                athlete_id,
+                rate_limited,
+                attempt,
+                **task_kwargs,
+            )
+            print(f"Strava rate limit reached, {len(rate_limited)} activities for athlete {athlete_id} retry in {delay:.0f}s")
+        return progress.status()
     except Exception as e:
-        print(f"Error processing activity {strava_activity_id}: {e}")
+        print(f"Error backfilling Strava activities for athlete {athlete_id}: {e}")
         db.rollback()
+        raise
     finally:
         db.close()
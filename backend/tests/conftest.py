@@ -0,0 +1,18 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+import services
+
+
+@pytest.fixture
+def db():
+    """In-memory SQLite session with the full schema."""
+    # Athlete IDs restart with every database; drop timelines cached for others
+    services.thresholds.invalidate_threshold_timeline()
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
@@ -0,0 +1,57 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import crud
+import models
+
+
+@pytest.fixture
+def athlete_id(db):
+    athlete = models.Athlete(first_name="Marianne", last_name="Vos")
+    start = datetime(2024, 1, 1, 8)
+    athlete.activities = [
+        models.Activity(start_time=start + timedelta(days=day // 2), sport="cycling")
+        for day in range(10)  # Two activities per day, sharing a start time
+    ]
+    db.add(athlete)
+    db.commit()
+    return athlete.athlete_id
+
+
+def test_keyset_pages_cover_every_activity_once(db, athlete_id):
+    seen, cursor = [], None
+    while True:
+        page, cursor, total = crud.get_activities_by_athlete(
+            db, athlete_id, cursor=cursor, limit=3
+        )
+        seen.extend(page)
+        assert total is None
+        if cursor is None:
+            break
+
+    assert len(seen) == 10
+    assert len({activity.activity_id for activity in seen}) == 10
+    keys = [(activity.start_time, activity.activity_id) for activity in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_date_range_is_inclusive_and_counted(db, athlete_id):
+    page, cursor, total = crud.get_activities_by_athlete(
+        db,
+        athlete_id,
+        start_date=date(2024, 1, 2),
+        end_date=date(2024, 1, 3),
+        include_total=True,
+    )
+
+    assert total == 4 and cursor is None
+    assert {activity.start_time.date() for activity in page} == {
+        date(2024, 1, 2),
+        date(2024, 1, 3),
+    }
+
+
+def test_malformed_cursor_raises_value_error(db, athlete_id):
+    with pytest.raises(ValueError):
+        crud.get_activities_by_athlete(db, athlete_id, cursor="not-a-cursor")
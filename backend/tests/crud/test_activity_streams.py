@@ -0,0 +1,41 @@
+import numpy as np
+from unittest.mock import Mock
+
+import crud
+from models import ActivityStream
+
+
+def test_bulk_insert_activity_streams_uses_copy_on_postgres():
+    stream = ActivityStream.from_arrays(
+        {"time": np.arange(3), "power": np.array([100.0, 110.0, 120.0])}
+    )
+    stream.activity_id = 42
+
+    db = Mock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+    cursor = db.connection.return_value.connection.cursor.return_value
+
+    crud.bulk_insert_activity_streams(db, [stream])
+
+    sql, buffer = cursor.copy_expert.call_args.args
+    assert sql.startswith("COPY activity_streams (activity_id, sample_count, time,")
+    fields = buffer.getvalue().rstrip("\n").split("\t")
+    assert fields[:2] == ["42", "3"]
+    assert fields[2] == "\\\\x" + stream.time.hex()
+    assert fields[-1] == "\\N"  # No altitude channel
+    db.execute.assert_not_called()
+    cursor.close.assert_called_once()
+
+
+def test_bulk_insert_activity_streams_falls_back_to_executemany():
+    stream = ActivityStream.from_arrays({"time": np.arange(2)})
+    stream.activity_id = 7
+
+    db = Mock()
+    db.get_bind.return_value.dialect.name = "sqlite"
+
+    crud.bulk_insert_activity_streams(db, [stream])
+
+    _, rows = db.execute.call_args.args
+    assert rows[0]["activity_id"] == 7
+    assert rows[0]["power"] is None
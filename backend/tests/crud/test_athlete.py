@@ -0,0 +1,39 @@
+from datetime import date, datetime
+
+import crud
+import models
+
+
+def test_tiered_athlete_loading(db):
+    athlete = models.Athlete(first_name="Eddy", last_name="Merckx")
+    athlete.activities = [
+        models.Activity(start_time=datetime(2024, 5, day), sport="cycling")
+        for day in (1, 2, 3)
+    ]
+    athlete.metrics = [
+        models.AthleteMetric(
+            metric_type=models.MetricType.FTP,
+            value=300,
+            date_established=date(2024, 1, 1),
+        )
+    ]
+    db.add(athlete)
+    db.commit()
+    athlete_id = athlete.athlete_id
+    db.expunge_all()
+
+    assert crud.athlete_exists(db, athlete_id)
+    assert not crud.athlete_exists(db, athlete_id + 1)
+
+    header = crud.get_athlete(db, athlete_id)
+    assert "activities" not in header.__dict__  # Not loaded until accessed
+
+    profile = crud.get_athlete_profile(db, athlete_id)
+    assert [metric.value for metric in profile.metrics] == [300]
+    assert "activities" not in profile.__dict__
+
+    assert crud.get_athlete_counts(db, athlete_id) == {
+        "activities": 3,
+        "metrics": 1,
+        "equipment": 0,
+    }
@@ -0,0 +1,238 @@
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+import crud
+import models
+import schemas
+import services
+
+
+def test_daily_aggregates_cover_whole_end_day(db):
+    athlete = models.Athlete(first_name="Tadej", last_name="Pogacar")
+    athlete.activities = [
+        models.Activity(
+            start_time=datetime(2024, 3, 3, 23, 30), tss=50, unified_training_load=50
+        ),
+        models.Activity(
+            start_time=datetime(2024, 3, 4, 7), tss=80, unified_training_load=80
+        ),
+        models.Activity(
+            start_time=datetime(2024, 3, 4, 18), tss=20, unified_training_load=20
+        ),
+        models.Activity(
+            start_time=datetime(2024, 3, 5, 0, 10), tss=90, unified_training_load=90
+        ),
+    ]
+    db.add(athlete)
+    db.commit()
+
+    rows = crud.get_daily_aggregates_for_metric(
+        db, athlete.athlete_id, date(2024, 3, 3), date(2024, 3, 4), "total_tss"
+    )
+
+    assert [(str(row.date), row.total_value) for row in rows] == [
+        ("2024-03-03", 50),
+        ("2024-03-04", 100),
+    ]
+    assert crud.get_daily_activity_summary(
+        db, athlete.athlete_id, date(2024, 3, 4)
+    ) == {
+        "total_tss": 100,
+        "avg_if": 0.0,
+    }
+
+
+def test_create_athlete_metric_invalidates_threshold_cache(db):
+    athlete = models.Athlete(first_name="Lotte", last_name="Kopecky")
+    db.add(athlete)
+    db.commit()
+    ftp = models.MetricType.FTP
+
+    assert services.thresholds.get_threshold(db, athlete.athlete_id, ftp) is None
+    crud.create_athlete_metric(
+        db,
+        schemas.AthleteMetricCreate(
+            metric_type=ftp, value=300, date_established=date(2024, 1, 1)
+        ),
+        athlete.athlete_id,
+    )
+    assert services.thresholds.get_threshold(db, athlete.athlete_id, ftp) == 300
+
+
+def _daily_loads(db, athlete_id):
+    return [
+        (str(row.date), row.activity_count, row.total_load, row.total_moving_time)
+        for row in db.query(models.DailyActivityLoad)
+        .filter_by(athlete_id=athlete_id)
+        .order_by(models.DailyActivityLoad.date)
+        .populate_existing()
+    ]
+
+
+def test_daily_activity_loads_follow_activity_writes(db):
+    athlete = models.Athlete(first_name="Marianne", last_name="Vos")
+    morning = models.Activity(
+        start_time=datetime(2024, 5, 1, 8),
+        unified_training_load=60,
+        total_moving_time=3600,
+    )
+    evening = models.Activity(
+        start_time=datetime(2024, 5, 1, 18),
+        unified_training_load=40,
+        total_moving_time=1800,
+    )
+    athlete.activities = [morning, evening]
+    db.add(athlete)
+    db.commit()
+    athlete_id = athlete.athlete_id
+    assert _daily_loads(db, athlete_id) == [("2024-05-01", 2, 100, 5400)]
+
+    # Moving an activity to another day updates both days
+    evening.start_time = datetime(2024, 5, 3, 18)
+    morning.unified_training_load = 70
+    db.commit()
+    assert _daily_loads(db, athlete_id) == [
+        ("2024-05-01", 1, 70, 3600),
+        ("2024-05-03", 1, 40, 1800),
+    ]
+
+    crud.delete_activity(db, morning.activity_id)
+    assert _daily_loads(db, athlete_id) == [("2024-05-03", 1, 40, 1800)]
+    assert crud.get_daily_activity_summary(db, athlete_id, date(2024, 5, 1)) == {
+        "total_tss": 0,
+        "avg_if": 0.0,
+    }
+
+    crud.delete_athlete(db, athlete_id)
+    assert db.query(models.DailyActivityLoad).count() == 0
+
+
+def test_refresh_daily_activity_loads_rebuilds_range(db):
+    athlete = models.Athlete(first_name="Elisa", last_name="Longo Borghini")
+    athlete.activities = [
+        models.Activity(start_time=datetime(2024, 6, day, 9), tss=day)
+        for day in (1, 2, 3)
+    ]
+    db.add(athlete)
+    db.commit()
+    athlete_id = athlete.athlete_id
+    db.query(models.DailyActivityLoad).delete()
+
+    crud.refresh_daily_activity_loads(
+        db, athlete_id, date(2024, 6, 2), date(2024, 6, 3)
+    )
+
+    rows = crud.get_daily_aggregates_for_metric(
+        db, athlete_id, date(2024, 6, 1), date(2024, 6, 30), "total_tss"
+    )
+    assert [(str(row.date), row.total_value) for row in rows] == [
+        ("2024-06-02", 2),
+        ("2024-06-03", 3),
+    ]
+
+
+def test_refresh_daily_activity_loads_upserts_existing_rows(db):
+    athlete = models.Athlete(first_name="Demi", last_name="Vollering")
+    athlete.activities = [
+        models.Activity(start_time=datetime(2024, 6, 1, 9), unified_training_load=50)
+    ]
+    db.add(athlete)
+    db.commit()
+    athlete_id = athlete.athlete_id
+    # Rows a concurrent transaction could have written in the meantime: a
+    # stale one for an active day and one for a day without activities
+    db.query(models.DailyActivityLoad).update({"total_load": 10})
+    db.add(
+        models.DailyActivityLoad(
+            athlete_id=athlete_id, date=date(2024, 6, 2), activity_count=1
+        )
+    )
+    db.flush()
+
+    crud.refresh_daily_activity_loads(db, athlete_id)
+
+    assert _daily_loads(db, athlete_id) == [("2024-06-01", 1, 50, None)]
+
+
+def test_project_athletes_pmc_starts_from_decayed_state(db):
+    rested = models.Athlete(first_name="Pauline", last_name="Ferrand-Prevot")
+    rested.daily_metrics = [
+        models.DailyPerformanceMetric(date=date(2024, 7, 1), ctl=60, atl=80, tsb=-20)
+    ]
+    new = models.Athlete(first_name="Puck", last_name="Pieterse")
+    db.add_all([rested, new])
+    db.commit()
+
+    pmc = services.calculations.project_athletes_pmc(
+        db,
+        [rested.athlete_id, new.athlete_id],
+        date(2024, 7, 5),
+        np.array([[100, 100], [50, 0]]),
+    )
+
+    # Three rest days (July 2-4) between the stored day and the projection
+    ctl, atl = services.calculations.decay_pmc(60, 80, 3)
+    expected = services.calculations.calculate_pmc_series([100, 100], ctl, atl)
+    assert pmc["ctl"][0] == pytest.approx(expected["ctl"])
+    assert pmc["atl"][0] == pytest.approx(expected["atl"])
+    assert pmc["ctl"][1] == pytest.approx([50 / 42, 50 / 42 * 41 / 42])
+
+
+def test_pmc_series_decays_rest_days_from_stored_rows(db):
+    athlete = models.Athlete(first_name="Anna", last_name="van der Breggen")
+    athlete.daily_metrics = [
+        models.DailyPerformanceMetric(
+            date=date(2024, 8, 1), ctl=50, atl=70, tsb=-20, tss=120, if_avg=0.8
+        ),
+        models.DailyPerformanceMetric(
+            date=date(2024, 8, 5), ctl=55, atl=65, tsb=-10, tss=90, if_avg=0.7
+        ),
+    ]
+    db.add(athlete)
+    db.commit()
+
+    series = services.calculations.get_pmc_series(
+        db, athlete.athlete_id, date(2024, 8, 3), date(2024, 8, 7)
+    )
+
+    # Day-by-day decay from the stored August 1st, including the rest day
+    # before the range
+    expected_ctl, expected_atl, ctl, atl = [], [], 50.0, 70.0
+    for day in range(2, 8):
+        if day == 5:
+            ctl, atl = 55.0, 65.0
+        else:
+            ctl -= ctl / services.calculations.CTL_TC
+            atl -= atl / services.calculations.ATL_TC
+        if day >= 3:
+            expected_ctl.append(ctl)
+            expected_atl.append(atl)
+
+    assert [str(day) for day in series["dates"]] == [
+        "2024-08-03",
+        "2024-08-04",
+        "2024-08-05",
+        "2024-08-06",
+        "2024-08-07",
+    ]
+    assert series["ctl"] == pytest.approx(expected_ctl)
+    assert series["atl"] == pytest.approx(expected_atl)
+    assert series["tsb"] == pytest.approx(np.subtract(expected_ctl, expected_atl))
+    assert series["tss"].tolist() == [0, 0, 90, 0, 0]
+    assert series["id"][2] == athlete.daily_metrics[1].id
+    assert np.count_nonzero(series["id"]) == 1
+
+
+def test_pmc_series_without_history_is_zero(db):
+    athlete = models.Athlete(first_name="Chloe", last_name="Dygert")
+    db.add(athlete)
+    db.commit()
+
+    series = services.calculations.get_pmc_series(
+        db, athlete.athlete_id, date(2024, 8, 1), date(2024, 8, 3)
+    )
+
+    assert series["ctl"].tolist() == [0, 0, 0]
+    assert series["if_avg"].tolist() == [0, 0, 0]
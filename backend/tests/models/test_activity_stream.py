@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+
+from models import Activity, ActivityStream
+from models.activity import channel_to_list
+
+START_TIME = datetime(2024, 5, 1, 8, 0, 0)
+
+
+@pytest.fixture
+def sample_records():
+    return [
+        {
+            "timestamp": START_TIME + timedelta(seconds=i),
+            "power": power,
+            "heart_rate": hr,
+            "cadence": 90,
+            "speed": 8.5,
+            "latitude": 47.1 + i * 0.0001,
+            "longitude": 8.5,
+            "altitude": None,
+        }
+        for i, (power, hr) in enumerate([(200, 140), (None, 141), (250, None)])
+    ]
+
+
+def test_from_records_round_trip(sample_records):
+    stream = ActivityStream.from_records(sample_records, start_time=START_TIME)
+
+    assert stream.sample_count == 3
+    assert stream.altitude is None  # All-missing channels are not stored
+
+    records = stream.to_records(START_TIME)
+    assert [r["timestamp"] for r in records] == [r["timestamp"] for r in sample_records]
+    assert [r["power"] for r in records] == [200, None, 250]
+    assert [r["heart_rate"] for r in records] == [140, 141, None]
+    assert records[2]["latitude"] == pytest.approx(47.1002)
+    assert all(r["altitude"] is None for r in records)
+
+
+def test_channel_returns_typed_arrays(sample_records):
+    stream = ActivityStream.from_records(sample_records, start_time=START_TIME)
+
+    time = stream.channel("time")
+    power = stream.channel("power")
+    assert time.dtype == np.int32
+    assert time.tolist() == [0, 1, 2]
+    assert power.dtype == np.float32
+    assert np.isnan(power[1])
+    assert np.isnan(stream.channel("altitude")).all()
+
+
+def test_set_channel_rejects_length_mismatch():
+    stream = ActivityStream.from_arrays({"time": np.arange(5)})
+    with pytest.raises(ValueError, match="expected 5"):
+        stream.set_channel("power", np.zeros(4))
+
+
+def test_activity_records_property():
+    activity = Activity(start_time=START_TIME)
+    assert activity.records == []
+
+    activity.stream = ActivityStream.from_arrays(
+        {"time": np.arange(2), "power": np.array([180.0, 190.0])}
+    )
+    assert [r["power"] for r in activity.records] == [180, 190]
+    assert activity.records[1]["timestamp"] == START_TIME + timedelta(seconds=1)
+
+
+def test_channel_to_list_is_json_friendly():
+    assert channel_to_list("power", np.array([200.4, np.nan], dtype=np.float32)) == [
+        200,
+        None,
+    ]
+    assert channel_to_list("speed", np.array([8.001], dtype=np.float32)) == [8.001]
+    assert channel_to_list("time", np.arange(2, dtype=np.int32)) == [0, 1]
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+from database import get_db
+from routers import activities
+from services.stream_format import STREAMS_MEDIA_TYPE
+
+
+@pytest.fixture
+def client():
+    # TestClient runs the endpoint in another thread, so every session has to
+    # share the one in-memory connection
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    models.Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    activity = models.Activity(
+        athlete=models.Athlete(first_name="Marianne", last_name="Vos"),
+        start_time=datetime(2024, 4, 1, 9),
+    )
+    activity.stream = models.ActivityStream.from_arrays(
+        {"time": np.arange(10), "power": np.full(10, 200.0)}
+    )
+    db.add(activity)
+    db.commit()
+    db.close()
+
+    def get_test_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(activities.router)
+    app.dependency_overrides[get_db] = get_test_db
+    return TestClient(app)
+
+
+def test_streams_vary_on_accept(client):
+    response = client.get("/activity/1/streams")
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["vary"] == "Accept"
+    assert response.json()["sample_count"] == 10
+
+    response = client.get("/activity/1/streams", headers={"Accept": STREAMS_MEDIA_TYPE})
+    assert response.headers["content-type"] == STREAMS_MEDIA_TYPE
+    assert response.headers["vary"] == "Accept"
@@ -0,0 +1,140 @@
+from datetime import date, datetime
+
+import numpy as np
+
+import crud
+import models
+import schemas
+import services
+
+
+def _ride(start_time, power, heart_rate=None):
+    samples = len(power)
+    activity = models.Activity(
+        start_time=start_time,
+        total_moving_time=samples,
+        tss=0,
+        intensity_factor=0.0,
+        unified_training_load=0,
+    )
+    channels = {"time": np.arange(samples), "power": np.asarray(power, dtype=float)}
+    if heart_rate:
+        channels["heart_rate"] = np.asarray(heart_rate, dtype=float)
+    activity.stream = models.ActivityStream.from_arrays(channels)
+    return activity
+
+
+def test_rescore_uses_threshold_in_effect_and_updates_pmc(db):
+    athlete = models.Athlete(first_name="Demi", last_name="Vollering")
+    athlete.activities = [
+        _ride(datetime(2024, 2, 1, 9), [200] * 3600, [150] * 3600),
+        _ride(datetime(2024, 2, 10, 9), [250] * 3600, [160] * 3600),
+        _ride(datetime(2024, 2, 20, 9), [250] * 1800, [160] * 1800),
+    ]
+    db.add(athlete)
+    db.commit()
+    athlete_id = athlete.athlete_id
+    for value, established in [(250, date(2024, 1, 1)), (200, date(2024, 2, 15))]:
+        crud.create_athlete_metric(
+            db,
+            schemas.AthleteMetricCreate(
+                metric_type=models.MetricType.FTP,
+                value=value,
+                date_established=established,
+            ),
+            athlete_id,
+        )
+
+    progress = []
+    result = services.rescoring.rescore_activities(
+        db,
+        athlete_id,
+        batch_size=2,
+        on_progress=lambda processed, total: progress.append((processed, total)),
+    )
+
+    assert result == {
+        "rescored": 3,
+        "changed": 3,
+        "pmc_recalculated_from": date(2024, 2, 1),
+    }
+    assert progress == [(2, 3), (3, 3)]
+    activities, _, _ = crud.get_activities_by_athlete(db, athlete_id, limit=None)
+    scores = sorted(
+        (a.start_time, a.normalized_power, a.intensity_factor, a.tss)
+        for a in activities
+    )
+    # One hour at 0.8 and 1.0 IF against FTP 250, then half an hour at
+    # 1.25 IF against the later FTP of 200
+    assert [score[1:] for score in scores] == [
+        (200, 0.8, 64),
+        (250, 1.0, 100),
+        (250, 1.25, 78),
+    ]
+    pmc = crud.get_pmc_data(db, athlete_id, date(2024, 2, 1), date(2024, 2, 1))
+    assert pmc[0].tss > 0
+
+
+def test_rescore_limits_to_date_range(db):
+    athlete = models.Athlete(first_name="Kasia", last_name="Niewiadoma")
+    athlete.activities = [
+        _ride(datetime(2024, 3, 1, 9), [200] * 600),
+        _ride(datetime(2024, 3, 8, 9), [200] * 600),
+    ]
+    db.add(athlete)
+    db.commit()
+    athlete_id = athlete.athlete_id
+    crud.create_athlete_metric(
+        db,
+        schemas.AthleteMetricCreate(
+            metric_type=models.MetricType.FTP,
+            value=200,
+            date_established=date(2024, 1, 1),
+        ),
+        athlete_id,
+    )
+
+    result = services.rescoring.rescore_activities(
+        db, athlete_id, start_date=date(2024, 3, 5)
+    )
+
+    assert result["rescored"] == 1
+    assert result["pmc_recalculated_from"] == date(2024, 3, 8)
+    activities, _, _ = crud.get_activities_by_athlete(db, athlete_id, limit=None)
+    assert sorted((a.start_time.day, a.tss) for a in activities) == [(1, 0), (8, 17)]
+
+
+def test_rescore_sees_threshold_added_by_another_process(db):
+    athlete = models.Athlete(first_name="Elisa", last_name="Longo Borghini")
+    athlete.activities = [_ride(datetime(2024, 4, 2, 9), [200] * 3600)]
+    athlete.metrics = [
+        models.AthleteMetric(
+            metric_type=models.MetricType.FTP,
+            value=250,
+            date_established=date(2024, 1, 1),
+        )
+    ]
+    db.add(athlete)
+    db.commit()
+    athlete_id = athlete.athlete_id
+    # Warm this process's cache, then add the new FTP without invalidating it
+    assert (
+        services.thresholds.get_threshold(
+            db, athlete_id, models.MetricType.FTP, on=date(2024, 4, 2)
+        )
+        == 250
+    )
+    db.add(
+        models.AthleteMetric(
+            athlete_id=athlete_id,
+            metric_type=models.MetricType.FTP,
+            value=200,
+            date_established=date(2024, 4, 1),
+        )
+    )
+    db.commit()
+
+    services.rescoring.rescore_activities(db, athlete_id)
+
+    activity = db.query(models.Activity).one()
+    assert (activity.intensity_factor, activity.tss) == (1.0, 100)
@@ -0,0 +1,180 @@
+import asyncio
+import threading
+from unittest.mock import Mock
+
+import httpx
+
+import models
+from services.strava_async import AsyncStravaClient, ingest_strava_activities_async
+from services.strava_service import StravaService
+
+
+def _summary(strava_activity_id):
+    return {
+        "id": strava_activity_id,
+        "type": "Ride",
+        "name": f"Ride {strava_activity_id}",
+        "start_date": f"2024-03-{strava_activity_id:02d}T08:00:00Z",
+        "moving_time": 3600,
+        "elapsed_time": 3700,
+        "distance": 30000,
+    }
+
+
+def _client(handler, rate_limiter=None):
+    return AsyncStravaClient(
+        "token",
+        rate_limiter=rate_limiter,
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+
+def _ingest(db, client, ids, **kwargs):
+    progress = Mock()
+
+    async def run():
+        async with client:
+            return await ingest_strava_activities_async(
+                db,
+                client,
+                StravaService("token", session=Mock()),
+                1,
+                ids,
+                progress,
+                **kwargs,
+            )
+
+    return asyncio.run(run()), progress
+
+
+def test_fetch_activity_requests_summary_and_streams_concurrently():
+    in_flight, peak = 0, 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if request.url.path.endswith("/streams"):
+            return httpx.Response(404)
+        return httpx.Response(200, json=_summary(7))
+
+    async def run():
+        async with _client(handler) as client:
+            return await client.fetch_activity(7)
+
+    assert asyncio.run(run()) == {"summary": _summary(7), "streams": {}}
+    assert peak == 2
+
+
+def test_ingest_pipelines_activities_in_batches(db):
+    db.add(models.Athlete(athlete_id=1, first_name="Lotte", last_name="Kopecky"))
+    db.commit()
+    in_flight, peak = 0, 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if request.url.path.endswith("/streams"):
+            return httpx.Response(200, json={})
+        return httpx.Response(200, json=_summary(int(request.url.path.split("/")[-1])))
+
+    result, progress = _ingest(
+        db, _client(handler), list(range(1, 11)), concurrency=3, batch_size=4
+    )
+
+    assert peak <= 6
+    assert sorted(
+        activity.strava_activity_id for activity in db.query(models.Activity)
+    ) == list(range(1, 11))
+    assert [call.args for call in progress.record_completed.call_args_list] == [
+        (4,),
+        (4,),
+        (2,),
+    ]
+    assert result["earliest_date"].isoformat() == "2024-03-01"
+    assert result["rate_limited"] == []
+
+
+def test_failed_batch_insert_only_fails_the_bad_activity(db):
+    async def handler(request):
+        if request.url.path.endswith("/streams"):
+            return httpx.Response(200, json={})
+        strava_activity_id = int(request.url.path.split("/")[-1])
+        summary = _summary(strava_activity_id)
+        if strava_activity_id == 2:
+            summary["name"] = {"not": "storable"}  # Fails on INSERT
+        return httpx.Response(200, json=summary)
+
+    result, progress = _ingest(db, _client(handler), [1, 2, 3], batch_size=3)
+
+    assert progress.record_failed.call_count == 1
+    assert progress.record_failed.call_args.args[0] == 2
+    assert progress.record_completed.call_count == 2
+    assert sorted(
+        activity.strava_activity_id for activity in db.query(models.Activity)
+    ) == [1, 3]
+    assert result["earliest_date"].isoformat() == "2024-03-01"
+
+
+def test_limiter_calls_run_off_the_event_loop():
+    limiter_threads = []
+    limiter = Mock()
+
+    def record_thread(*args):
+        limiter_threads.append(threading.current_thread())
+
+    limiter.acquire.side_effect = record_thread
+    limiter.update_from_headers.side_effect = record_thread
+
+    async def handler(request):
+        return httpx.Response(200, json=_summary(1))
+
+    async def run():
+        async with _client(handler, limiter) as client:
+            await client.get_activity_summary(1)
+        return threading.current_thread()
+
+    event_limiter_threads = asyncio.run(run())
+    assert len(limiter_threads) == 2
+    assert event_limiter_threads not in limiter_threads
+
+
+def test_ingest_stops_calling_the_api_once_rate_limited(db):
+    calls = []
+    limiter = Mock()
+    limiter.retry_after_throttled.return_value = 300.0
+
+    async def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(429)
+
+    result, progress = _ingest(
+        db, _client(handler, limiter), [1, 2, 3, 4], concurrency=1
+    )
+
+    assert sorted(result["rate_limited"]) == [1, 2, 3, 4]
+    assert result["retry_after"] == 300.0
+    # Only the first activity's two concurrent requests reached Strava
+    assert len(calls) == 2
+    progress.record_completed.assert_not_called()
+    assert db.query(models.Activity).count() == 0
+
+
+def test_ingest_records_failed_activities(db):
+    async def handler(request):
+        if request.url.path.endswith("/2"):
+            return httpx.Response(500)
+        if request.url.path.endswith("/streams"):
+            return httpx.Response(200, json={})
+        return httpx.Response(200, json=_summary(int(request.url.path.split("/")[-1])))
+
+    result, progress = _ingest(db, _client(handler), [1, 2, 3])
+
+    assert progress.record_failed.call_args.args[0] == 2
+    assert db.query(models.Activity).count() == 2
+    assert result["rate_limited"] == []
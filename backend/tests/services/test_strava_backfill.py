@@ -0,0 +1,83 @@
+from unittest.mock import Mock
+
+import pytest
+
+from services.strava_backfill import fetch_strava_activities, retry_delay
+from services.strava_rate_limit import (
+    StravaRateLimitExceeded,
+    parse_rate_limit_header,
+    seconds_until_reset,
+)
+from services.strava_service import StravaService
+
+
+def test_parse_rate_limit_header():
+    assert parse_rate_limit_header("100,1000") == (100, 1000)
+    assert parse_rate_limit_header(None) is None
+    assert parse_rate_limit_header("garbage") is None
+
+
+def test_seconds_until_reset_follows_strava_windows():
+    quarter_past_ten = 10 * 3600 + 15 * 60
+    assert seconds_until_reset(1, quarter_past_ten + 60) == 14 * 60
+    assert seconds_until_reset(2, quarter_past_ten) == 24 * 3600 - quarter_past_ten
+
+
+def test_retry_delay_backs_off_without_progress():
+    assert retry_delay(0, 300) == 300
+    assert retry_delay(3, 30) == 480
+    assert retry_delay(20, 30) == 6 * 3600
+
+
+def test_service_raises_rate_limited_on_429():
+    session = Mock()
+    session.get.return_value = Mock(status_code=429, headers={})
+    limiter = Mock()
+    limiter.retry_after_throttled.return_value = 120.0
+    service = StravaService("token", rate_limiter=limiter, session=session)
+
+    with pytest.raises(StravaRateLimitExceeded) as exc_info:
+        service.get_activity_summary(1)
+
+    assert exc_info.value.retry_after == 120.0
+    limiter.acquire.assert_called_once()
+
+
+def test_service_syncs_limiter_with_response_headers():
+    headers = {"X-RateLimit-Usage": "5,50", "X-RateLimit-Limit": "100,1000"}
+    session = Mock()
+    session.get.return_value = Mock(status_code=200, headers=headers)
+    session.get.return_value.json.return_value = {"id": 1}
+    limiter = Mock()
+
+    service = StravaService("token", rate_limiter=limiter, session=session)
+
+    service.get_activity_summary(1)
+
+    limiter.update_from_headers.assert_called_once_with(headers)
+
+
+def test_fetch_stops_calling_the_api_once_rate_limited():
+    service = Mock()
+    service.get_activity_summary.side_effect = [
+        {"id": 1},
+        StravaRateLimitExceeded(600),
+        {"id": 3},
+    ]
+    service.get_activity_streams.return_value = {}
+
+    results = dict(fetch_strava_activities(service, [1, 2, 3], concurrency=1))
+
+    assert results[1] == {"summary": {"id": 1}, "streams": {}}
+    assert isinstance(results[2], StravaRateLimitExceeded)
+    assert results[3] is results[2]
+    assert service.get_activity_summary.call_count == 2
+
+
+def test_services_share_one_pooled_session():
+    first, second = StravaService("a"), StravaService("b")
+
+    assert first.session is second.session
+    adapter = first.session.get_adapter(StravaService.BASE_URL)
+    assert adapter.max_retries.total == 3
+    assert 429 not in adapter.max_retries.status_forcelist
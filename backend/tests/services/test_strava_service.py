@@ -1,12 +1,13 @@
 import pytest
-from unittest.mock import Mock, patch
-from datetime import datetime, timezone
-from services.strava_service import StravaService
+from unittest.mock import Mock
+from datetime import date, datetime, timezone
 
+import numpy as np
 
-@pytest.fixture
-def mock_db():
-    return Mock()
+import crud
+import models
+import schemas
+from services.strava_service import StravaService, strava_streams_to_arrays
 
 
 @pytest.fixture
@@ -46,18 +47,14 @@ def sample_strava_streams():
     }
 
 
-@patch("services.activity_processing.recalculate_virtual_power")
 def test_map_to_betta_activity_with_sample_data(
-    mock_recalc, mock_db, sample_strava_summary, sample_strava_streams
+    db, sample_strava_summary, sample_strava_streams
 ):
     """Test mapping Strava sample response to Betta Activity."""
-    service = StravaService("fake_token")
+    service = StravaService("fake_token", session=Mock())
     strava_data = {"summary": sample_strava_summary, "streams": sample_strava_streams}
 
-    # Mock the recalc function
-    mock_recalc.return_value = Mock()
-
-    activity = service.map_to_betta_activity(strava_data, athlete_id=1, db=mock_db)
+    activity = service.map_to_betta_activity(strava_data, athlete_id=1, db=db)
 
     # Assert summary mappings
     assert activity.athlete_id == 1
@@ -78,35 +75,35 @@ def test_map_to_betta_activity_with_sample_data(
     assert activity.max_cadence is None  # Not in sample
     assert activity.total_calories == 870.2
 
-    # Assert records from streams
+    # Assert records expanded from the stored stream
     assert len(activity.records) == 4
-    assert activity.records[0].power == 100
-    assert activity.records[0].heart_rate == 120
-    assert activity.records[0].latitude == 37.83
-    assert activity.records[0].longitude == -122.26
+    assert activity.records[0]["power"] == 100
+    assert activity.records[0]["heart_rate"] == 120
+    assert activity.records[0]["latitude"] == 37.83
+    assert activity.records[0]["longitude"] == -122.26
 
-    assert activity.records[1].power == 150
-    assert activity.records[1].heart_rate == 130
-    assert activity.records[1].latitude == 37.84
-    assert activity.records[1].longitude == -122.25
+    assert activity.records[1]["power"] == 150
+    assert activity.records[1]["heart_rate"] == 130
+    assert activity.records[1]["latitude"] == 37.84
+    assert activity.records[1]["longitude"] == -122.25
 
-    assert activity.records[2].power == 200
-    assert activity.records[2].heart_rate == 140  # Shorter array, but padded
-    assert activity.records[2].latitude is None  # None in data
-    assert activity.records[2].longitude is None
+    assert activity.records[2]["power"] == 200
+    assert activity.records[2]["heart_rate"] == 140  # Shorter array, but padded
+    assert activity.records[2]["latitude"] is None  # None in data
+    assert activity.records[2]["longitude"] is None
 
-    assert activity.records[3].power == 180
-    assert activity.records[3].heart_rate is None
-    assert activity.records[3].latitude == 37.85
-    assert activity.records[3].longitude == -122.24
+    assert activity.records[3]["power"] == 180
+    assert activity.records[3]["heart_rate"] is None
+    assert activity.records[3]["latitude"] == 37.85
+    assert activity.records[3]["longitude"] == -122.24
 
-    # Ensure recalc was called
-    mock_recalc.assert_called_once()
+    assert activity.normalized_power == 158
+    assert activity.power_curve is not None
 
 
-def test_sport_mapping():
+def test_sport_mapping(db):
     """Test Strava sport type to Betta sport mapping."""
-    service = StravaService("fake_token")
+    service = StravaService("fake_token", session=Mock())
 
     # Test various mappings
     test_cases = [
@@ -118,16 +115,133 @@ def test_sport_mapping():
     ]
 
     for strava_type, expected_betta in test_cases:
-        with patch("services.activity_processing.recalculate_virtual_power"):
-            activity = service.map_to_betta_activity(
-                {
-                    "summary": {
-                        "type": strava_type,
-                        "start_date": "2018-02-16T14:52:54Z",
-                    },
-                    "streams": {"time": {"data": []}},
+        activity = service.map_to_betta_activity(
+            {
+                "summary": {
+                    "id": 1,
+                    "type": strava_type,
+                    "start_date": "2018-02-16T14:52:54Z",
                 },
-                athlete_id=1,
-                db=Mock(),
-            )
-            assert activity.sport == expected_betta
+                "streams": {"time": {"data": []}},
+            },
+            athlete_id=1,
+            db=db,
+        )
+        assert activity.sport == expected_betta
+        assert activity.stream is None
+
+
+def test_streams_to_arrays_masks_missing_samples():
+    channels = strava_streams_to_arrays(
+        {
+            "time": {"data": [0, 1, 2]},
+            "watts": {"data": [100, None, 120, 130]},  # Longer than time
+            "latlng": {"data": [[1.0, 2.0], None]},
+        }
+    )
+
+    assert channels["time"].tolist() == [0, 1, 2]
+    np.testing.assert_array_equal(channels["power"], [100, np.nan, 120])
+    np.testing.assert_array_equal(channels["latitude"], [1.0, np.nan, np.nan])
+    np.testing.assert_array_equal(channels["longitude"], [2.0, np.nan, np.nan])
+    assert np.isnan(channels["heart_rate"]).all()
+    assert strava_streams_to_arrays({"time": {"data": []}}) is None
+
+
+def test_map_long_ride_scores_with_threshold_in_effect(db):
+    athlete = models.Athlete(first_name="Marianne", last_name="Vos", psf_trimp=1.0)
+    db.add(athlete)
+    db.commit()
+    for metric_type, value, established in [
+        (models.MetricType.FTP, 250, date(2018, 1, 1)),
+        (models.MetricType.FTP, 300, date(2019, 1, 1)),
+        (models.MetricType.THR, 160, date(2018, 1, 1)),
+    ]:
+        crud.create_athlete_metric(
+            db,
+            schemas.AthleteMetricCreate(
+                metric_type=metric_type, value=value, date_established=established
+            ),
+            athlete.athlete_id,
+        )
+    samples = 4 * 3600
+    service = StravaService("fake_token", session=Mock())
+
+    activity = service.map_to_betta_activity(
+        {
+            "summary": {
+                "id": 42,
+                "type": "Ride",
+                "start_date": "2018-06-01T08:00:00Z",
+                "moving_time": samples,
+                "average_watts": 200,
+            },
+            "streams": {
+                "time": {"data": list(range(samples))},
+                "watts": {"data": [200] * samples},
+                "heartrate": {"data": [150] * samples},
+                "latlng": {"data": [[45.0, 6.0]] * samples},
+            },
+        },
+        athlete_id=athlete.athlete_id,
+        db=db,
+    )
+
+    assert activity.stream.sample_count == samples
+    assert activity.normalized_power == 200
+    assert activity.intensity_factor == 0.8
+    assert activity.tss == 256
+    assert activity.trimp > 0
+    assert activity.unified_training_load == activity.tss
+
+
+def test_map_without_power_keeps_speed_only(db):
+    service = StravaService("fake_token", session=Mock())
+
+    activity = service.map_to_betta_activity(
+        {
+            "summary": {"id": 7, "type": "Run", "start_date": "2018-06-01T08:00:00Z"},
+            "streams": {
+                "time": {"data": [0, 1, 2]},
+                "velocity_smooth": {"data": [0.0, 3.5, 3.6]},
+            },
+        },
+        athlete_id=1,
+        db=db,
+    )
+
+    assert activity.stream.power is None
+    assert activity.stream.channel("speed").tolist() == pytest.approx([0.0, 3.5, 3.6])
+    assert activity.normalized_power is None
+    assert activity.power_curve is None
+    assert activity.unified_training_load == 0
+
+
+def test_map_scales_trimp_to_integer_load(db):
+    athlete = models.Athlete(first_name="Kasia", last_name="Niewiadoma")
+    athlete.metrics = [
+        models.AthleteMetric(
+            metric_type=models.MetricType.THR,
+            value=160,
+            date_established=date(2018, 1, 1),
+        )
+    ]
+    db.add(athlete)
+    db.commit()
+    strava_data = {
+        "summary": {"id": 8, "type": "Run", "start_date": "2018-06-01T08:00:00Z"},
+        "streams": {
+            "time": {"data": list(range(1800))},
+            "heartrate": {"data": [150] * 1800},
+        },
+    }
+    service = StravaService("fake_token", session=Mock())
+
+    activity = service.map_to_betta_activity(
+        strava_data, athlete.athlete_id, db, scaling_factors=(0.45, 0.24)
+    )
+
+    assert activity.tss is None
+    assert activity.trimp > 0
+    assert activity.unified_training_load == round(activity.trimp * 0.45)
+    assert isinstance(activity.unified_training_load, int)
@@ -0,0 +1,188 @@
+from datetime import date, datetime
+from unittest.mock import Mock
+
+import fakeredis
+import pytest
+import requests
+
+import models
+import tasks
+from services.strava_service import StravaService
+from services.strava_webhook import (
+    StravaWebhookInbox,
+    activity_lock,
+    apply_activity_event,
+)
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeRedis()
+
+
+def _athlete_with_ride(db):
+    athlete = models.Athlete(
+        first_name="Pauline",
+        last_name="Ferrand-Prevot",
+        strava_athlete_id=99,
+        strava_access_token="token",
+    )
+    athlete.activities = [
+        models.Activity(
+            name="Morning Ride",
+            sport="cycling",
+            start_time=datetime(2024, 5, 1, 8),
+            strava_activity_id=1,
+            tss=80,
+            unified_training_load=80,
+        )
+    ]
+    db.add(athlete)
+    db.commit()
+    return athlete
+
+
+def _event(aspect, updates=None):
+    return {"aspect": aspect, "owner_id": 99, "updates": updates or {}, "events": 1}
+
+
+def test_duplicate_create_costs_no_api_calls(db):
+    _athlete_with_ride(db)
+    get_service = Mock()
+
+    assert apply_activity_event(db, 1, _event("create"), get_service) is None
+    get_service.assert_not_called()
+
+
+def test_update_applies_fields_without_api_calls(db):
+    _athlete_with_ride(db)
+    get_service = Mock()
+
+    changed = apply_activity_event(
+        db, 1, _event("update", {"title": "Recovery spin", "type": "Run"}), get_service
+    )
+
+    activity = db.query(models.Activity).one()
+    assert (activity.name, activity.sport) == ("Recovery spin", "run")
+    assert changed is None
+    get_service.assert_not_called()
+
+
+def test_delete_removes_activity_and_reports_pmc_start(db):
+    athlete = _athlete_with_ride(db)
+
+    changed = apply_activity_event(db, 1, _event("delete"), Mock())
+
+    assert changed == (athlete.athlete_id, date(2024, 5, 1))
+    assert db.query(models.Activity).count() == 0
+    assert apply_activity_event(db, 1, _event("delete"), Mock()) is None
+
+
+def test_update_of_missing_activity_ingests_it(db):
+    athlete = _athlete_with_ride(db)
+    service = StravaService("token", session=Mock())
+    service.get_activity_summary = Mock(
+        return_value={"id": 2, "type": "Ride", "start_date": "2024-05-03T08:00:00Z"}
+    )
+    service.get_activity_streams = Mock(return_value={})
+
+    changed = apply_activity_event(
+        db, 2, _event("update", {"title": "Renamed"}), lambda _: service
+    )
+
+    assert changed == (athlete.athlete_id, date(2024, 5, 3))
+    assert sorted(
+        activity.strava_activity_id for activity in db.query(models.Activity)
+    ) == [1, 2]
+
+
+def test_inbox_drops_redelivered_events(redis):
+    inbox = StravaWebhookInbox(redis)
+
+    assert inbox.record(1, 99, "create", event_time=1000)
+    assert not inbox.record(1, 99, "create", event_time=1000)
+
+    assert inbox.pop(1) == {
+        "aspect": "create",
+        "owner_id": 99,
+        "updates": {},
+        "events": 1,
+    }
+    # Still a redelivery after the event was processed
+    assert not inbox.record(1, 99, "create", event_time=1000)
+    assert inbox.pop(1) is None
+
+
+def test_inbox_coalesces_bursts_with_strongest_aspect(redis):
+    inbox = StravaWebhookInbox(redis)
+
+    assert inbox.record(1, 99, "create", event_time=1000)
+    assert not inbox.record(1, 99, "update", {"title": "Hill repeats"}, 1001)
+    assert not inbox.record(1, 99, "update", {"type": "VirtualRide"}, 1002)
+    assert inbox.pop(1) == {
+        "aspect": "create",
+        "owner_id": 99,
+        "updates": {"title": "Hill repeats", "type": "VirtualRide"},
+        "events": 3,
+    }
+
+    assert inbox.record(2, 99, "update", {"title": "Commute"}, 1000)
+    assert not inbox.record(2, 99, "delete", event_time=1001)
+    assert not inbox.record(2, 99, "create", event_time=1002)
+    assert inbox.pop(2)["aspect"] == "delete"
+    assert inbox.pop(2) is None
+
+
+def test_inbox_restore_merges_with_newer_events(redis):
+    inbox = StravaWebhookInbox(redis)
+    inbox.record(1, 99, "create", event_time=1000)
+    event = inbox.pop(1)
+
+    assert inbox.record(1, 99, "delete", event_time=1001)
+    assert not inbox.restore(1, event)
+    assert inbox.pop(1)["aspect"] == "delete"
+    assert inbox.restore(1, event)
+
+
+def test_activity_lock_admits_one_job(redis):
+    with activity_lock(redis, 1) as acquired:
+        assert acquired
+        with activity_lock(redis, 1) as second:
+            assert not second
+        with activity_lock(redis, 2) as other_activity:
+            assert other_activity
+    with activity_lock(redis, 1) as again:
+        assert again
+
+
+def test_failed_webhook_job_keeps_events_and_retries(db, redis, monkeypatch):
+    _athlete_with_ride(db)
+    queue = Mock()
+    monkeypatch.setattr(tasks, "redis_conn", redis)
+    monkeypatch.setattr(tasks, "queue", queue)
+    monkeypatch.setattr(tasks, "SessionLocal", lambda: db)
+    monkeypatch.setattr(
+        tasks.services.strava_webhook,
+        "fetch_strava_activity",
+        Mock(side_effect=requests.exceptions.HTTPError("503 Service Unavailable")),
+    )
+    inbox = StravaWebhookInbox(redis)
+    inbox.record(2, 99, "create", event_time=1000)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        tasks.process_strava_webhook_event(2)
+
+    assert inbox.pop(2)["aspect"] == "create"
+    delay, _, strava_activity_id, attempt = queue.enqueue_in.call_args.args
+    assert (strava_activity_id, attempt) == (2, 1)
+    assert delay.total_seconds() > 0
+
+    # The last attempt drops the events instead of retrying forever
+    queue.reset_mock()
+    inbox.record(2, 99, "create", event_time=1001)
+    with pytest.raises(requests.exceptions.HTTPError):
+        tasks.process_strava_webhook_event(
+            2, tasks.services.strava_webhook.WEBHOOK_MAX_ATTEMPTS - 1
+        )
+    assert inbox.pop(2) is None
+    queue.enqueue_in.assert_not_called()
@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 from datetime import date
 from unittest.mock import MagicMock, patch
@@ -9,14 +10,24 @@ from services.calculations import (
     calculate_tss,
     estimate_power_tacx,
     calculate_time_in_zones,
+    calculate_time_in_zones_multi,
     calculate_daily_pmc,
     calculate_historical_mmp,
+    calculate_mean_max,
+    mean_max_durations,
+    calculate_power_curve,
+    combine_power_curves,
+    calculate_pmc_series,
+    decay_pmc,
+    project_pmc,
     recalculate_pmc_from_date,
     find_best_n_minute_average,
     POWER_ZONE_DEFINITIONS,
     HR_ZONE_DEFINITIONS,
     CTL_TC,
     ATL_TC,
+    MMP_CURVE_DURATIONS,
+    DENSE_DURATION_LIMIT,
 )
 
 
@@ -245,6 +256,45 @@ def test_calculate_time_in_zones_none_values_in_stream():
     assert result == expected_zones
 
 
+def test_calculate_time_in_zones_numpy_nan_values():
+    data_stream = np.array([100, np.nan, 150, np.nan])
+    expected_zones = {zone_name: 0 for zone_name in POWER_ZONE_DEFINITIONS}
+    expected_zones["Zone 4: Threshold"] = 1
+    expected_zones["Zone 6: Anaerobic"] = 1
+    result = calculate_time_in_zones(data_stream, 100, POWER_ZONE_DEFINITIONS)
+    assert result == expected_zones
+
+
+def test_calculate_time_in_zones_multi_matches_single_requests():
+    power = [50, 70, 90, 110, 130, 150, 170, None]
+    hr = [70, 80, 90, 100, 110, 120]
+    power_zones, hr_zones = calculate_time_in_zones_multi(
+        [
+            (power, 100, POWER_ZONE_DEFINITIONS),
+            (hr, 100, HR_ZONE_DEFINITIONS),
+        ]
+    )
+    assert power_zones == calculate_time_in_zones(power, 100, POWER_ZONE_DEFINITIONS)
+    assert hr_zones == calculate_time_in_zones(hr, 100, HR_ZONE_DEFINITIONS)
+
+
+def test_calculate_time_in_zones_multi_missing_threshold_or_data():
+    power_zones, hr_zones = calculate_time_in_zones_multi(
+        [
+            ([100, 200], None, POWER_ZONE_DEFINITIONS),
+            (None, 160, HR_ZONE_DEFINITIONS),
+        ]
+    )
+    assert power_zones == {zone_name: 0 for zone_name in POWER_ZONE_DEFINITIONS}
+    assert hr_zones == {zone_name: 0 for zone_name in HR_ZONE_DEFINITIONS}
+
+
+def test_calculate_time_in_zones_above_last_bound_not_counted():
+    zone_definitions = {"Low": 0.5, "High": 1.0}
+    result = calculate_time_in_zones([40, 60, 120], 100, zone_definitions)
+    assert result == {"Low": 1, "High": 1}
+
+
 # --- Test calculate_daily_pmc ---
 def test_calculate_daily_pmc_initial_day():
     # If ctl_yesterday and atl_yesterday are 0, then ctl_today = tss_today / CTL_TC
@@ -323,6 +373,119 @@ def test_calculate_historical_mmp_with_none_values():
     assert result[1]["power"] == 180
 
 
+# --- Test calculate_mean_max ---
+def test_mean_max_durations_short_activity_is_dense():
+    assert mean_max_durations(90).tolist() == list(range(1, 91))
+
+
+def test_mean_max_durations_long_activity_is_log_spaced():
+    durations = mean_max_durations(6 * 3600)
+    assert durations[:DENSE_DURATION_LIMIT].tolist() == list(
+        range(1, DENSE_DURATION_LIMIT + 1)
+    )
+    assert durations[-1] == 6 * 3600
+    assert len(durations) < DENSE_DURATION_LIMIT + 250
+    assert np.all(np.diff(durations) > 0)
+
+
+def test_calculate_mean_max_indices():
+    data_stream = [10] * 30 + [20] * 60 + [15] * 30
+    result = calculate_mean_max(data_stream, [1, 60, 121])
+    assert result["average"][:2] == pytest.approx([20.0, 20.0])
+    assert result["start_index"][:2].tolist() == [30, 30]
+    assert result["end_index"][:2].tolist() == [30, 89]
+    # Longer than the stream: no valid window
+    assert np.isnan(result["average"][2])
+    assert result["start_index"][2] == -1
+    assert result["end_index"][2] == -1
+
+
+def test_calculate_mean_max_skips_windows_with_missing_samples():
+    data_stream = [300, None, 100, 100, 100]
+    result = calculate_mean_max(data_stream, [1, 2, 3, 4])
+    assert result["average"][:3] == pytest.approx([300, 100, 100])
+    assert result["start_index"][1] == 2
+    assert np.isnan(result["average"][3])
+
+
+def test_calculate_mean_max_default_durations_cover_full_length():
+    result = calculate_mean_max(np.arange(700, dtype=float))
+    assert result["duration"][-1] == 700
+    assert result["average"][-1] == pytest.approx(349.5)
+
+
+# --- Test calculate_power_curve ---
+def test_calculate_power_curve_matches_historical_mmp():
+    power_data = [100, 110, 120, 130, 140, 150, 160, 170, 180, 190, 200]
+    durations = np.array([1, 5, 10, 20])
+    curve = calculate_power_curve(power_data, durations)
+    assert curve[:3] == pytest.approx([200, 180, 155])
+    assert np.isnan(curve[3])  # Longer than the activity
+
+
+def test_calculate_power_curve_missing_samples_count_as_zero():
+    curve = calculate_power_curve(np.array([100.0, np.nan, 100.0]), np.array([1, 3]))
+    assert curve == pytest.approx([100, 200 / 3])
+
+
+def test_combine_power_curves_does_not_span_activities():
+    # Two 2-second activities: a 4-second effort across both must not exist
+    first = calculate_power_curve([300, 300])
+    second = calculate_power_curve([200, 400])
+    combined = combine_power_curves([first, second])
+    assert combined[0] == 400
+    assert combined[1] == 300
+    assert np.isnan(combined[3])
+
+
+def test_combine_power_curves_empty():
+    assert np.isnan(combine_power_curves([])).all()
+    assert len(combine_power_curves([])) == len(MMP_CURVE_DURATIONS)
+
+
+# --- Test calculate_pmc_series ---
+def test_calculate_pmc_series_matches_daily_recurrence():
+    daily_tss = [100, 0, 55, 230, 0, 0, 80]
+    ctl, atl = 40.0, 60.0
+    expected = []
+    for tss in daily_tss:
+        day = calculate_daily_pmc(ctl, atl, tss)
+        ctl, atl = day["ctl"], day["atl"]
+        expected.append(day)
+
+    result = calculate_pmc_series(np.array(daily_tss), 40.0, 60.0)
+    assert result["ctl"] == pytest.approx([d["ctl"] for d in expected])
+    assert result["atl"] == pytest.approx([d["atl"] for d in expected])
+    assert result["tsb"] == pytest.approx([d["tsb"] for d in expected])
+
+
+def test_calculate_pmc_series_empty():
+    result = calculate_pmc_series(np.array([]), 10.0, 20.0)
+    assert len(result["ctl"]) == 0
+
+
+# --- Test decay_pmc / project_pmc ---
+def test_decay_pmc_matches_rest_days():
+    series = calculate_pmc_series(np.zeros(12), 50.0, 70.0)
+    ctl, atl = decay_pmc(50.0, 70.0, 12)
+    assert ctl == pytest.approx(series["ctl"][-1])
+    assert atl == pytest.approx(series["atl"][-1])
+
+
+def test_project_pmc_matches_series_per_athlete():
+    planned_load = np.array([[100, 0, 55, 230, 0, 0, 80], [0, 60, 60, 60, 0, 120, 0]])
+    ctl_start, atl_start = np.array([40.0, 0.0]), np.array([60.0, 10.0])
+
+    result = project_pmc(planned_load, ctl_start, atl_start)
+
+    assert result["ctl"].shape == (2, 7)
+    for i in range(2):
+        expected = calculate_pmc_series(planned_load[i], ctl_start[i], atl_start[i])
+        assert result["ctl"][i] == pytest.approx(expected["ctl"])
+        assert result["atl"][i] == pytest.approx(expected["atl"])
+        assert result["tsb"][i] == pytest.approx(expected["tsb"])
+
+
 # --- Test recalculate_pmc_from_date ---
 @patch("services.calculations.crud")
 def test_recalculate_pmc_from_date_no_previous_metrics(mock_crud):
@@ -332,13 +495,12 @@ def test_recalculate_pmc_from_date_no_previous_metrics(mock_crud):
 
     mock_crud.get_latest_daily_metric_before_date.return_value = None
     mock_crud.get_latest_daily_metric.return_value = None  # Simulate no future metrics
-    mock_crud.get_daily_activity_summary.side_effect = [
-        {"total_tss": 10, "avg_if": 0.5},
-        {"total_tss": 20, "avg_if": 0.6},
-        {"total_tss": 0, "avg_if": 0.0},
+    mock_crud.get_daily_activity_loads.return_value = [
+        MagicMock(date=date(2023, 1, 1), total_load=10, avg_if=0.5),
+        MagicMock(date="2023-01-02", total_load=20, avg_if=0.6),  # SQLite returns str
     ]
 
-    # Mock date.today() to control the loop
+    # Mock date.today() to control the range
     with patch("services.calculations.date") as mock_date:
         mock_date.today.return_value = date(2023, 1, 3)
         mock_date.side_effect = lambda *args, **kw: date(
@@ -348,22 +510,30 @@ def test_recalculate_pmc_from_date_no_previous_metrics(mock_crud):
         recalculate_pmc_from_date(mock_db, athlete_id, start_recalc_date)
 
     assert mock_crud.get_latest_daily_metric_before_date.call_count == 1
-    assert mock_crud.get_daily_activity_summary.call_count == 3
-    assert mock_crud.upsert_daily_metric.call_count == 3
+    # The whole range is loaded and written back in one round-trip each
+    assert mock_crud.get_daily_activity_loads.call_count == 1
+    assert mock_crud.bulk_upsert_daily_metrics.call_count == 1
     assert mock_db.commit.call_count == 1
 
     # Verify initial CTL/ATL are 0.0
     # Day 1: TSS=10, CTL=10/42, ATL=10/7
     # Day 2: TSS=20, CTL=prev_ctl + (20 - prev_ctl)/42, ATL=prev_atl + (20 - prev_atl)/7
     # Day 3: TSS=0, CTL=prev_ctl + (0 - prev_ctl)/42, ATL=prev_atl + (0 - prev_atl)/7
-
-    # Check the first upsert call
-    args, kwargs = mock_crud.upsert_daily_metric.call_args_list[0]
+    args, kwargs = mock_crud.bulk_upsert_daily_metrics.call_args
     assert kwargs["athlete_id"] == athlete_id
-    assert kwargs["date"] == date(2023, 1, 1)
-    assert pytest.approx(kwargs["ctl"]) == (10 / CTL_TC)
-    assert pytest.approx(kwargs["atl"]) == (10 / ATL_TC)
-    assert kwargs["tss"] == 10
+    metrics = kwargs["metrics"]
+    assert [m["date"] for m in metrics] == [
+        date(2023, 1, 1),
+        date(2023, 1, 2),
+        date(2023, 1, 3),
+    ]
+    assert [m["tss"] for m in metrics] == [10, 20, 0]
+    assert [m["if_avg"] for m in metrics] == [0.5, 0.6, 0.0]
+    assert pytest.approx(metrics[0]["ctl"]) == (10 / CTL_TC)
+    assert pytest.approx(metrics[0]["atl"]) == (10 / ATL_TC)
+    day2 = calculate_daily_pmc(metrics[0]["ctl"], metrics[0]["atl"], 20)
+    assert pytest.approx(metrics[1]["ctl"]) == day2["ctl"]
+    assert pytest.approx(metrics[1]["atl"]) == day2["atl"]
 
 
 @patch("services.calculations.crud")
@@ -375,9 +545,9 @@ def test_recalculate_pmc_from_date_with_previous_metrics(mock_crud):
     mock_metric_before = MagicMock(ctl=40.0, atl=60.0)
     mock_crud.get_latest_daily_metric_before_date.return_value = mock_metric_before
     mock_crud.get_latest_daily_metric.return_value = None
-    mock_crud.get_daily_activity_summary.side_effect = [
-        {"total_tss": 50, "avg_if": 0.7},
-        {"total_tss": 10, "avg_if": 0.4},
+    mock_crud.get_daily_activity_loads.return_value = [
+        MagicMock(date=date(2023, 1, 5), total_load=50, avg_if=0.7),
+        MagicMock(date=date(2023, 1, 6), total_load=10, avg_if=0.4),
     ]
 
     with patch("services.calculations.date") as mock_date:
@@ -387,20 +557,22 @@ def test_recalculate_pmc_from_date_with_previous_metrics(mock_crud):
         recalculate_pmc_from_date(mock_db, athlete_id, start_recalc_date)
 
     assert mock_crud.get_latest_daily_metric_before_date.call_count == 1
-    assert mock_crud.get_daily_activity_summary.call_count == 2
-    assert mock_crud.upsert_daily_metric.call_count == 2
+    assert mock_crud.get_daily_activity_loads.call_count == 1
+    assert mock_crud.bulk_upsert_daily_metrics.call_count == 1
     assert mock_db.commit.call_count == 1
 
-    # Check the first upsert call
-    args, kwargs = mock_crud.upsert_daily_metric.call_args_list[0]
+    # Check the first upserted day
+    args, kwargs = mock_crud.bulk_upsert_daily_metrics.call_args
     assert kwargs["athlete_id"] == athlete_id
-    assert kwargs["date"] == date(2023, 1, 5)
+    first_day = kwargs["metrics"][0]
+    assert first_day["date"] == date(2023, 1, 5)
     # Expected CTL/ATL for Day 1 (Jan 5)
     expected_ctl_day1 = mock_metric_before.ctl + (50 - mock_metric_before.ctl) / CTL_TC
     expected_atl_day1 = mock_metric_before.atl + (50 - mock_metric_before.atl) / ATL_TC
-    assert pytest.approx(kwargs["ctl"]) == expected_ctl_day1
-    assert pytest.approx(kwargs["atl"]) == expected_atl_day1
-    assert kwargs["tss"] == 50
+    assert pytest.approx(first_day["ctl"]) == expected_ctl_day1
+    assert pytest.approx(first_day["atl"]) == expected_atl_day1
+    assert first_day["tss"] == 50
+    assert len(kwargs["metrics"]) == 2
 
 
 # --- Test find_best_n_minute_average ---
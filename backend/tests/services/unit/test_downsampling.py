@@ -0,0 +1,45 @@
+import numpy as np
+
+from services.downsampling import downsample_indices, lttb_indices, min_max_indices
+
+
+def test_downsample_indices_keeps_endpoints():
+    indices = downsample_indices(101, 11)
+    assert indices.tolist() == list(range(0, 101, 10))
+    assert downsample_indices(5, 10).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_lttb_preserves_spikes_and_endpoints():
+    power = np.full(3600, 200.0)
+    power[1234] = 1100.0  # Sprint
+    power[2000:2100] = np.nan  # Dropout
+
+    indices = lttb_indices(power, 100)
+
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 3599
+    assert np.all(np.diff(indices) > 0)
+    assert 1234 in indices
+
+
+def test_lttb_shares_indices_across_channels():
+    power = np.full(1000, 150.0)
+    power[100] = 900.0
+    heart_rate = np.full(1000, 120.0)
+    heart_rate[700] = 190.0
+
+    indices = lttb_indices(np.vstack([power, heart_rate]), 50)
+
+    assert 100 in indices and 700 in indices
+
+
+def test_min_max_indices_keeps_bucket_extremes():
+    values = np.sin(np.linspace(0, 20 * np.pi, 10_000))
+    values[4321] = 5.0
+
+    indices = min_max_indices(values, 200)
+
+    assert len(indices) <= 200
+    assert 4321 in indices
+    assert indices[0] == 0 and indices[-1] == 9999
+    assert values[indices].min() == values.min()
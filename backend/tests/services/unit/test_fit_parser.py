@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from services import fit_parser
+
+START_RAW = 1_000_000_000
+START_TIME = datetime(2021, 9, 8, 1, 46, 40)
+
+
+def make_message(name, **fields):
+    field_data = [
+        SimpleNamespace(name=field, value=value, raw_value=raw)
+        for field, (value, raw) in fields.items()
+    ]
+    return SimpleNamespace(
+        name=name,
+        fields=field_data,
+        get=lambda field: next((f for f in field_data if f.name == field), None),
+    )
+
+
+def record(offset, **values):
+    fields = {"timestamp": (START_TIME, START_RAW + offset)}
+    fields.update({field: (value, value) for field, value in values.items()})
+    return make_message("record", **fields)
+
+
+@pytest.fixture
+def fit_messages():
+    return [
+        make_message(
+            "device_info",
+            manufacturer=("garmin", 1),
+            product_name=("Edge530", "Edge530"),
+        ),
+        record(0, power=200, heart_rate=140, position_lat=2**30),
+        record(1, power=None, heart_rate=141),
+        make_message("record", power=(999, 999)),  # No timestamp, skipped
+        record(2, power=250, speed=8.5),
+        make_message(
+            "lap",
+            message_index=(0, 0),
+            total_timer_time=(3.4, 3400),
+            avg_power=(225, 225),
+        ),
+        make_message(
+            "session",
+            start_time=(START_TIME, START_RAW),
+            total_timer_time=(3.0, 3000),
+            sport=("cycling", 2),
+        ),
+    ]
+
+
+def test_decode_fit_file_single_pass(fit_messages):
+    with patch.object(fit_parser.fitparse, "FitFile") as mock_fit_file:
+        mock_fit_file.return_value.get_messages.return_value = iter(fit_messages)
+        decoded = fit_parser.decode_fit_file(b"\x00" * 64)
+
+    mock_fit_file.return_value.get_messages.assert_called_once_with()
+    assert decoded["timestamps"].tolist() == [START_RAW, START_RAW + 1, START_RAW + 2]
+
+    channels = decoded["channels"]
+    np.testing.assert_array_equal(channels["power"], [200, np.nan, 250])
+    np.testing.assert_array_equal(channels["heart_rate"], [140, 141, np.nan])
+    np.testing.assert_array_equal(channels["speed"], [np.nan, np.nan, 8.5])
+    assert channels["latitude"][0] == pytest.approx(90.0)
+    assert np.isnan(channels["longitude"]).all()
+
+    assert decoded["laps"] == [
+        {
+            "lap_number": 0,
+            "duration": 3,
+            "distance": None,
+            "average_power": 225,
+            "total_elevation_gain": None,
+            "average_speed": None,
+            "average_cadence": None,
+            "average_heart_rate": None,
+        }
+    ]
+    assert decoded["session"]["sport"] == "cycling"
+    assert decoded["session_start_raw"] == START_RAW
+    assert decoded["device_info"]["product_name"] == "Edge530"
+
+
+def test_decode_fit_file_grows_buffers():
+    records = [record(i, power=100 + i) for i in range(50)]
+    with patch.object(fit_parser.fitparse, "FitFile") as mock_fit_file:
+        mock_fit_file.return_value.get_messages.return_value = iter(records)
+        decoded = fit_parser.decode_fit_file(b"\x00")  # Capacity estimate of 1
+
+    assert decoded["channels"]["power"].tolist() == [100 + i for i in range(50)]
+    assert decoded["session"] is None
+
+
+def test_iter_decoded_fit_files_yields_errors_in_order(tmp_path):
+    file_paths = []
+    for i in range(5):
+        file_path = tmp_path / f"ride_{i}.fit"
+        file_path.write_bytes(b"not a fit file")
+        file_paths.append(str(file_path))
+
+    results = list(fit_parser.iter_decoded_fit_files(file_paths, max_workers=2))
+
+    assert [file_path for file_path, _ in results] == file_paths
+    assert all(isinstance(decoded, Exception) for _, decoded in results)
@@ -0,0 +1,35 @@
+import json
+
+import numpy as np
+
+from services.stream_format import ALIGNMENT, decode_streams, encode_streams
+
+
+def test_encode_streams_round_trips_aligned_typed_arrays():
+    channels = {
+        "time": np.arange(5, dtype=np.int32),
+        "power": np.array([200, np.nan, 250, 260, 270], dtype=np.float32),
+        "heart_rate": np.array([140, 141, 142], dtype=np.float32),
+    }
+
+    payload = encode_streams({"activity_id": 42, "sample_count": 5}, channels)
+    metadata, decoded = decode_streams(payload)
+
+    assert metadata == {"activity_id": 42, "sample_count": 5}
+    assert list(decoded) == ["time", "power", "heart_rate"]
+    for name, values in channels.items():
+        assert decoded[name].dtype == values.dtype
+        np.testing.assert_array_equal(decoded[name], values)
+
+    # Every channel starts on an aligned offset so it can be viewed in place
+    header_length = int.from_bytes(payload[:4], "little")
+    header = payload[4 : 4 + header_length].decode()
+    for entry in json.loads(header)["channels"]:
+        assert entry["offset"] % ALIGNMENT == 0
+    assert len(payload) % ALIGNMENT == 0
+
+
+def test_encode_streams_handles_empty_channels():
+    payload = encode_streams({}, {"time": np.empty(0, dtype=np.int32)})
+    _, decoded = decode_streams(payload)
+    assert decoded["time"].tolist() == []
@@ -0,0 +1,60 @@
+from datetime import date, datetime
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+import models
+from services import thresholds
+
+FTP, WEIGHT = models.MetricType.FTP, models.MetricType.WEIGHT
+
+METRICS = [
+    (FTP, date(2024, 1, 1), 250.0),
+    (WEIGHT, date(2024, 1, 1), 70.0),
+    (FTP, date(2024, 3, 1), 265.0),
+    (FTP, date(2024, 3, 1), 270.0),  # Same day: the later entry wins
+    (FTP, date(2024, 6, 1), 280.0),
+]
+
+
+@pytest.fixture
+def get_metric_timeline():
+    thresholds.invalidate_threshold_timeline()
+    with patch.object(
+        thresholds.crud, "get_metric_timeline", return_value=METRICS
+    ) as mock:
+        yield mock
+    thresholds.invalidate_threshold_timeline()
+
+
+def test_get_threshold_bisects_the_cached_timeline(get_metric_timeline):
+    assert thresholds.get_threshold(None, 1, FTP, date(2023, 12, 31)) is None
+    assert thresholds.get_threshold(None, 1, FTP, date(2024, 1, 1)) == 250.0
+    assert thresholds.get_threshold(None, 1, FTP, datetime(2024, 5, 31, 23)) == 270.0
+    assert thresholds.get_threshold(None, 1, WEIGHT, date(2030, 1, 1)) == 70.0
+    assert thresholds.get_threshold(None, 1, models.MetricType.THR) is None
+
+    get_metric_timeline.assert_called_once()
+
+
+def test_get_thresholds_resolves_many_dates(get_metric_timeline):
+    values = thresholds.get_thresholds(
+        None,
+        1,
+        FTP,
+        [date(2023, 1, 1), date(2024, 2, 1), datetime(2024, 3, 1, 9), date(2025, 1, 1)],
+    )
+
+    np.testing.assert_array_equal(values, [np.nan, 250.0, 270.0, 280.0])
+    assert len(thresholds.get_thresholds(None, 1, models.MetricType.THR, [])) == 0
+
+
+def test_invalidate_reloads_the_timeline(get_metric_timeline):
+    thresholds.get_threshold(None, 1, FTP)
+    thresholds.get_threshold(None, 2, FTP)
+    thresholds.invalidate_threshold_timeline(1)
+    thresholds.get_threshold(None, 1, FTP)
+    thresholds.get_threshold(None, 2, FTP)
+
+    assert [call.args[1] for call in get_metric_timeline.call_args_list] == [1, 2, 1]
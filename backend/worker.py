@@ -1,14 +1,45 @@
 #!/usr/bin/env python3
 import os
 import sys
-from rq import Worker, Connection
-from redis import Redis
+from rq import Worker, SimpleWorker, Connection
 
 # Add the current directory to the path so we can import modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from job_queue import redis_conn  # noqa: E402
+import services  # noqa: E402
+
+# RQ_SIMPLE_WORKER=1 runs jobs in the worker process instead of a fork per
+# job, so process-wide state such as the pooled Strava HTTP session (and its
+# keep-alive connections) is reused across jobs. Caches that must not outlive a
+# job are reset in FreshThresholdsMixin.
+SIMPLE_WORKER = os.getenv("RQ_SIMPLE_WORKER", "0") == "1"
+
+
+class FreshThresholdsMixin:
+    """
+    Drops the cached FTP/LTHR timelines before every job. A non-forking
+    worker keeps module state across jobs, and thresholds changed through the
+    API only invalidate the API process's cache, so jobs would otherwise score
+    with values up to THRESHOLD_CACHE_TTL_SECONDS old.
+    """
+
+    def perform_job(self, job, queue):
+        services.thresholds.invalidate_threshold_timeline()
+        return super().perform_job(job, queue)
+
+
+class BettaWorker(FreshThresholdsMixin, Worker):
+    pass
+
+
+class BettaSimpleWorker(FreshThresholdsMixin, SimpleWorker):
+    pass
+
+
 if __name__ == "__main__":
-    redis_conn = Redis(host="redis", port=6379, db=0)
     with Connection(redis_conn):
-        worker = Worker(["default"])
-        worker.work()
+        worker_class = BettaSimpleWorker if SIMPLE_WORKER else BettaWorker
+        worker = worker_class(["default"])
+        # The scheduler runs jobs enqueued with enqueue_in (rate limit retries)
+        worker.work(with_scheduler=True)
@@ -2,7 +2,7 @@
 
 import { useState, useEffect } from 'react';
 import { useParams } from 'next/navigation';
-import { Activity } from '@/lib/definitions';
+import { Activity, BestEffort } from '@/lib/definitions';
 import { config } from '@/lib/config';
 import { BestEffortsTable } from '@/components';
 
@@ -11,7 +11,7 @@ const API_URL = config.apiUrl;
 export default function BestEffortsPage() {
   const params = useParams();
   const activityId = params.id as string;
-  const [activity, setActivity] = useState<Activity | null>(null);
+  const [efforts, setEfforts] = useState<BestEffort[] | null>(null);
   const [athleteWeight, setAthleteWeight] = useState<number | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
@@ -21,10 +21,16 @@ export default function BestEffortsPage() {
     const fetchData = async () => {
       setLoading(true);
       try {
-        const activityRes = await fetch(`${API_URL}/activity/${activityId}`);
-        if (!activityRes.ok) throw new Error('Failed to fetch activity data');
+        // Best efforts are computed on the server from the full stream
+        const [activityRes, effortsRes] = await Promise.all([
+          fetch(`${API_URL}/activity/${activityId}`),
+          fetch(`${API_URL}/activity/${activityId}/best-efforts`),
+        ]);
+        if (!activityRes.ok || !effortsRes.ok) {
+          throw new Error('Failed to fetch best efforts');
+        }
         const activityData: Activity = await activityRes.json();
-        setActivity(activityData);
+        setEfforts(await effortsRes.json());
 
         const weightResponse = await fetch(
           `${API_URL}/athlete/${activityData.athlete_id}/weight-at-date?date=${activityData.start_time}`
@@ -45,8 +51,8 @@ export default function BestEffortsPage() {
     return <div className="p-8 text-center">Loading Best Efforts...</div>;
   if (error)
     return <div className="p-8 text-center text-red-500">Error: {error}</div>;
-  if (!activity)
+  if (!efforts)
     return <div className="p-8 text-center">Activity data not found.</div>;
 
-  return <BestEffortsTable activity={activity} weight={athleteWeight} />;
+  return <BestEffortsTable efforts={efforts} weight={athleteWeight} />;
 }
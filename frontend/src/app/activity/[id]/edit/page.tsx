@@ -5,7 +5,7 @@ import { useRouter, useParams } from 'next/navigation';
 import Link from 'next/link';
 import {
   Activity,
-  Athlete,
+  AthleteProfile,
   Equipment,
   ActivityUpdatePayload,
 } from '@/lib/definitions';
@@ -62,7 +62,7 @@ export default function EditActivityPage() {
   const activityId = params.id as string;
 
   const [activity, setActivity] = useState<Activity | null>(null);
-  const [athlete, setAthlete] = useState<Athlete | null>(null);
+  const [athlete, setAthlete] = useState<AthleteProfile | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [isSaving, setIsSaving] = useState(false);
@@ -105,7 +105,7 @@ export default function EditActivityPage() {
         if (!athleteRes.ok) {
           throw new Error('Failed to fetch athlete data for equipment.');
         }
-        const athleteData: Athlete = await athleteRes.json();
+        const athleteData: AthleteProfile = await athleteRes.json();
         setAthlete(athleteData);
 
         // Initialize form state
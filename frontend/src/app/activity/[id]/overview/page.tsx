@@ -2,8 +2,8 @@
 
 import { useState, useEffect } from 'react';
 import { useParams } from 'next/navigation';
-import { Activity } from '@/lib/definitions';
-import { config } from '@/lib/config';
+import { ActivityWithRecords } from '@/lib/definitions';
+import { fetchActivityWithRecords } from '@/lib/streams';
 import { LatLngExpression } from 'leaflet';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui';
 import dynamic from 'next/dynamic';
@@ -13,7 +13,8 @@ import {
   ActivityEquipment,
 } from '@/components/activity';
 
-const API_URL = config.apiUrl;
+// The map and chart need far fewer points than a long ride has samples
+const CHART_MAX_POINTS = 2000;
 
 const ActivityMap = dynamic(
   () => import('@/components/activity/activity-map'),
@@ -42,7 +43,7 @@ const ActivityChart = dynamic(
 export default function OverviewPage() {
   const params = useParams();
   const activityId = params.id as string;
-  const [activity, setActivity] = useState<Activity | null>(null);
+  const [activity, setActivity] = useState<ActivityWithRecords | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
@@ -51,9 +52,9 @@ export default function OverviewPage() {
     const fetchData = async () => {
       setLoading(true);
       try {
-        const res = await fetch(`${API_URL}/activity/${activityId}`);
-        if (!res.ok) throw new Error('Failed to fetch activity data');
-        setActivity(await res.json());
+        setActivity(
+          await fetchActivityWithRecords(activityId, CHART_MAX_POINTS)
+        );
       } catch (err) {
         setError(err instanceof Error ? err.message : 'Unknown error');
       } finally {
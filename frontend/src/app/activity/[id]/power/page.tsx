@@ -2,7 +2,8 @@
 
 import { useState, useEffect } from 'react';
 import { useParams } from 'next/navigation';
-import { Activity } from '@/lib/definitions';
+import { ActivityWithRecords } from '@/lib/definitions';
+import { fetchActivityWithRecords } from '@/lib/streams';
 import { config } from '@/lib/config';
 import { PowerAnalysis } from '@/components/charts';
 
@@ -11,7 +12,7 @@ const API_URL = config.apiUrl;
 export default function PowerPage() {
   const params = useParams();
   const activityId = params.id as string;
-  const [activity, setActivity] = useState<Activity | null>(null);
+  const [activity, setActivity] = useState<ActivityWithRecords | null>(null);
   const [currentFtp, setCurrentFtp] = useState<number | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
@@ -21,9 +22,7 @@ export default function PowerPage() {
     const fetchData = async () => {
       setLoading(true);
       try {
-        const activityRes = await fetch(`${API_URL}/activity/${activityId}`);
-        if (!activityRes.ok) throw new Error('Failed to fetch activity data');
-        const activityData: Activity = await activityRes.json();
+        const activityData = await fetchActivityWithRecords(activityId);
         setActivity(activityData);
 
         const ftpResponse = await fetch(
@@ -2,7 +2,8 @@
 
 import { useState, useEffect } from 'react';
 import { useParams } from 'next/navigation';
-import { Activity, ZoneAnalysisData } from '@/lib/definitions';
+import { ActivityWithRecords, ZoneAnalysisData } from '@/lib/definitions';
+import { fetchActivityWithRecords } from '@/lib/streams';
 import { config } from '@/lib/config';
 import { ZoneCharts } from '@/components/charts';
 
@@ -11,7 +12,7 @@ const API_URL = config.apiUrl;
 export default function ZonesPage() {
   const params = useParams();
   const activityId = params.id as string;
-  const [activity, setActivity] = useState<Activity | null>(null);
+  const [activity, setActivity] = useState<ActivityWithRecords | null>(null);
   const [zoneData, setZoneData] = useState<ZoneAnalysisData | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
@@ -21,9 +22,7 @@ export default function ZonesPage() {
     const fetchData = async () => {
       setLoading(true);
       try {
-        const activityRes = await fetch(`${API_URL}/activity/${activityId}`);
-        if (!activityRes.ok) throw new Error('Failed to fetch activity data');
-        setActivity(await activityRes.json());
+        setActivity(await fetchActivityWithRecords(activityId));
 
         const zoneResponse = await fetch(
           `${API_URL}/activity/${activityId}/zone-analysis`
@@ -3,7 +3,7 @@
 import { useState, useEffect, useCallback } from 'react';
 import { useParams } from 'next/navigation';
 import {
-  Activity,
+  ActivityPage,
   ActivitySummary,
   WeeklyWorkload,
   VisualActivityLogResponse,
@@ -19,7 +19,7 @@ export default function ActivityLogPage() {
   const params = useParams();
   const athleteId = params.id as string; // Note: In Next.js 15, params is a Promise, but useParams returns resolved params
 
-  const [activities, setActivities] = useState<Activity[]>([]);
+  const [activities, setActivities] = useState<ActivitySummary[]>([]);
 
   // State for visual activity log
   const [visualActivityLog, setVisualActivityLog] =
@@ -71,7 +71,7 @@ export default function ActivityLogPage() {
     if (!athleteId) return;
 
     const query = new URLSearchParams({
-      limit: '1000', // Fetch a large number for now, pagination can be added later
+      limit: '1000', // Only used to collect the filter options
     });
     if (dateRange.start) query.append('start_date', dateRange.start);
     if (dateRange.end) query.append('end_date', dateRange.end);
@@ -89,7 +89,8 @@ export default function ActivityLogPage() {
           throw new Error('Failed to load activities. Check your connection.');
         }
       }
-      const activitiesData = await response.json();
+      const { activities: activitiesData }: ActivityPage =
+        await response.json();
       // Filter out activities with invalid IDs
       const validActivities = activitiesData.filter(
         (activity: ActivitySummary) =>
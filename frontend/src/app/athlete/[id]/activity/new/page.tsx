@@ -3,7 +3,7 @@
 import { useState, FormEvent, ChangeEvent, useEffect } from 'react';
 import { useRouter, useParams } from 'next/navigation';
 import Link from 'next/link';
-import { Activity, Athlete, Equipment } from '@/lib/definitions';
+import { Activity, AthleteProfile, Equipment, JobStatus } from '@/lib/definitions';
 import { config } from '@/lib/config';
 import { RpeSelector, GearSelect } from '@/components';
 import {
@@ -30,6 +30,8 @@ const ACTIVITY_TYPES = [
   'Threshold',
   'Active Recovery',
 ];
+const JOB_POLL_INTERVAL_MS = 1000;
+
 const SPORT_OPTIONS = ['cycling', 'run', 'gym', 'yoga', 'meditation', 'other'];
 const SUB_SPORT_OPTIONS: { [key: string]: string[] } = {
   cycling: ['road', 'gravel', 'indoor', 'track', 'mtb'],
@@ -43,7 +45,7 @@ export default function NewActivityPage() {
   const athleteId = params.id as string;
 
   const [activeTab, setActiveTab] = useState('upload'); // 'upload' or 'manual'
-  const [athlete, setAthlete] = useState<Athlete | null>(null);
+  const [athlete, setAthlete] = useState<AthleteProfile | null>(null);
   const [loadingAthlete, setLoadingAthlete] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
@@ -90,7 +92,7 @@ export default function NewActivityPage() {
         if (!response.ok) {
           throw new Error('Failed to fetch athlete data.');
         }
-        const data: Athlete = await response.json();
+        const data: AthleteProfile = await response.json();
         setAthlete(data);
       } catch (err) {
         setError(
@@ -140,8 +142,21 @@ export default function NewActivityPage() {
         throw new Error(errorData.detail || 'Failed to upload activity.');
       }
 
-      const newActivity: Activity = await response.json();
-      router.push(`/activity/${newActivity.activity_id}/overview`);
+      // The file is processed in the background; poll until the job is done.
+      let job: JobStatus = await response.json();
+      while (job.status !== 'finished') {
+        if (['failed', 'stopped', 'canceled'].includes(job.status)) {
+          throw new Error(job.error || 'Failed to process activity.');
+        }
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        const jobResponse = await fetch(`${API_URL}/jobs/${job.job_id}`);
+        if (!jobResponse.ok) {
+          throw new Error('Failed to check upload status.');
+        }
+        job = await jobResponse.json();
+      }
+
+      router.push(`/activity/${job.result?.activity_id}/overview`);
     } catch (err) {
       setError(
         err instanceof Error ? err.message : 'An unknown error occurred.'
@@ -3,7 +3,7 @@
 import Link from 'next/link';
 import { useState, useEffect } from 'react';
 import { useParams } from 'next/navigation';
-import { Athlete, Equipment } from '@/lib/definitions';
+import { AthleteProfile, Equipment } from '@/lib/definitions';
 import { config } from '@/lib/config';
 
 const API_URL = config.apiUrl;
@@ -26,7 +26,7 @@ const getEquipmentIcon = (type: string) => {
 export default function EquipmentPage() {
   const params = useParams();
   const athleteId = params.id as string;
-  const [athlete, setAthlete] = useState<Athlete | null>(null);
+  const [athlete, setAthlete] = useState<AthleteProfile | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
@@ -37,7 +37,7 @@ export default function EquipmentPage() {
       try {
         const response = await fetch(`${API_URL}/athlete/${athleteId}`);
         if (!response.ok) throw new Error('Failed to fetch athlete data.');
-        const data: Athlete = await response.json();
+        const data: AthleteProfile = await response.json();
         setAthlete(data);
       } catch (err) {
         setError(
@@ -2,18 +2,27 @@
 
 import { useState, useEffect } from 'react';
 import { useParams } from 'next/navigation';
-import { Athlete, PotentialPerformanceMarker } from '@/lib/definitions';
+import {
+  ActivityPage,
+  ActivitySummary,
+  AthleteProfile,
+  PotentialPerformanceMarker,
+} from '@/lib/definitions';
 import { config } from '@/lib/config';
 import Link from 'next/link';
 import { Button, DataTable, TableCard } from '@/components/ui';
 
 // The backend API URL from environment configuration
 const API_URL = config.apiUrl;
+const RECENT_ACTIVITIES_LIMIT = 10;
 
 export default function ProfilePage() {
   const params = useParams();
   const athleteId = params.id as string;
-  const [athlete, setAthlete] = useState<Athlete | null>(null);
+  const [athlete, setAthlete] = useState<AthleteProfile | null>(null);
+  const [recentActivities, setRecentActivities] = useState<ActivitySummary[]>(
+    []
+  );
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [potentialMarkers, setPotentialMarkers] = useState<
@@ -26,8 +35,16 @@ export default function ProfilePage() {
     try {
       const response = await fetch(`${API_URL}/athlete/${athleteId}`);
       if (response.ok) {
-        const data: Athlete = await response.json();
+        const data: AthleteProfile = await response.json();
         setAthlete(data);
+        // Activities are not embedded in the profile; fetch the latest page
+        const activitiesRes = await fetch(
+          `${API_URL}${data.links.activities}?limit=${RECENT_ACTIVITIES_LIMIT}`
+        );
+        if (activitiesRes.ok) {
+          const page: ActivityPage = await activitiesRes.json();
+          setRecentActivities(page.activities);
+        }
       } else {
         const errorData = await response.json();
         throw new Error(errorData.detail || 'Failed to fetch athlete data.');
@@ -72,10 +89,6 @@ export default function ProfilePage() {
         new Date(b.date_established).getTime() -
         new Date(a.date_established).getTime()
     ) || [];
-  const sortedActivities = (athlete.activities || []).sort(
-    (a, b) =>
-      new Date(b.start_time).getTime() - new Date(a.start_time).getTime()
-  );
 
   return (
     <div className="p-4 sm:p-6 lg:p-8">
@@ -197,7 +210,7 @@ export default function ProfilePage() {
 
           {/* Activity Log Card */}
           <TableCard
-            title="Recent Activities"
+            title={`Recent Activities (${athlete.counts.activities} total)`}
             actions={
               <>
                 <Button variant="link" asChild>
@@ -236,7 +249,7 @@ export default function ProfilePage() {
                   ),
                 },
               ]}
-              data={sortedActivities}
+              data={recentActivities}
               keyExtractor={(activity) => activity.activity_id ?? 0}
               emptyMessage="No activities logged yet."
             />
@@ -1,6 +1,6 @@
 'use client';
 
-import { Activity, ActivityLap } from '@/lib/definitions';
+import { ActivityLap, ActivityWithRecords } from '@/lib/definitions';
 import { useMemo, useState } from 'react';
 import {
   LineChart,
@@ -24,7 +24,7 @@ import {
 } from '@/components/ui';
 
 interface ActivityChartProps {
-  activity: Activity;
+  activity: ActivityWithRecords;
 }
 
 // Define colors for each data series
@@ -116,6 +116,17 @@ export default function ActivityChart({ activity }: ActivityChartProps) {
 
     const startDate = new Date(start_time);
 
+    // Records may be downsampled, so a pause is a gap well beyond the
+    // average spacing between records (at least 10 seconds).
+    const totalSeconds =
+      (new Date(records[records.length - 1].timestamp).getTime() -
+        new Date(records[0].timestamp).getTime()) /
+      1000;
+    const pauseThreshold = Math.max(
+      10,
+      (3 * totalSeconds) / Math.max(records.length - 1, 1)
+    );
+
     let cumulativeDistance = 0;
 
     return records.map((record, index) => {
@@ -129,7 +140,7 @@ export default function ActivityChart({ activity }: ActivityChartProps) {
         const timeDelta =
           (recordDate.getTime() - prevRecordDate.getTime()) / 1000;
         // Ensure timeDelta is reasonable (e.g., not a pause)
-        if (timeDelta > 0 && timeDelta < 10) {
+        if (timeDelta > 0 && timeDelta < pauseThreshold) {
           cumulativeDistance += record.speed * timeDelta;
         }
       }
@@ -1,30 +1,41 @@
 'use client';
 
 import { useMemo } from 'react';
-import { Activity } from '@/lib/definitions';
-import { calculateBestEfforts } from '@/lib/analysis';
+import { BestEffort } from '@/lib/definitions';
 import { DataTable, TableCard, type Column } from '@/components/ui';
 
-interface BestEffort {
+interface BestEffortRow {
   interval: number;
   power: number;
-  wattsPerKg?: number;
-  avgHr: number;
-  elevationGain: number;
+  wattsPerKg: number | null;
+  avgHr: number | null;
+  elevationGain: number | null;
 }
 
 interface BestEffortsTableProps {
-  activity: Activity;
+  efforts: BestEffort[];
   weight: number | null;
 }
 
 export default function BestEffortsTable({
-  activity,
+  efforts,
   weight,
 }: BestEffortsTableProps) {
-  const bestEfforts = useMemo(
-    () => calculateBestEfforts(activity.records, weight),
-    [activity.records, weight]
+  const rows = useMemo<BestEffortRow[]>(
+    () =>
+      efforts.map((effort) => ({
+        interval: effort.duration,
+        power: effort.power,
+        wattsPerKg: weight
+          ? Math.round((effort.power / weight) * 100) / 100
+          : null,
+        avgHr: effort.average_heart_rate,
+        elevationGain:
+          effort.elevation_gain != null
+            ? Math.round(effort.elevation_gain)
+            : null,
+      })),
+    [efforts, weight]
   );
 
   const formatInterval = (seconds: number) => {
@@ -32,7 +43,7 @@ export default function BestEffortsTable({
     return `${seconds / 60} min`;
   };
 
-  const columns: Column<BestEffort>[] = [
+  const columns: Column<BestEffortRow>[] = [
     {
       key: 'interval',
       header: 'Time',
@@ -53,12 +64,12 @@ export default function BestEffortsTable({
     {
       key: 'avgHr',
       header: 'Heart Rate',
-      render: (value) => `${value} bpm`,
+      render: (value) => (value != null ? `${value} bpm` : 'N/A'),
     },
     {
       key: 'elevationGain',
       header: 'Elev Gain',
-      render: (value) => `${value} m`,
+      render: (value) => (value != null ? `${value} m` : 'N/A'),
     },
   ];
 
@@ -66,7 +77,7 @@ export default function BestEffortsTable({
     <TableCard title="Best Efforts" contentClassName="p-0">
       <DataTable
         columns={columns}
-        data={bestEfforts as BestEffort[]}
+        data={rows}
         keyExtractor={(row) => row.interval}
         emptyMessage="Not enough power data to calculate best efforts."
       />
@@ -1,7 +1,7 @@
 'use client';
 
 import React, { useMemo } from 'react';
-import { Activity, RechartsTickProps } from '@/lib/definitions';
+import { ActivityWithRecords, RechartsTickProps } from '@/lib/definitions';
 import { calculatePowerDistribution, calculateMMP } from '@/lib/analysis';
 import {
   BarChart,
@@ -62,7 +62,7 @@ const CustomizedMMPTick: React.FC<RechartsTickProps> = (props) => {
 };
 
 interface PowerAnalysisProps {
-  activity: Activity;
+  activity: ActivityWithRecords;
   currentFtp: number | null;
 }
 
@@ -3,7 +3,7 @@
 import React, { useMemo } from 'react';
 import {
   ZoneAnalysisData,
-  Activity,
+  ActivityWithRecords,
   RechartsTooltipProps,
   RechartsTickProps,
   RechartsBarLabelProps,
@@ -294,7 +294,7 @@ const ZoneChart = ({
 
 interface ZoneChartsProps {
   zones: ZoneAnalysisData | null;
-  activity: Activity;
+  activity: ActivityWithRecords;
 }
 
 export default function ZoneCharts({ zones, activity }: ZoneChartsProps) {
@@ -15,10 +15,15 @@ export type Athlete = {
   date_of_birth?: string;
   profile_picture_url?: string;
   created_at: string;
+  is_strava_connected: boolean;
+};
+
+// GET /athlete/{id}: activities are counted and linked, not embedded.
+export type AthleteProfile = Athlete & {
   metrics: AthleteMetric[];
-  activities: ActivitySummary[];
   equipment: Equipment[];
-  is_strava_connected: boolean;
+  counts: { activities: number; metrics: number; equipment: number };
+  links: Record<string, string>;
 };
 
 export type Equipment = {
@@ -93,8 +98,6 @@ export type ActivitySummary = {
 };
 
 export type ActivityRecord = {
-  record_id: number;
-  activity_id: number;
   timestamp: string;
   power?: number;
   heart_rate?: number;
@@ -106,7 +109,6 @@ export type ActivityRecord = {
 };
 
 export type Activity = ActivitySummary & {
-  records: ActivityRecord[];
   laps: ActivityLap[];
   device?: Equipment;
   bike?: Equipment;
@@ -114,6 +116,41 @@ export type Activity = ActivitySummary & {
   trainer?: Equipment;
 };
 
+export type StreamChannel =
+  | 'power'
+  | 'heart_rate'
+  | 'cadence'
+  | 'speed'
+  | 'latitude'
+  | 'longitude'
+  | 'altitude';
+
+// Column-wise samples from /activity/{id}/streams; time is seconds from start.
+// Decoded from the binary format the channels are typed arrays with NaN gaps.
+export type ActivityStreams = {
+  activity_id: number;
+  start_time: string;
+  sample_count: number;
+  channels: { time: ArrayLike<number> } & Partial<
+    Record<StreamChannel, ArrayLike<number | null>>
+  >;
+};
+
+export type ActivityWithRecords = Activity & {
+  records: ActivityRecord[];
+};
+
+// Row of /activity/{id}/best-efforts: the best average power over a duration
+// (seconds) and the samples it spans.
+export type BestEffort = {
+  duration: number;
+  power: number;
+  start_index: number;
+  end_index: number;
+  average_heart_rate: number | null;
+  elevation_gain: number | null;
+};
+
 export type ZoneAnalysisData = {
   power_zones: Record<string, number> | null;
   hr_zones: Record<string, number> | null;
@@ -132,6 +169,16 @@ export type DailyPerformanceMetric = {
   if_avg: number | null;
 };
 
+// Columnar /pmc response (layout=columns): values[i] is for dates[i]
+export type PmcSeries = {
+  dates: string[];
+  ctl: number[];
+  atl: number[];
+  tsb: number[];
+  tss: number[];
+  if_avg: number[];
+};
+
 export type DailyAggregate = {
   date: string;
   total_value: number;
@@ -224,6 +271,13 @@ export type VisualActivityLogResponse = {
 // API Response types (may differ from domain types)
 export type ApiAthleteResponse = Athlete;
 export type ApiActivityResponse = Activity;
+// GET /athlete/{id}/activities; pass next_cursor back as ?cursor= for more.
+export type ActivityPage = {
+  activities: ActivitySummary[];
+  next_cursor: string | null;
+  total_count: number | null;
+};
+
 export type ActivityWithAthlete = ActivitySummary & {
   athlete_id: number;
   athlete_first_name: string;
@@ -270,3 +324,11 @@ export type StravaActivityOption = {
   max_heartrate?: number;
   workout_type?: number;
 };
+
+export type JobStatus = {
+  job_id: string;
+  status: 'queued' | 'started' | 'deferred' | 'scheduled' | 'finished' | 'failed' | 'stopped' | 'canceled';
+  result?: { activity_id: number } | null;
+  error?: string | null;
+  progress?: { processed: number; total: number } | null;
+};
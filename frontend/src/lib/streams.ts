@@ -0,0 +1,92 @@
+import {
+  ActivityRecord,
+  ActivityStreams,
+  ActivityWithRecords,
+  StreamChannel,
+} from '@/lib/definitions';
+import { config } from '@/lib/config';
+
+const API_URL = config.apiUrl;
+
+// Binary stream format served by the backend (services/stream_format.py)
+const STREAMS_MEDIA_TYPE = 'application/vnd.betta.streams';
+
+const TYPED_ARRAYS = {
+  int32: Int32Array,
+  float32: Float32Array,
+  float64: Float64Array,
+} as const;
+
+type BinaryChannel = {
+  name: 'time' | StreamChannel;
+  dtype: keyof typeof TYPED_ARRAYS;
+  offset: number;
+  length: number;
+};
+
+// Wraps each channel of the payload in a typed array view, without copying.
+export function decodeStreams(buffer: ArrayBuffer): ActivityStreams {
+  const headerLength = new DataView(buffer).getUint32(0, true);
+  const header = JSON.parse(
+    new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength))
+  );
+  const channels: Record<string, ArrayLike<number>> = {};
+  for (const channel of header.channels as BinaryChannel[]) {
+    channels[channel.name] = new TYPED_ARRAYS[channel.dtype](
+      buffer,
+      channel.offset,
+      channel.length
+    );
+  }
+  return { ...header, channels } as ActivityStreams;
+}
+
+const RECORD_CHANNELS: StreamChannel[] = [
+  'power',
+  'heart_rate',
+  'cadence',
+  'speed',
+  'latitude',
+  'longitude',
+  'altitude',
+];
+
+export function streamsToRecords(streams: ActivityStreams): ActivityRecord[] {
+  const startMs = new Date(streams.start_time).getTime();
+  const { time } = streams.channels;
+
+  return Array.from(time, (offset, index) => {
+    const record: ActivityRecord = {
+      timestamp: new Date(startMs + offset * 1000).toISOString(),
+    };
+    for (const channel of RECORD_CHANNELS) {
+      const value = streams.channels[channel]?.[index];
+      if (value != null && !Number.isNaN(value)) record[channel] = value;
+    }
+    return record;
+  });
+}
+
+// Fetches the activity summary and its streams in parallel and joins them
+// into per-sample records for the charts and tables that need them. Pass
+// maxPoints (roughly the chart width in pixels) to get a shape-preserving
+// downsampled series instead of every sample.
+export async function fetchActivityWithRecords(
+  activityId: string,
+  maxPoints?: number
+): Promise<ActivityWithRecords> {
+  const streamsQuery = maxPoints ? `?max_points=${maxPoints}` : '';
+  const [activityRes, streamsRes] = await Promise.all([
+    fetch(`${API_URL}/activity/${activityId}`),
+    fetch(`${API_URL}/activity/${activityId}/streams${streamsQuery}`, {
+      headers: { Accept: STREAMS_MEDIA_TYPE },
+    }),
+  ]);
+  if (!activityRes.ok || !streamsRes.ok) {
+    throw new Error('Failed to fetch activity data');
+  }
+
+  const activity = await activityRes.json();
+  const streams = decodeStreams(await streamsRes.arrayBuffer());
+  return { ...activity, records: streamsToRecords(streams) };
+}